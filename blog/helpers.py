@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404, HttpResponsePermanentRedirect
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from .models import Post, PostSlugHistory
+
+
+def encode_cursor(post):
+    """ Builds an opaque token from the (published, id) position of a post """
+
+    raw = f"{post.published.isoformat()}|{post.id}"
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(token):
+    """ Returns the (published, id) pair stored in a cursor token. Raises Http404 if the token has been tampered with. """
+
+    try:
+        published, post_id = urlsafe_base64_decode(token).decode().split('|')
+        published = parse_datetime(published)
+        post_id = int(post_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise Http404('Invalid page')
+
+    if published is None:
+        raise Http404('Invalid page')
+
+    return published, post_id
+
+
+def after_cursor(queryset, cursor, id_field='id'):
+    """ Narrows a queryset ordered by (-published, -id) to the rows after the position stored in a cursor """
+
+    if not cursor:
+        return queryset
+
+    published, post_id = decode_cursor(cursor)
+    return queryset.filter(Q(published__lt=published) | Q(published=published, **{f'{id_field}__lt': post_id}))
+
+
+def split_page(posts, page_size):
+    """ Takes up to page_size + 1 posts, newest first, and returns (the page, next_cursor) """
+
+    next_cursor = None
+    if len(posts) > page_size:
+        posts = posts[:page_size]
+        next_cursor = encode_cursor(posts[-1])
+
+    return posts, next_cursor
+
+
+def paginate_posts(queryset, cursor=None, page_size=None):
+    """
+    Keyset (cursor) pagination for lists of published posts.
+    Rather than using OFFSET, which gets slower the further back a reader goes, we remember the
+    (published, id) of the last post on a page and ask the database for the posts that come after it.
+    With the composite index on Post, every page costs the same as the first one.
+
+    Returns a tuple of (posts, next_cursor), posts being a list. next_cursor is None on the last page.
+    """
+
+    if page_size is None:
+        page_size = settings.BLOG_POSTS_PER_PAGE
+
+    queryset = after_cursor(queryset.filter(published__isnull=False).order_by('-published', '-id'), cursor)
+
+    # One extra row tells us whether there is another page without a second query
+    return split_page(list(queryset[:page_size + 1]), page_size)
+
+
+def redirect_renamed_post(view_name, username, slug, user):
+    """
+    Returns a 301 to a post's current URL if `slug` is one it used to have (drafts get a new slug when their
+    title changes). Raises Http404 if no post by this author ever had that slug, or if the post is a draft
+    and `user` isn't its author, so a draft's new title isn't given away.
+    """
+
+    old_slug = (
+        PostSlugHistory.objects.select_related('post').only('post__slug', 'post__status', 'post__author')
+        .filter(author__username=username, slug=slug).first()
+    )
+
+    if old_slug is None or (old_slug.post.status != 'published' and old_slug.post.author_id != user.id):
+        raise Http404("Oops! We couldn't find that post")
+
+    return HttpResponsePermanentRedirect(reverse(view_name, args=[username, old_slug.post.slug]))
+
+
+def get_author_post(username, slug):
+    """ Returns the post at /<username>/<slug> with its author, in one query. None if there isn't one. """
+
+    try:
+        return Post.objects.select_related('author').get(author__username=username, slug=slug)
+    except Post.DoesNotExist:
+        return None
+
+
+class AuthorPostMixin:
+    """
+    For class based views of a post that only its author may use, e.g. editing and deleting.
+    The post is fetched once in dispatch(), with its author, and handed back by get_object(),
+    so checking the author and running the view don't each query for it.
+    Anyone but the author gets a 404, so the post's existence isn't given away.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        self.object = get_author_post(kwargs['username'], kwargs['slug'])
+
+        if self.object is None or self.object.author_id != request.user.id:
+            raise Http404("Oops! We couldn't find that page.")
+
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_object(self, queryset=None):
+        return self.object
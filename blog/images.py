@@ -0,0 +1,137 @@
+from io import BytesIO
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, features
+
+from .page_cache import invalidate_post_page
+
+# Widths (in pixels) of the resized copies made of each feature image
+VARIANT_WIDTHS = (320, 640, 1280)
+
+FORMATS = {
+    'jpg': 'JPEG',
+    'webp': 'WEBP',
+}
+
+MIME_TYPES = {
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+
+def get_formats():
+    """ WebP support depends on how Pillow was built, so only offer it if it's available """
+
+    formats = ['jpg']
+    if features.check('webp'):
+        formats.append('webp')
+    return formats
+
+
+def variant_name(name, width, ext):
+    """ e.g. uploads/jane_2021-1-2-123.png -> uploads/variants/jane_2021-1-2-123-640w.webp """
+
+    directory, filename = os.path.split(name)
+    root = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f"{root}-{width}w.{ext}")
+
+
+def parse_variants(variants):
+    """ Turns the string stored on Post.feature_image_variants into a dict of {extension: [widths]} """
+
+    parsed = {}
+    for variant in (variants or '').split():
+        width, ext = variant.split('.')
+        parsed.setdefault(ext, []).append(int(width))
+    return parsed
+
+
+def get_srcset(name, ext, widths):
+    return ', '.join(f"{default_storage.url(variant_name(name, width, ext))} {width}w" for width in widths)
+
+
+def get_variant_widths(image_width):
+    """
+    The widths to make copies of an image at: each width in VARIANT_WIDTHS up to the original's,
+    plus the original width if it's between two of them. A <source> srcset replaces the <img> src, so without
+    that last copy a 1000px image would only be offered at 640px and be scaled up on wide screens.
+    """
+
+    widths = [width for width in VARIANT_WIDTHS if width <= image_width]
+    if widths and widths[-1] != image_width and image_width < VARIANT_WIDTHS[-1]:
+        widths.append(image_width)
+    return widths
+
+
+def create_variants(name, storage=default_storage):
+    """
+    Saves a resized copy of the image at each of get_variant_widths(), in each supported format.
+    Returns the string to store on Post.feature_image_variants.
+    Images are never scaled up, and a missing, corrupt or non-image source file just produces no variants.
+    """
+
+    if not name or not storage.exists(name):
+        return ''
+
+    try:
+        with storage.open(name) as f, Image.open(f) as image:
+            image.load()
+    except (OSError, Image.DecompressionBombError):
+        return ''
+
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    variants = []
+    for width in get_variant_widths(image.width):
+        height = round(image.height * width / image.width)
+        resized_image = image.resize((width, height), Image.ANTIALIAS) if width < image.width else image
+
+        for ext in get_formats():
+            output = BytesIO()
+            resized_image.save(output, format=FORMATS[ext], quality=80)
+
+            path = variant_name(name, width, ext)
+            if storage.exists(path):
+                storage.delete(path)
+            storage.save(path, ContentFile(output.getvalue()))
+
+            variants.append(f"{width}.{ext}")
+
+    return ' '.join(variants)
+
+
+def get_or_create_variants(name, storage=default_storage):
+    """
+    Returns {extension: [widths]} for the variants of an image, creating them if they don't all exist yet.
+    Used for images inside post bodies, which are shared between saves of the same post.
+    """
+
+    if not name or not storage.exists(name):
+        return {}
+
+    # Only the header is read to find the size
+    try:
+        with storage.open(name) as f, Image.open(f) as image:
+            widths = get_variant_widths(image.width)
+    except (OSError, Image.DecompressionBombError):
+        return {}
+
+    existing = [
+        f"{width}.{ext}" for width in widths for ext in get_formats()
+        if storage.exists(variant_name(name, width, ext))
+    ]
+    if len(existing) == len(widths) * len(get_formats()):
+        return parse_variants(' '.join(existing))
+
+    return parse_variants(create_variants(name, storage))
+
+
+def update_feature_image_variants(post):
+    """ Generates the variants for a post's feature image and records which ones exist """
+
+    post.feature_image_variants = create_variants(post.feature_image.name)
+    type(post).objects.filter(pk=post.pk).update(feature_image_variants=post.feature_image_variants)
+    invalidate_post_page(post)
@@ -0,0 +1,131 @@
+"""
+Write-behind buffering for Post.like_count.
+
+Each like is still saved as a Like row straight away, so no like is ever lost. Only the
+per-post total is deferred. Like/unlike deltas collect in memory and a background thread
+recounts the posts they touched from their Like rows every LIKE_FLUSH_INTERVAL seconds, in one
+UPDATE per flush rather than one per click. A popular post's row is then written once per
+interval, not once per like.
+
+Recounting rather than adding the deltas means processes flushing in a different order to the
+one their likes and unlikes happened in can't leave a total wrong. Deltas still in memory when a
+process dies are lost, but the next like on the post corrects it, and
+`python manage.py recount_likes` rebuilds every total.
+"""
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from bloggingplatform import caching
+from .models import Post, Like
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_pending = {}
+_lock = threading.Lock()
+_flusher = None
+
+
+def record(post_id, delta):
+    """
+    Counts a like (delta=1) or unlike (delta=-1) once the surrounding transaction commits, so rolled back likes
+    are never counted. If LIKE_FLUSH_INTERVAL is 0 the total is updated immediately instead.
+    """
+
+    if not settings.LIKE_FLUSH_INTERVAL:
+        apply_deltas({post_id: delta})
+    else:
+        transaction.on_commit(lambda: add(post_id, delta))
+
+
+def add(post_id, delta):
+    with _lock:
+        total = _pending.get(post_id, 0) + delta
+        if total:
+            _pending[post_id] = total
+        else:
+            _pending.pop(post_id, None)
+        start_flusher()
+
+
+def pending(post_id):
+    """ The change to a post's like count that this process hasn't written yet """
+
+    with _lock:
+        return _pending.get(post_id, 0)
+
+
+def take():
+    """ Empties the buffer and returns what was in it """
+
+    global _pending
+    with _lock:
+        deltas, _pending = _pending, {}
+    return deltas
+
+
+def count_rows(model):
+    """ A subquery counting the rows of `model` that belong to a post """
+
+    rows = model.objects.filter(post=OuterRef('pk')).order_by().values('post')
+    return Coalesce(Subquery(rows.annotate(total=Count('pk')).values('total')), 0)
+
+
+def apply_deltas(deltas):
+    """ Recounts the like totals of the posts in {post id: delta} with one UPDATE. Returns the number of posts updated. """
+
+    post_ids = [post_id for post_id, delta in deltas.items() if delta]
+    if not post_ids:
+        return 0
+
+    with transaction.atomic():
+        Post.objects.filter(pk__in=post_ids).update(like_count=count_rows(Like))
+        caching.invalidate(*[caching.post(post_id) for post_id in post_ids])
+
+    return len(post_ids)
+
+
+def flush():
+    """ Writes the buffered deltas to the database. If that fails they go back in the buffer for the next flush. """
+
+    deltas = take()
+    if not deltas:
+        return 0
+
+    try:
+        return apply_deltas(deltas)
+    except Exception:
+        for post_id, delta in deltas.items():
+            add(post_id, delta)
+        raise
+
+
+def flush_in_thread():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Failed to flush like counts')
+    finally:
+        close_old_connections()
+
+
+def run_flusher():
+    while True:
+        time.sleep(settings.LIKE_FLUSH_INTERVAL)
+        flush_in_thread()
+
+
+def start_flusher():
+    """ Starts the background flush thread the first time something is buffered. Must be called with _lock held. """
+
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(target=run_flusher, name='like-flusher', daemon=True)
+        _flusher.start()
+        # Don't throw away what's buffered on a clean shutdown
+        atexit.register(flush_in_thread)
@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from blog.models import Post
+from contextlib import ExitStack
+import json
+import math
+import time
+
+USER_MODEL = get_user_model()
+
+
+def percentile(values, percent):
+    """ Nearest-rank percentile of a list of numbers """
+
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def get_host():
+    """ A host name the site will accept, as the test client's default ("testserver") usually isn't allowed """
+
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        'Requests the main pages repeatedly through the Django test client (so no web server is needed) and '
+        'reports p50/p95/p99 latency and queries per request for each. Results are saved as JSON so runs can be '
+        'compared with --compare. Run it against a database filled by generate_sample_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Number of timed requests per route')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Number of untimed requests per route first (fills caches)')
+        parser.add_argument('--user', help='Username to log in as for the logged in routes '
+                                           '(default: whoever follows the most people)')
+        parser.add_argument('--search', default='django', help='Query for the search route')
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Only run this route (can be given more than once)')
+        parser.add_argument('--output', help='Where to save the JSON results (default: benchmark-<time>.json)')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        routes = self.get_routes(options)
+        if options['routes']:
+            unknown = set(options['routes']) - {name for name, *_ in routes}
+            if unknown:
+                raise CommandError(f'Unknown route(s): {", ".join(sorted(unknown))}')
+            routes = [route for route in routes if route[0] in options['routes']]
+
+        anonymous = Client(HTTP_HOST=get_host())
+        logged_in = Client(HTTP_HOST=get_host())
+        logged_in.force_login(self.reader)
+
+        results = {}
+        for name, url, data, login in routes:
+            client = logged_in if login else anonymous
+            results[name] = self.run(client, url, data, options['warmup'], options['requests'])
+            self.stdout.write(self.format_row(name, results[name]))
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'database': connections['default'].vendor,
+            'requests': options['requests'],
+            'routes': results,
+        }
+
+        output = options['output'] or f'benchmark-{timezone.now():%Y%m%d-%H%M%S}.json'
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Saved results to {output}'))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.compare(json.load(f)['routes'], results)
+
+    def get_routes(self, options):
+        """ Returns a list of (name, url, query parameters, logged in) using the busiest rows as examples """
+
+        username = options['user']
+        reader = USER_MODEL.objects.filter(username=username) if username else \
+            USER_MODEL.objects.order_by('-profile__following_count')
+        self.reader = reader.first()
+
+        post = Post.objects.published().select_related('author').order_by('-like_count').first()
+        if self.reader is None or post is None:
+            raise CommandError('There is nothing to benchmark. Fill the database with generate_sample_data first.')
+
+        author = USER_MODEL.objects.order_by('-profile__follower_count').first()
+        post_url = reverse('post_detail', args=[post.author.username, post.slug])
+
+        return [
+            ('index', reverse('index'), {}, False),
+            ('index_logged_in', reverse('index'), {}, True),
+            ('feed', reverse('feed'), {}, True),
+            ('author', reverse('author', args=[author.username]), {}, False),
+            ('post_detail', post_url, {}, False),
+            ('post_detail_logged_in', post_url, {}, True),
+            ('comments', reverse('get_comments', args=[post.id]), {}, False),
+            ('search', reverse('search'), {'q': options['search']}, False),
+            ('notifications', reverse('inbox'), {}, True),
+        ]
+
+    def run(self, client, url, data, warmup, requests):
+        for _ in range(warmup):
+            client.get(url, data)
+
+        timings = []
+        queries = []
+        statuses = set()
+
+        for _ in range(requests):
+            with ExitStack() as stack:
+                contexts = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+                start = time.perf_counter()
+                response = client.get(url, data)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            queries.append(sum(len(context.captured_queries) for context in contexts))
+            statuses.add(response.status_code)
+
+        return {
+            'url': url,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'queries': round(sum(queries) / len(queries), 1),
+            'max_queries': max(queries),
+        }
+
+    def format_row(self, name, result):
+        status = ','.join(str(code) for code in result['status'])
+        return (
+            f"{name:<24} {status:>7}  p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+            f"p99 {result['p99_ms']:>8.2f}ms  {result['queries']:>5} queries"
+        )
+
+    def compare(self, before, after):
+        self.stdout.write('\nChange since the earlier run:')
+
+        for name, result in after.items():
+            if name not in before:
+                continue
+
+            changes = []
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                old, new = before[name][key], result[key]
+                change = (new - old) / old * 100 if old else 0
+                changes.append(f"{key[:3]} {change:+6.1f}%")
+            changes.append(f"queries {result['queries'] - before[name]['queries']:+}")
+
+            self.stdout.write(f"{name:<24} {'  '.join(changes)}")
@@ -0,0 +1,34 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+import django
+
+from blog.images import create_variants
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Creates resized copies of feature images for posts that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of processes to resize images with (defaults to the number of CPUs)')
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate variants for every post, not just those missing them')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(feature_image='').exclude(feature_image__isnull=True)
+        if not options['all']:
+            posts = posts.filter(feature_image_variants='')
+
+        # Many posts share the default image, so each file only needs resizing once
+        names = list(posts.order_by().values_list('feature_image', flat=True).distinct())
+
+        # Workers only resize files; the database is updated from this process
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+            for name, variants in zip(names, executor.map(create_variants, names)):
+                posts.filter(feature_image=name).update(feature_image_variants=variants)
+
+                if not variants:
+                    self.stdout.write(self.style.WARNING(f'No variants created for {name}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(names)} feature images.'))
@@ -0,0 +1,289 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from blog import search
+from blog.models import Post, Comment, Like, TimelineEntry
+from blog.sanitise import sanitise
+from notification.models import Notification
+from userprofile.models import Profile, Follower
+from datetime import timedelta
+from io import StringIO
+import itertools
+import random
+
+USER_MODEL = get_user_model()
+
+# Every generated user can log in with this password
+PASSWORD = 'password123'
+
+WORDS = (
+    'django python database query index cache latency throughput request response template view model '
+    'migration server client browser feed timeline follower comment like post author reader draft publish '
+    'search page session cookie token image photo upload profile notification batch worker thread queue '
+    'the a of and to in is that for it as with was on be at by this from have or an but not are '
+    'fast slow simple small large better every first last new old good great real quick'
+).split()
+
+FIRST_NAMES = ('Alice', 'Bob', 'Carol', 'Dan', 'Erin', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy', 'Mallory', 'Niaj')
+LAST_NAMES = ('Smith', 'Jones', 'Taylor', 'Brown', 'Williams', 'Wilson', 'Evans', 'Thomas', 'Roberts', 'Walker')
+
+
+def zipf_weights(count, exponent):
+    """ Cumulative weights giving item n a 1 / n**exponent share, so a few items get most of the picks """
+
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills the database with synthetic users, profiles, follows, posts, comments, likes and notifications '
+        'for load testing (see the benchmark command). Follows and likes follow a power law, so a few authors '
+        'and posts are far more popular than the rest. Runs with the same --seed generate the same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--posts', type=int, default=5000, help='Number of posts to create')
+        parser.add_argument('--follows', type=int, default=20, help='Average number of users each user follows')
+        parser.add_argument('--comments', type=int, default=3, help='Average number of comments per post')
+        parser.add_argument('--likes', type=int, default=10, help='Average number of likes per post')
+        parser.add_argument('--notifications', type=int, default=20,
+                            help='Average number of notifications per user')
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Power law exponent for picking who is followed and what is liked')
+        parser.add_argument('--drafts', type=float, default=0.1, help='Fraction of posts left as drafts')
+        parser.add_argument('--prefix', default='sample', help='Usernames are this followed by a number')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows per bulk INSERT')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.exponent = options['exponent']
+
+        if options['users'] < 2:
+            raise CommandError('At least two users are needed.')
+
+        prefix = self.prefix = options['prefix']
+        if USER_MODEL.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'There are already users named {prefix}..., choose another --prefix.')
+
+        with transaction.atomic():
+            profiles = self.create_users(prefix, options['users'])
+            following = self.create_follows(profiles, options['follows'])
+            posts = self.create_posts(profiles, options['posts'], options['drafts'])
+            published = [post for post in posts if post.status == 'published']
+            events = self.create_comments(profiles, published, options['comments'])
+            events += self.create_likes(profiles, published, options['likes'])
+            self.create_timelines(published, following)
+            self.create_notifications(events, options['users'] * options['notifications'])
+
+            # The denormalised counters are normally kept up to date by signals, which bulk_create skips
+            call_command('recount_follows', batch_size=self.batch_size, stdout=StringIO())
+            call_command('recount_likes', batch_size=self.batch_size, stdout=StringIO())
+            Profile.objects.filter(user__username__startswith=prefix).update(
+                unread_notifications=Coalesce(Subquery(
+                    Notification.objects.filter(profile=OuterRef('pk'), read_at__isnull=True).order_by()
+                    .values('profile').annotate(total=Count('pk')).values('total')
+                ), 0)
+            )
+
+            for start in range(0, len(published), self.batch_size):
+                batch = Post.objects.filter(pk__in=[post.pk for post in published[start:start + self.batch_size]])
+                search.index_posts(batch.select_related('author'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(profiles)} users, {sum(len(follows) for follows in following.values())} follows, '
+            f'{len(posts)} posts and {len(events)} comments and likes. Every user\'s password is "{PASSWORD}".'
+        ))
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    def sentence(self):
+        return self.words(self.random.randint(6, 20)).capitalize() + '.'
+
+    def paragraph(self):
+        sentences = [self.sentence() for _ in range(self.random.randint(2, 6))]
+        if self.random.random() < 0.3:
+            word = self.random.choice(WORDS)
+            sentences[0] = sentences[0].replace(word, f'<b>{word}</b>', 1)
+        return ' '.join(sentences)
+
+    def body(self):
+        """ HTML in the shape Summernote produces: paragraphs, headings, lists, links and the odd image """
+
+        blocks = []
+        for _ in range(self.random.randint(3, 12)):
+            kind = self.random.random()
+            if kind < 0.1:
+                blocks.append(f'<h3>{self.words(4).capitalize()}</h3>')
+            elif kind < 0.2:
+                items = ''.join(f'<li>{self.words(self.random.randint(3, 8))}</li>' for _ in range(3))
+                blocks.append(f'<ul>{items}</ul>')
+            elif kind < 0.25:
+                blocks.append(f'<p><img src="https://picsum.photos/seed/{self.random.randint(1, 1000)}/800/400" '
+                              f'style="width: 100%;"></p>')
+            elif kind < 0.3:
+                blocks.append(f'<p>{self.sentence()} <a href="https://www.djangoproject.com/" target="_blank">'
+                              f'{self.words(2)}</a></p>')
+            else:
+                blocks.append(f'<p>{self.paragraph()}</p>')
+        return ''.join(blocks)
+
+    def pick(self, population, weights, count):
+        """ Up to `count` different items, more popular items (earlier in the list) being more likely """
+
+        count = min(count, len(population))
+        return set(self.random.choices(population, cum_weights=weights, k=count))
+
+    def bulk_create(self, model, objs):
+        # SQLite caps how many rows fit in one INSERT, and an explicit batch_size would override that
+        limit = connection.ops.bulk_batch_size(model._meta.concrete_fields, objs)
+        model.objects.bulk_create(objs, batch_size=max(min(self.batch_size, limit), 1))
+
+    def create_users(self, prefix, count):
+        password = make_password(PASSWORD)
+        users = [
+            USER_MODEL(
+                email=f'{prefix}{number}@example.com',
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                username=f'{prefix}{number}',
+                password=password,
+            )
+            for number in range(count)
+        ]
+        self.bulk_create(USER_MODEL, users)
+
+        # bulk_create doesn't set primary keys on every database, so read the new rows back
+        users = list(USER_MODEL.objects.filter(username__startswith=prefix).order_by('pk'))
+        self.bulk_create(Profile, [
+            Profile(user=user, blog_title=self.words(4).capitalize(), bio=self.sentence()) for user in users
+        ])
+
+        profiles = Profile.objects.filter(user__username__startswith=prefix).select_related('user')
+        profiles = {profile.user_id: profile for profile in profiles}
+        self.profile_ids = {user_id: profile.pk for user_id, profile in profiles.items()}
+        return [profiles[user.pk] for user in users]
+
+    def create_follows(self, profiles, average):
+        """ Returns {author profile id: [follower profile ids]} """
+
+        # Shuffled so popularity isn't tied to the order the users were created in
+        popularity = profiles[:]
+        self.random.shuffle(popularity)
+        weights = zipf_weights(len(popularity), self.exponent)
+
+        follows = []
+        following = {}
+        for profile in profiles:
+            count = self.random.randint(0, average * 2)
+            for author in self.pick(popularity, weights, count):
+                if author.pk != profile.pk:
+                    follows.append(Follower(user_from=profile, user_to=author))
+                    following.setdefault(author.pk, []).append(profile.pk)
+
+        self.bulk_create(Follower, follows)
+        return following
+
+    def create_posts(self, profiles, count, drafts):
+        weights = zipf_weights(len(profiles), self.exponent)
+        now = timezone.now()
+        posts = []
+
+        for number in range(count):
+            author = self.random.choices(profiles, cum_weights=weights)[0]
+            created = now - timedelta(minutes=self.random.randint(0, 60 * 24 * 365))
+            post = Post(
+                title=f'{self.words(self.random.randint(3, 8)).capitalize()} {number}',
+                body=self.body(),
+                author_id=author.user_id,
+                created=created,
+            )
+            if self.random.random() >= drafts:
+                post.status = 'published'
+                post.published = created + timedelta(minutes=self.random.randint(0, 60 * 24))
+
+            # Post.save isn't called by bulk_create, so fill in what it would have
+            post.update_summary()
+            post.body_html = sanitise(post.body, rewrite_images=False)
+            posts.append(post)
+
+        self.bulk_create(Post, posts)
+
+        return list(Post.objects.filter(author__username__startswith=self.prefix).order_by('pk'))
+
+    def create_comments(self, profiles, posts, average):
+        comments = []
+        for post in posts:
+            for _ in range(self.random.randint(0, average * 2)):
+                commenter = self.random.choice(profiles)
+                comments.append(Comment(
+                    user_from=commenter, user_to_id=self.profile_ids[post.author_id], post=post, body=self.sentence()
+                ))
+
+        self.bulk_create(Comment, comments)
+        return comments
+
+    def create_likes(self, profiles, posts, average):
+        """ Popular posts (by the same power law) get most of the likes """
+
+        if not posts:
+            return []
+
+        popularity = posts[:]
+        self.random.shuffle(popularity)
+        weights = zipf_weights(len(popularity), self.exponent)
+
+        likes = {}
+        for _ in range(len(posts) * average):
+            post = self.random.choices(popularity, cum_weights=weights)[0]
+            reader = self.random.choice(profiles)
+            # Each reader can like a post once (the unique_like constraint)
+            likes[reader.pk, post.pk] = Like(user_from=reader, user_to_id=self.profile_ids[post.author_id], post=post)
+
+        likes = list(likes.values())
+        self.bulk_create(Like, likes)
+        return likes
+
+    def create_timelines(self, posts, following):
+        """ What fan-out-on-write (blog.timeline) would have done as each post was published """
+
+        entries = []
+        for post in posts:
+            followers = following.get(self.profile_ids[post.author_id], [])
+            if len(followers) <= settings.FEED_FANOUT_THRESHOLD:
+                entries.extend(
+                    TimelineEntry(profile_id=follower_id, post=post, published=post.published)
+                    for follower_id in followers
+                )
+
+        self.bulk_create(TimelineEntry, entries)
+
+    def create_notifications(self, events, count):
+        """ Notifications as notification.outbox would have written them, half of them already read """
+
+        if not events:
+            return
+
+        notifications = []
+        for event in self.random.sample(events, min(count, len(events))):
+            verb = event._meta.model_name
+            actor = event.user_from.user.username
+            action = 'liked' if verb == 'like' else 'commented on'
+            notifications.append(Notification(
+                profile_id=event.user_to_id,
+                message=f'{actor} {action} {event.post.title}.'[:255],
+                verb=verb,
+                target_id=event.post_id,
+                read_at=timezone.now() if self.random.random() < 0.5 else None,
+            ))
+
+        self.bulk_create(Notification, notifications)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from blog import search
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index from the published posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of posts to index per transaction')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stderr.write('Full-text search needs SQLite or PostgreSQL.')
+            return
+
+        posts = Post.objects.published().select_related('author').order_by('id')
+        last_id = 0
+        total = 0
+
+        with transaction.atomic():
+            search.clear()
+
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+
+            with transaction.atomic():
+                search.index_posts(batch)
+
+            last_id = batch[-1].id
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} posts.'))
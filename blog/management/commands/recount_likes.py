@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from blog.like_buffer import count_rows
+from blog.models import Post, Like, Comment
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the denormalised like_count and comment_count on every Post. '
+        'Run it after a process has stopped uncleanly with like counts still buffered (see blog.like_buffer).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts to repair per UPDATE')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report how many posts are out of date without changing them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        drifted = Post.objects.annotate(
+            actual_likes=count_rows(Like),
+            actual_comments=count_rows(Comment),
+        ).exclude(
+            like_count=F('actual_likes'),
+            comment_count=F('actual_comments'),
+        )
+        post_ids = list(drifted.values_list('pk', flat=True))
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(post_ids)} posts have incorrect like or comment counts.')
+            return
+
+        for start in range(0, len(post_ids), batch_size):
+            with transaction.atomic():
+                Post.objects.filter(pk__in=post_ids[start:start + batch_size]).update(
+                    like_count=count_rows(Like),
+                    comment_count=count_rows(Comment),
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Repaired like and comment counts for {len(post_ids)} posts.'))
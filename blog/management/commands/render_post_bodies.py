@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post
+from blog.page_cache import invalidate_post_page
+from blog.sanitise import sanitise
+
+
+class Command(BaseCommand):
+    help = 'Re-sanitises post bodies into body_html, e.g. after changing the allow-lists in blog.sanitise'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Number of posts to update per query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        posts = Post.objects.select_related('author').only('id', 'body', 'slug', 'updated', 'author__username')
+        posts = posts.exclude(body='').exclude(body__isnull=True).order_by('id')
+        last_id = 0
+        total = 0
+
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            for post in batch:
+                post.body_html = sanitise(post.body)
+                invalidate_post_page(post)
+
+            # bulk_update skips save(), so the updated date is left alone
+            Post.objects.bulk_update(batch, ['body_html'])
+            last_id = batch[-1].id
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {total} posts.'))
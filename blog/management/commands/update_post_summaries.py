@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post
+from blog.summary import summarise
+
+
+class Command(BaseCommand):
+    help = 'Fills in the excerpt, word count and reading time of posts saved before they were stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of posts to update per query')
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every post, e.g. after changing POST_EXCERPT_WORDS or WORDS_PER_MINUTE')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        posts = Post.objects.exclude(body='').exclude(body__isnull=True)
+        if not options['all']:
+            posts = posts.filter(word_count=0)
+
+        posts = posts.only('id', 'body').order_by('id')
+        last_id = 0
+        total = 0
+
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            for post in batch:
+                post.excerpt, post.word_count, post.reading_time = summarise(post.body)
+
+            # bulk_update skips save(), so the updated date and cached pages are left alone
+            Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'reading_time'])
+            last_id = batch[-1].id
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated summaries for {total} posts.'))
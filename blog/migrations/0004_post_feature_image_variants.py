@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_published_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='feature_image_variants',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
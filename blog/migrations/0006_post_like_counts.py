@@ -0,0 +1,56 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:01
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    """ Keeps the oldest like for each (user_from, post) pair so the unique constraint can be added """
+    Like = apps.get_model('blog', 'Like')
+
+    duplicates = (
+        Like.objects.order_by().values('user_from', 'post')
+        .annotate(first_id=Min('id'), total=Count('id')).filter(total__gt=1)
+    )
+
+    for pair in duplicates:
+        Like.objects.filter(user_from=pair['user_from'], post=pair['post']).exclude(id=pair['first_id']).delete()
+
+
+def populate_counts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Like = apps.get_model('blog', 'Like')
+    Comment = apps.get_model('blog', 'Comment')
+
+    def count_of(model):
+        rows = model.objects.filter(post=OuterRef('pk')).order_by().values('post')
+        return Coalesce(Subquery(rows.annotate(total=Count('pk')).values('total')), 0)
+
+    Post.objects.update(like_count=count_of(Like), comment_count=count_of(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user_from', 'post'), name='unique_like'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+def sanitise_bodies(apps, schema_editor):
+    """
+    Fills in body_html so existing posts still render. Images are left as they are here;
+    `python manage.py render_post_bodies` rewrites them to use resized variants.
+    """
+    from blog.sanitise import sanitise
+
+    Post = apps.get_model('blog', 'Post')
+
+    for post in Post.objects.exclude(body='').exclude(body__isnull=True).only('id', 'body').iterator():
+        Post.objects.filter(pk=post.pk).update(body_html=sanitise(post.body, rewrite_images=False))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='body_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(sanitise_bodies, migrations.RunPython.noop),
+    ]
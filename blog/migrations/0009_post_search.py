@@ -0,0 +1,38 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:45
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """ Creates the full-text search table (see blog.search) and indexes the posts already published """
+    from blog import search
+
+    Post = apps.get_model('blog', 'Post')
+
+    search.create_table(schema_editor)
+
+    posts = Post.objects.filter(status='published').select_related('author').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(posts.filter(id__gt=last_id)[:500])
+        if not batch:
+            break
+        search.index_posts(batch)
+        last_id = batch[-1].id
+
+
+def drop_search_index(apps, schema_editor):
+    from blog import search
+
+    search.drop_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_body_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
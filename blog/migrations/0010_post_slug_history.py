@@ -0,0 +1,48 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:10
+
+import autoslug.fields
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blog', '0009_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSlugHistory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(db_index=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='slug',
+            field=autoslug.fields.AutoSlugField(editable=False, populate_from='title', unique_with=['author']),
+        ),
+        migrations.AddConstraint(
+            model_name='post',
+            constraint=models.UniqueConstraint(fields=('author', 'slug'), name='unique_post_slug'),
+        ),
+        migrations.AddField(
+            model_name='postslughistory',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='postslughistory',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slug_history', to='blog.Post'),
+        ),
+        migrations.AddConstraint(
+            model_name='postslughistory',
+            constraint=models.UniqueConstraint(fields=('author', 'slug'), name='unique_old_post_slug'),
+        ),
+    ]
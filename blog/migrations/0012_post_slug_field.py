@@ -0,0 +1,19 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:38
+
+import blog.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_timeline_published_post_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='slug',
+            field=blog.models.PostSlugField(editable=False, populate_from='title', unique_with=['author']),
+        ),
+    ]
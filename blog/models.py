@@ -3,6 +3,10 @@ from django.utils import timezone
 from django.conf import settings
 from autoslug import AutoSlugField
 from notification.models import Event
+from userprofile.models import Profile
+from .page_cache import invalidate_post_page
+from .summary import summarise, MAX_EXCERPT_LENGTH
+from .sanitise import sanitise
 
 
 def get_filename(self, filename):
@@ -15,6 +19,38 @@ def get_filename(self, filename):
     return f"uploads/{self.author.username}_{datetime_str}.{extension}"
 
 
+class PostSlugField(AutoSlugField):
+    """
+    An AutoSlugField that only works out a slug when there isn't one yet. AutoSlugField checks the slug is
+    unique on every save, which costs a query each time a post is edited without its slug changing.
+    """
+
+    def pre_save(self, instance, add):
+        slug = self.value_from_object(instance)
+        if slug and not add:
+            return slug
+        return super().pre_save(instance, add)
+
+
+class PostQuerySet(models.QuerySet):
+
+    # Columns rendered by the post cards on the index and author pages
+    CARD_FIELDS = (
+        'title', 'slug', 'feature_image', 'feature_image_variants', 'published', 'excerpt', 'reading_time',
+        'like_count', 'comment_count', 'author', 'author__username',
+    )
+
+    def published(self):
+        return self.filter(status='published')
+
+    def published_cards(self):
+        """
+        Published posts with just enough loaded to render a card. The author is joined in the same query
+        so templates can use post.author.username without a query per post, and the body is left behind.
+        """
+        return self.published().select_related('author').only(*self.CARD_FIELDS)
+
+
 class Post(models.Model):
 
     STATUS_CHOICES = (
@@ -24,17 +60,104 @@ class Post(models.Model):
 
     title = models.CharField(max_length=255)
     feature_image = models.ImageField(blank=True, null=True, upload_to=get_filename, default='thePOST-default.jpg')
+    # Resized copies of feature_image, e.g. "320.jpg 320.webp 640.jpg 640.webp". See blog.images.
+    feature_image_variants = models.CharField(max_length=255, blank=True, editable=False)
     body = models.TextField(blank=True, null=True)
-    slug = AutoSlugField(populate_from='title', unique_with=['author__username'], always_update=True)
+    # The body after sanitising (see blog.sanitise). This is what gets rendered.
+    body_html = models.TextField(blank=True, editable=False)
+    # Worked out from the body on save (see blog.summary) so listing pages don't have to parse it
+    excerpt = models.CharField(max_length=MAX_EXCERPT_LENGTH, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False, help_text='Minutes')
+    # Set when the post is created and only changed while it's a draft (see save), so published URLs don't move
+    slug = PostSlugField(populate_from='title', unique_with=['author'])
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     created = models.DateTimeField(default=timezone.now)
     published = models.DateTimeField(blank=True, null=True)
     updated = models.DateTimeField(auto_now=True)
+    # Kept up to date by signals in blog.signals so listing pages don't have to count likes and comments
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Never written back by save(), see _do_update
+    COUNTER_FIELDS = ('like_count', 'comment_count')
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        # Supports keyset pagination on the index and author pages (see blog.helpers.paginate_posts)
+        indexes = [
+            models.Index(fields=['status', '-published', '-id'], name='post_status_published_idx'),
+            models.Index(fields=['author', 'status', '-published', '-id'], name='post_author_published_idx'),
+        ]
+        # Also the index used to look posts up by /<username>/<slug>
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'slug'], name='unique_post_slug'),
+        ]
 
     def __str__(self):
         return f"{self.title} | by {self.author.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell whether the title has been changed. Left unset if the title was deferred.
+        if 'title' in field_names:
+            instance._loaded_title = instance.title
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Drop the cached page before the slug and updated date change underneath it
+        invalidate_post_page(self)
+        self.update_summary()
+        self.body_html = sanitise(self.body)
+
+        old_slug = None
+
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            if self.status == 'draft' and self.title != getattr(self, '_loaded_title', self.title):
+                # An empty slug makes PostSlugField generate a new one from the title
+                old_slug, self.slug = self.slug, ''
+
+        super().save(*args, **kwargs)
+        self._loaded_title = self.title
+
+        if old_slug and old_slug != self.slug:
+            PostSlugHistory.objects.update_or_create(author_id=self.author_id, slug=old_slug, defaults={'post': self})
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # The counters are only changed with UPDATEs (see blog.signals), so don't write back a stale copy of them.
+        # If the row has gone, save() still falls back to an INSERT, which does include them.
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.COUNTER_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+    def update_summary(self):
+        """ Works out the excerpt, word count and reading time from the body """
+        self.excerpt, self.word_count, self.reading_time = summarise(self.body)
+
+    def delete(self, *args, **kwargs):
+        invalidate_post_page(self)
+        return super().delete(*args, **kwargs)
+
+
+class PostSlugHistory(models.Model):
+    """ A slug a post used to have, so links to its old URL can be redirected """
+
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    slug = models.SlugField(max_length=50, db_index=False)
+    post = models.ForeignKey(Post, related_name='slug_history', on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'slug'], name='unique_old_post_slug'),
+        ]
+
+    def __str__(self):
+        return f"{self.slug} -> {self.post.slug}"
+
 
 class Comment(Event):
     post = models.ForeignKey(Post, related_name='comments', on_delete=models.CASCADE)
@@ -43,15 +166,48 @@ class Comment(Event):
     def __str__(self):
         return f"{self.user_from.user.username} commented on a post by {self.user_to.user.username}"
 
-    def get_notification_str(self):
-        return f"{self.user_from.user.username} commented on {self.post.title}."
+    def get_notification_str(self, others=0):
+        return f"{self.get_actor_str(others)} commented on {self.post.title}."
+
+    def get_notification_target(self):
+        return self.post_id
 
 
 class Like(Event):
     post = models.ForeignKey(Post, related_name='likes', on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_from', 'post'], name='unique_like'),
+        ]
+
     def __str__(self):
         return f"{self.user_from.user.username} liked a post by {self.user_to.user.username}"
 
-    def get_notification_str(self):
-        return f"{self.user_from.user.username} liked {self.post.title}."
+    def get_notification_str(self, others=0):
+        return f"{self.get_actor_str(others)} liked {self.post.title}."
+
+    def get_notification_target(self):
+        return self.post_id
+
+
+class TimelineEntry(models.Model):
+    """
+    A post in a reader's home feed. Entries are written for each follower when a post is published
+    (see blog.timeline), so reading the feed doesn't have to join across everyone they follow.
+    """
+
+    profile = models.ForeignKey(Profile, related_name='timeline', on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, related_name='timeline_entries', on_delete=models.CASCADE)
+    published = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['profile', '-published', '-post'], name='timeline_profile_published_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post.title} in {self.profile.user.username}'s timeline"
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import caches
+import hashlib
+
+
+def get_page_cache():
+    return caches['pages']
+
+
+def post_cache_key(username, slug, updated):
+    """ Pages are keyed on the post's last update, so an edited post never matches an old entry """
+
+    raw = f"{username}|{slug}|{updated.isoformat()}"
+    return 'post_detail:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_cached_page(post):
+    return get_page_cache().get(post_cache_key(post.author.username, post.slug, post.updated))
+
+
+def set_cached_page(post, content):
+    key = post_cache_key(post.author.username, post.slug, post.updated)
+    get_page_cache().set(key, content, settings.POST_PAGE_CACHE_TIMEOUT)
+
+
+def invalidate_post_page(post):
+    """ Removes the cached page for a post as it currently stands """
+
+    if post.pk and post.updated:
+        get_page_cache().delete(post_cache_key(post.author.username, post.slug, post.updated))
@@ -0,0 +1,216 @@
+"""
+Allow-list HTML sanitiser for post bodies.
+
+Post.body holds whatever the Summernote editor (or anyone posting to the form) sent us. It is
+cleaned once when the post is saved and the result is stored in Post.body_html, which is what
+the templates render. Anything not listed here is dropped: unknown tags are unwrapped (their text
+is kept), script-like tags are removed along with their content, and attributes, URLs and inline
+styles are checked against their own allow-lists.
+
+Images uploaded to our media storage are rewritten to offer the resized variants made by
+blog.images, and every image and embed is lazy loaded.
+"""
+
+from django.conf import settings
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+from .images import get_or_create_variants, get_srcset, MIME_TYPES
+import re
+
+ALLOWED_TAGS = {
+    'a': {'href', 'title', 'target'},
+    'b': set(), 'strong': set(), 'i': set(), 'em': set(), 'u': set(), 's': set(), 'strike': set(),
+    'sub': set(), 'sup': set(), 'span': set(), 'font': {'color', 'face'},
+    'p': set(), 'div': set(), 'br': set(), 'hr': set(),
+    'h1': set(), 'h2': set(), 'h3': set(), 'h4': set(), 'h5': set(), 'h6': set(),
+    'blockquote': set(), 'pre': set(), 'code': set(),
+    'ul': set(), 'ol': set(), 'li': set(),
+    'table': set(), 'thead': set(), 'tbody': set(), 'tr': set(),
+    'th': {'colspan', 'rowspan'}, 'td': {'colspan', 'rowspan'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'iframe': {'src', 'width', 'height', 'frameborder', 'allowfullscreen'},
+}
+# Attributes allowed on any tag in ALLOWED_TAGS
+GLOBAL_ATTRIBUTES = {'style'}
+
+VOID_TAGS = {'br', 'hr', 'img'}
+# Tags removed together with everything inside them
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'textarea', 'select'}
+
+LINK_SCHEMES = {'', 'http', 'https', 'mailto'}
+IMAGE_SCHEMES = {'', 'http', 'https'}
+DATA_IMAGE = re.compile(r'^data:image/(png|jpeg|gif|webp);base64,[a-z0-9+/=\s]+$', re.IGNORECASE)
+# Video embeds added with Summernote's video button
+IFRAME_HOSTS = {'www.youtube.com', 'www.youtube-nocookie.com', 'player.vimeo.com'}
+
+ALLOWED_STYLES = {
+    'color', 'background-color', 'text-align', 'text-decoration', 'font-weight', 'font-style',
+    'font-size', 'font-family', 'line-height', 'width', 'height', 'float', 'margin', 'margin-left', 'margin-right',
+}
+SAFE_STYLE_VALUE = re.compile(r'^[\w\s#%.,()\'"-]+$')
+
+# Sizes hint for images in the body, which is never wider than the container on the detail page
+BODY_IMAGE_SIZES = '(min-width: 1200px) 1110px, 100vw'
+
+
+def is_safe_url(url, schemes):
+    # Browsers ignore control characters and whitespace in schemes, e.g. "java\tscript:"
+    cleaned = re.sub(r'[\x00-\x20]+', '', url)
+    try:
+        return urlsplit(cleaned).scheme.lower() in schemes
+    except ValueError:
+        return False
+
+
+def clean_style(style):
+    declarations = []
+    for declaration in style.split(';'):
+        name, _, value = declaration.partition(':')
+        name, value = name.strip().lower(), value.strip()
+
+        if name in ALLOWED_STYLES and SAFE_STYLE_VALUE.match(value) and 'expression' not in value.lower() \
+                and 'url' not in value.lower():
+            declarations.append(f"{name}: {value}")
+
+    return '; '.join(declarations)
+
+
+def get_media_name(src):
+    """ The storage name of an image uploaded to our media storage, or None for anything else """
+
+    if src.startswith(settings.MEDIA_URL) and '..' not in src:
+        return unquote(src[len(settings.MEDIA_URL):].split('?')[0])
+    return None
+
+
+class Sanitiser(HTMLParser):
+
+    def __init__(self, rewrite_images=True):
+        super().__init__(convert_charrefs=True)
+        self.rewrite_images = rewrite_images
+        self.output = []
+        self.open_tags = []
+        self.dropping = []
+
+    def clean_attributes(self, tag, attrs):
+        allowed = ALLOWED_TAGS[tag] | GLOBAL_ATTRIBUTES
+        cleaned = {}
+
+        for name, value in attrs:
+            name = name.lower()
+            value = value or ''
+
+            if name not in allowed:
+                continue
+            if name == 'href' and not is_safe_url(value, LINK_SCHEMES):
+                continue
+            if name == 'src' and tag == 'img' and not (is_safe_url(value, IMAGE_SCHEMES) or DATA_IMAGE.match(value)):
+                continue
+            if name in ('width', 'height') and not value.rstrip('%').isdigit():
+                continue
+            if name == 'style':
+                value = clean_style(value)
+                if not value:
+                    continue
+
+            cleaned[name] = value
+
+        return cleaned
+
+    def is_allowed_iframe(self, attrs):
+        src = urlsplit(dict(attrs).get('src') or '')
+        return src.scheme == 'https' and src.hostname in IFRAME_HOSTS
+
+    def write_tag(self, tag, attrs):
+        rendered = ''.join(f' {name}="{escape(value)}"' for name, value in attrs.items())
+        self.output.append(f'<{tag}{rendered}>')
+
+    def write_image(self, attrs):
+        if not attrs.get('src'):
+            return
+
+        attrs['loading'] = 'lazy'
+        name = get_media_name(attrs['src']) if self.rewrite_images else None
+        variants = get_or_create_variants(name) if name else {}
+
+        if not variants:
+            self.write_tag('img', attrs)
+            return
+
+        # Same markup as the {% feature_image %} tag: WebP first for browsers that support it
+        self.output.append('<picture>')
+        for ext, widths in sorted(variants.items(), key=lambda variant: variant[0] != 'webp'):
+            self.write_tag('source', {
+                'type': MIME_TYPES[ext], 'srcset': get_srcset(name, ext, widths), 'sizes': BODY_IMAGE_SIZES
+            })
+        self.write_tag('img', attrs)
+        self.output.append('</picture>')
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropping:
+            if tag == self.dropping[-1]:
+                self.dropping.append(tag)
+            return
+
+        if tag == 'iframe' and self.is_allowed_iframe(attrs):
+            self.write_tag('iframe', dict(self.clean_attributes(tag, attrs), loading='lazy'))
+            self.output.append('</iframe>')
+            self.dropping.append(tag)
+            return
+
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping.append(tag)
+            return
+
+        if tag not in ALLOWED_TAGS:
+            return
+
+        attrs = self.clean_attributes(tag, attrs)
+
+        if tag == 'img':
+            self.write_image(attrs)
+            return
+
+        if tag == 'a' and attrs.get('target'):
+            attrs['target'] = '_blank'
+            attrs['rel'] = 'noopener noreferrer'
+
+        self.write_tag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            if tag == self.dropping[-1]:
+                self.dropping.pop()
+            return
+
+        # Close anything left open inside this tag, and ignore end tags that were never opened
+        if tag in self.open_tags:
+            while True:
+                open_tag = self.open_tags.pop()
+                self.output.append(f'</{open_tag}>')
+                if open_tag == tag:
+                    break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.output.append(escape(data, quote=False))
+
+    def get_html(self):
+        self.close()
+        while self.open_tags:
+            self.output.append(f'</{self.open_tags.pop()}>')
+        return ''.join(self.output)
+
+
+def sanitise(body, rewrite_images=True):
+    """ Returns a safe copy of some user supplied HTML """
+
+    if not body:
+        return ''
+
+    sanitiser = Sanitiser(rewrite_images=rewrite_images)
+    sanitiser.feed(body)
+    return sanitiser.get_html()
@@ -0,0 +1,189 @@
+"""
+Full-text search over published posts.
+
+Each published post has a row in the blog_post_search table holding its title, the plain text of
+its body and its author's names. On SQLite that table is an FTS5 index ranked with BM25. On
+PostgreSQL it's an ordinary table with a weighted tsvector column and a GIN index. The table is
+created by migration 0009_post_search and kept up to date by signals in blog.signals. If it
+ever drifts, `python manage.py rebuild_search_index` rebuilds it.
+
+Search terms are matched as prefixes, so "djan" finds "Django", and every term has to match.
+"""
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from .models import Post
+from .summary import html_to_text
+import re
+
+TABLE = 'blog_post_search'
+
+# Column weights for bm25(): a match in the title counts for more than one in the author's name or the body
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+AUTHOR_WEIGHT = 5.0
+
+# Only letters and numbers are searched for, so nothing typed can be read as query syntax
+TERMS = re.compile(r'\w+', re.UNICODE)
+
+# Snippets are marked up with these while the text is escaped, then they're swapped for <mark> tags
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+
+def is_supported(vendor=None):
+    return (vendor or connection.vendor) in ('sqlite', 'postgresql')
+
+
+def create_table(schema_editor):
+    """ Creates the search table for the database being migrated. Other backends get no index. """
+
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE} USING fts5(title, body, author, tokenize='porter unicode61')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE {TABLE} ("
+            f"post_id integer PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            f"title text NOT NULL, body text NOT NULL, author text NOT NULL, document tsvector NOT NULL)"
+        )
+        schema_editor.execute(f"CREATE INDEX {TABLE}_document_idx ON {TABLE} USING GIN (document)")
+
+
+def drop_table(schema_editor):
+    if is_supported(schema_editor.connection.vendor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def get_document(post):
+    """ The (title, body, author) text indexed for a post """
+
+    author = post.author
+    author_names = ' '.join(name for name in (author.first_name, author.last_name, author.username) if name)
+
+    return post.title, html_to_text(post.body_html or post.body), author_names
+
+
+def index_posts(posts):
+    """ Adds or replaces the search rows for some posts. Posts that aren't published are removed instead. """
+
+    posts = list(posts)
+    if not posts or not is_supported():
+        return
+
+    remove_posts([post.pk for post in posts])
+
+    rows = [(post.pk, *get_document(post)) for post in posts if post.status == 'published']
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(f"INSERT INTO {TABLE} (rowid, title, body, author) VALUES (%s, %s, %s, %s)", rows)
+        else:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (post_id, title, body, author, document) VALUES (%s, %s, %s, %s, "
+                f"setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B') || "
+                f"setweight(to_tsvector('english', %s), 'C'))",
+                [(post_id, title, body, author, title, author, body) for post_id, title, body, author in rows]
+            )
+
+
+def index_post(post):
+    index_posts([post])
+
+
+def remove_posts(post_ids):
+    if not post_ids or not is_supported():
+        return
+
+    key = 'rowid' if connection.vendor == 'sqlite' else 'post_id'
+    placeholders = ', '.join(['%s'] * len(post_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {key} IN ({placeholders})", list(post_ids))
+
+
+def clear():
+    if is_supported():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+
+
+def get_terms(query):
+    return TERMS.findall(query.lower())[:settings.SEARCH_MAX_TERMS]
+
+
+def format_snippet(snippet):
+    """ Escapes a snippet and highlights the matched words """
+
+    snippet = escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+    return mark_safe(snippet)
+
+
+def find_matches(terms, limit, offset):
+    """ Returns a list of (post id, snippet) for the best matches, best first """
+
+    # Searches are reads, so they can go to a read replica like any other query for posts
+    database = connections[router.db_for_read(Post)]
+
+    if database.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = (
+            f"SELECT rowid, snippet({TABLE}, 1, %s, %s, '…', 24) FROM {TABLE} WHERE {TABLE} MATCH %s "
+            f"ORDER BY bm25({TABLE}, %s, %s, %s) LIMIT %s OFFSET %s"
+        )
+        params = [MATCH_START, MATCH_END, match, TITLE_WEIGHT, BODY_WEIGHT, AUTHOR_WEIGHT, limit, offset]
+    else:
+        match = ' & '.join(f'{term}:*' for term in terms)
+        sql = (
+            f"SELECT post_id, ts_headline('english', body, query, %s) FROM {TABLE}, to_tsquery('english', %s) query "
+            f"WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC, post_id DESC LIMIT %s OFFSET %s"
+        )
+        options = f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords=35, MinWords=15'
+        params = [options, match, limit, offset]
+
+    with database.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_posts(query, page=1, page_size=None):
+    """
+    Returns (results, has_next) for one page of published posts matching a query, best match first.
+    Each result is a Post (loaded with the card fields) with a `snippet` attribute showing where it matched.
+    """
+
+    if page_size is None:
+        page_size = settings.SEARCH_RESULTS_PER_PAGE
+
+    terms = get_terms(query)
+    if not terms:
+        return [], False
+
+    if not is_supported():
+        # No full-text index on this database, so fall back to a (slow) scan of the titles
+        posts = Post.objects.published_cards().filter(title__icontains=' '.join(terms)).order_by('-published')
+        matches = [(post.pk, '') for post in posts[(page - 1) * page_size:page * page_size + 1]]
+    else:
+        matches = find_matches(terms, page_size + 1, (page - 1) * page_size)
+
+    has_next = len(matches) > page_size
+    matches = matches[:page_size]
+
+    posts = Post.objects.published_cards().in_bulk([post_id for post_id, _ in matches])
+
+    results = []
+    for post_id, snippet in matches:
+        # The index is updated in the same transaction as the post, but skip anything that's gone regardless
+        if post_id in posts:
+            post = posts[post_id]
+            post.snippet = format_snippet(snippet)
+            results.append(post)
+
+    return results, has_next
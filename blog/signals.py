@@ -0,0 +1,72 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from bloggingplatform import caching
+from userprofile.models import Follower
+from .models import Post, Comment, Like
+from .timeline import backfill, remove_author
+from . import like_buffer, search
+
+
+@receiver(post_save, sender=Follower)
+def add_followed_posts(sender, instance, created, **kwargs):
+    if created:
+        backfill(instance)
+
+
+@receiver(post_delete, sender=Follower)
+def remove_unfollowed_posts(sender, instance, **kwargs):
+    remove_author(instance)
+
+
+def update_post_count(field, post_id, delta):
+    """ Adjusts a denormalised counter on a post in the database, so concurrent likes and comments can't lose updates """
+
+    Post.objects.filter(pk=post_id).update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Like)
+def increment_like_count(sender, instance, created, **kwargs):
+    if created:
+        like_buffer.record(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Like)
+def decrement_like_count(sender, instance, **kwargs):
+    like_buffer.record(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    if created:
+        update_post_count('comment_count', instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    update_post_count('comment_count', instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, **kwargs):
+    # Drafts are removed, in case the post was published before
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_caches(sender, instance, **kwargs):
+    caching.invalidate(caching.post(instance.pk), caching.author(instance.author_id), caching.LISTINGS)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_post_event_caches(sender, instance, **kwargs):
+    caching.invalidate(caching.post(instance.post_id))
@@ -26,7 +26,6 @@ form.submit((e) => {
             const requestUserID = e.target.dataset.userid
 
             addCommentsToPage([result.comment])
-            sessionStorage.removeItem("comments")
 
             counter.innerText = parseInt(counter.innerText) + 1
 
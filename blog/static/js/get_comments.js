@@ -6,36 +6,45 @@ $(document).ready(function () {
 
     const url = commentsContainer[0].dataset.ajaxurl
 
-    const cachedComments = sessionStorage.getItem("comments")
+    loadComments(url)
 
-    if (cachedComments) {
-        addCommentsToPage(JSON.parse(cachedComments))
-
-    } else {
-        $.ajax({
-            type: 'GET',
-            url: url,
-            cache: true,
-            success: function (result, status, xhr) {
+    // Further pages are only fetched when the reader asks for them
+    $('.load-more-comments').click(function (e) {
+        e.preventDefault()
+        loadComments(e.target.dataset.url)
+    })
 
-                if (result.status != 'success') {
-                    console.log('An error occurred')
-                    return
-                }
+});
 
-                const comments = result.comments
-                sessionStorage.setItem("comments", JSON.stringify(comments))
+function loadComments(url) {
 
-                // Update comment count
-                $('.comment-count')[0].innerText = comments.length
-                addCommentsToPage(comments)
+    // The server sends an ETag, so the browser can revalidate cached pages and get a 304 back
+    $.ajax({
+        type: 'GET',
+        url: url,
+        cache: true,
+        success: function (result, status, xhr) {
 
+            if (result.status != 'success') {
+                console.log('An error occurred')
+                return
             }
-        })
-    }
 
+            // Update comment count
+            $('.comment-count')[0].innerText = result.count
+            addCommentsToPage(result.comments)
 
-});
+            const loadMore = $('.load-more-comments')
+            if (result.next) {
+                loadMore[0].dataset.url = result.next
+                loadMore.removeClass('d-none')
+            } else {
+                loadMore.addClass('d-none')
+            }
+
+        }
+    })
+}
 
 export function addCommentsToPage(comments) {
 
@@ -76,14 +85,15 @@ export function addCommentsToPage(comments) {
         commentCard.append(commentFooter)
         commentsList.append(commentCard)
 
-    }
+        // Only the new card needs a listener; earlier pages already have theirs
+        const deleteForm = commentFooter.querySelector('.delete-comment-form')
 
-    const deleteForms = [...$('.delete-comment-form')]
+        if (deleteForm) {
+            deleteForm.addEventListener('submit', e => {
+                deleteComment(e)
+            })
+        }
 
-    deleteForms.forEach(form => {
-        form.addEventListener('submit', e => {
-            deleteComment(e)
-        })
-    })
+    }
 
 }
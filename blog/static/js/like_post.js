@@ -0,0 +1,33 @@
+// like_post.js
+//
+// Used in post_detail.html
+//
+// Sends a like/unlike to the server when the heart is pressed and shows the post's new like count.
+
+const likeForm = $('#like')
+
+likeForm.submit((e) => {
+    e.preventDefault()
+
+    const formData = new FormData(e.target)
+    formData.append('action', e.target.dataset.action)
+
+    $.ajax({
+        data: formData,
+        type: e.target.method,
+        url: e.target.dataset.url,
+        processData: false,
+        contentType: false,
+
+        success: function (result, status, xhr) {
+            if (result.status != 'success') {
+                return
+            }
+
+            e.target.dataset.action = result.liked ? 'unlike' : 'like'
+            $('#like .like-count').text(result.like_count)
+            $('#like i').toggleClass('fas', result.liked).toggleClass('far', !result.liked)
+            $('#like button').blur()
+        }
+    })
+})
@@ -68,9 +68,21 @@ $("#profileUpload").submit(function (event) {
         contentType: false,
         success: function (result, status, xhr) {
             if (status == 'success') {
-                const photo = $("#profile_picture img")[0]
-                photo.src = result.photo_url
+                waitForPhoto(result)
             }
         },
     })
-})
\ No newline at end of file
+})
+
+// The server crops photos in the background, so poll the job until the finished image is ready
+
+function waitForPhoto(job) {
+    if (job.status == 'DONE') {
+        const photo = $("#profile_picture img")[0]
+        photo.src = job.photo_url
+    } else if (job.status == 'PENDING' || job.status == 'PROCESSING') {
+        setTimeout(() => $.get(job.job_url, waitForPhoto), 1000)
+    } else {
+        console.log('An error occurred', job.error)
+    }
+}
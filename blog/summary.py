@@ -0,0 +1,48 @@
+"""
+Plain-text summaries of posts: an excerpt, a word count and a reading time.
+
+These are worked out from the Summernote HTML when a post is saved and stored on the post,
+so cards can show them without touching the body.
+"""
+
+from django.conf import settings
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+import html
+import math
+import re
+
+# Content that shouldn't be counted as words
+HIDDEN_CONTENT = re.compile(r'<(script|style)[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+# Tags that separate words, so "<p>end</p><p>start</p>" doesn't become "endstart"
+BLOCK_BOUNDARY = re.compile(r'<(br|/?p|/?div|/?li|/?h[1-6]|/?blockquote|/?pre|/?td|/?tr)\b[^>]*>', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+# Size of the excerpt column, for bodies with very long words such as pasted links
+MAX_EXCERPT_LENGTH = 500
+
+
+def html_to_text(body):
+    """ The visible text of some HTML, on one line """
+
+    if not body:
+        return ''
+
+    body = HIDDEN_CONTENT.sub(' ', body)
+    body = BLOCK_BOUNDARY.sub(' ', body)
+    text = html.unescape(strip_tags(body))
+
+    return WHITESPACE.sub(' ', text).strip()
+
+
+def summarise(body):
+    """ Returns (excerpt, word_count, reading_time) for a post body. Reading time is in whole minutes. """
+
+    text = html_to_text(body)
+    word_count = len(text.split())
+
+    excerpt = Truncator(text).words(settings.POST_EXCERPT_WORDS, truncate='…')
+    excerpt = Truncator(excerpt).chars(MAX_EXCERPT_LENGTH, truncate='…')
+    reading_time = math.ceil(word_count / settings.WORDS_PER_MINUTE) if word_count else 0
+
+    return excerpt, word_count, reading_time
@@ -0,0 +1,28 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from blog.images import parse_variants, get_srcset, MIME_TYPES
+
+register = template.Library()
+
+
+@register.simple_tag
+def feature_image(post, sizes='100vw', css_class='', alt=''):
+    """
+    Renders a post's feature image as a <picture> offering the resized variants made by blog.images,
+    so browsers download the smallest file that fits. WebP is listed first for browsers that support it.
+
+    Usage: {% feature_image post sizes="(min-width: 768px) 33vw, 100vw" css_class="card-img-top" %}
+    """
+
+    image = post.feature_image
+    variants = sorted(parse_variants(post.feature_image_variants).items(), key=lambda variant: variant[0] != 'webp')
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((MIME_TYPES[ext], get_srcset(image.name, ext, widths), sizes) for ext, widths in variants)
+    )
+
+    return format_html(
+        '<picture>{}<img src="{}" class="{}" alt="{}" loading="lazy"></picture>',
+        sources, image.url, css_class, alt or post.title
+    )
@@ -1,7 +1,14 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.core.management import call_command
+from blog import like_buffer
 from django.contrib.auth import get_user_model
-from blog.models import Post, Comment
+from blog.models import Post, Comment, Like
 from django.urls import reverse
+from django.core.cache import caches
+from django.utils import timezone
+from django.db import connection, IntegrityError, transaction
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
 import json
 
 USER_MODEL = get_user_model()
@@ -57,6 +64,9 @@ class TestGetComments(TestCase):
         cls.post_url = reverse('post_detail', args=[cls.post.author.username, cls.post.slug])
         cls.client = Client()
 
+    def setUp(self):
+        caches['pages'].clear()
+
     def test_get_request(self):
         """ Tests a request to fetch comments for a given post is successful """
         response = self.client.get(self.url)
@@ -100,6 +110,132 @@ class TestGetComments(TestCase):
         self.assertEqual(len(json_response['comments']), 3)
 
 
+class TestGetCommentsPagination(TestCase):
+    """
+    Tests paging and revalidation of the comments endpoint.
+    - Is the number of comments returned limited?
+    - Does following 'next' return the rest of the comments?
+    - Does a request with a matching ETag get a 304?
+    - Does a new comment change the ETag?
+    - Is the number of queries the same regardless of how many comments there are?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = USER_MODEL.objects.create_user(
+            first_name='Tom',
+            last_name='Thomas',
+            email='tomthomas@test.com',
+            username='tomthomas',
+            password='password123'
+        )
+        cls.reader = USER_MODEL.objects.create_user(
+            first_name='Jane',
+            last_name='Doe',
+            email='janedoe@test.com',
+            username='janedoe',
+            password='password123'
+        )
+        cls.post = Post.objects.create(
+            title='My post',
+            body='this is a post',
+            author=cls.author
+        )
+        for i in range(5):
+            cls.add_comment(f'comment {i}')
+
+        cls.url = reverse('get_comments', args=[cls.post.id])
+        cls.client = Client()
+
+    @classmethod
+    def add_comment(cls, body):
+        return Comment.objects.create(
+            user_from=cls.reader.profile,
+            user_to=cls.author.profile,
+            post=cls.post,
+            body=body
+        )
+
+    def test_limit(self):
+        """ Tests only 'limit' comments are returned, with a link to the next page """
+
+        response = json.loads(self.client.get(self.url, {'limit': 2}).content)
+
+        self.assertEqual([c['body'] for c in response['comments']], ['comment 0', 'comment 1'])
+        self.assertEqual(response['count'], 5)
+        self.assertIsNotNone(response['next'])
+
+    def test_follow_next(self):
+        """ Tests following 'next' returns every comment once, then stops """
+
+        bodies = []
+        url = f'{self.url}?limit=2'
+
+        while url:
+            response = json.loads(self.client.get(url).content)
+            bodies += [c['body'] for c in response['comments']]
+            url = response['next']
+
+        self.assertEqual(bodies, [f'comment {i}' for i in range(5)])
+
+    def test_invalid_limit(self):
+        """ Tests a limit that isn't a positive number is rejected """
+
+        self.assertEqual(self.client.get(self.url, {'limit': 'lots'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, 400)
+
+    def test_not_modified(self):
+        """ Tests revalidating with the ETag returns a 304 """
+
+        response = self.client.get(self.url)
+
+        self.assertIn('Last-Modified', response)
+        revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_new_comment_changes_etag(self):
+        """ Tests a new comment means clients get the full response again """
+
+        etag = self.client.get(self.url)['ETag']
+        self.add_comment('a new comment')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted_comment_changes_etag(self):
+        """ Tests deleting an older comment also changes the ETag """
+
+        etag = self.client.get(self.url)['ETag']
+        Comment.objects.filter(body='comment 0').delete()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_count_is_constant(self):
+        """ Tests comment authors are loaded in the same query as the comments """
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+
+        for i in range(10):
+            self.add_comment(f'more {i}')
+
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.url)
+
+        self.assertEqual(len(few), len(many))
+
+    def test_missing_post(self):
+        """ Tests a post that doesn't exist returns a 404 """
+
+        response = self.client.get(reverse('get_comments', args=[self.post.id + 100]))
+
+        self.assertEqual(response.status_code, 404)
+
+
 class TestAddComment(TestCase):
     """
     Tests ability to submit comments on the post-detail page over AJAX
@@ -257,3 +393,219 @@ class TestDeleteComment(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertFalse(Comment.objects.all().exists())
+
+
+# Like counts are written straight away here. TestLikeBuffer covers the buffered path.
+@override_settings(LIKE_FLUSH_INTERVAL=0)
+class TestTogglePostLike(TestCase):
+    """
+    Tests the like/unlike endpoint and the like/comment counters on Post.
+    - Are non-logged in users and GET requests blocked?
+    - Does liking twice leave a single like, and unliking twice do nothing?
+    - Can a user only like a post once at the database level?
+    - Are like_count and comment_count kept in step?
+    - Do the index cards render the counters without counting likes?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = USER_MODEL.objects.create_user(
+            first_name='Jane',
+            last_name='Doe',
+            email='janedoe@test.com',
+            username='janedoe',
+            password='password123'
+        )
+        cls.author = USER_MODEL.objects.create_user(
+            first_name='Tom',
+            last_name='Thomas',
+            email='tomthomas@test.com',
+            username='tomthomas',
+            password='password123'
+        )
+        cls.post = Post.objects.create(
+            title='Test Title',
+            body='Test text',
+            author=cls.author,
+            status='published',
+            published=timezone.now()
+        )
+        cls.url = reverse('toggle_post_like', args=[cls.post.id])
+
+    def like(self, action='like'):
+        self.client.force_login(self.reader)
+        return self.client.post(self.url, {'action': action})
+
+    def test_login_requirement(self):
+        """ Tests non-logged in users are redirected """
+        response = self.client.post(self.url, {'action': 'like'})
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_get_fails(self):
+        """ Tests a get request is rejected """
+        self.client.force_login(self.reader)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_bad_action(self):
+        """ Tests an unknown action returns a 400 """
+        response = self.like('love')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_author_blocked(self):
+        """ Tests an author cannot like their own post """
+        self.client.force_login(self.author)
+        response = self.client.post(self.url, {'action': 'like'})
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_like_is_idempotent(self):
+        """ Tests liking a post twice leaves one like """
+        self.like()
+        response = self.like()
+
+        self.assertEqual(json.loads(response.content), {'status': 'success', 'liked': True, 'like_count': 1})
+        self.assertEqual(self.post.likes.count(), 1)
+
+    def test_unlike_is_idempotent(self):
+        """ Tests unliking removes the like and repeating it does nothing """
+        self.like()
+        self.like('unlike')
+        response = self.like('unlike')
+
+        self.assertEqual(json.loads(response.content)['like_count'], 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_unique_like(self):
+        """ Tests the database refuses a second like from the same user """
+        Like.objects.create(user_from=self.reader.profile, user_to=self.author.profile, post=self.post)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Like.objects.create(user_from=self.reader.profile, user_to=self.author.profile, post=self.post)
+
+    def test_comment_count(self):
+        """ Tests comment_count follows comments being added and deleted """
+        comment = Comment.objects.create(
+            user_from=self.reader.profile, user_to=self.author.profile, post=self.post, body='Nice'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_cards_do_not_count(self):
+        """ Tests the index renders the stored like count without querying the like table """
+        self.like()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+
+        self.assertEqual(response.context['posts'][0].like_count, 1)
+        self.assertFalse([q for q in queries.captured_queries if 'blog_like' in q['sql']])
+
+
+@override_settings(LIKE_FLUSH_INTERVAL=3600, NOTIFICATION_OUTBOX_WORKER=False)
+class TestLikeBuffer(TransactionTestCase):
+    """
+    Tests the write-behind like counter. A TransactionTestCase is used so that on_commit callbacks run.
+    - Is the Like row saved straight away while the total waits for a flush?
+    - Does a flush recount every post it touches in one UPDATE?
+    - Do a like and unlike before a flush cancel out?
+    - Do flushes from processes that saw a like and unlike in the wrong order still leave the right total?
+    - Can lost deltas be rebuilt from the Like rows?
+    """
+
+    def setUp(self):
+        like_buffer.take()
+
+        self.reader = USER_MODEL.objects.create_user(
+            first_name='Jane', last_name='Doe', email='janedoe@test.com', username='janedoe', password='password123'
+        )
+        self.author = USER_MODEL.objects.create_user(
+            first_name='Tom', last_name='Thomas', email='tomthomas@test.com', username='tomthomas', password='password123'
+        )
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', author=self.author, status='published', published=timezone.now())
+            for i in range(3)
+        ]
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        like_buffer.take()
+
+    def like(self, post, action='like'):
+        return self.client.post(reverse('toggle_post_like', args=[post.id]), {'action': action})
+
+    def like_count(self, post):
+        return Post.objects.values_list('like_count', flat=True).get(id=post.id)
+
+    def test_like_is_buffered(self):
+        """ Tests the like is saved immediately and the count is written on flush """
+        response = self.like(self.posts[0])
+
+        self.assertTrue(Like.objects.filter(post=self.posts[0]).exists())
+        self.assertEqual(json.loads(response.content)['like_count'], 1)
+        self.assertEqual(self.like_count(self.posts[0]), 0)
+
+        like_buffer.flush()
+
+        self.assertEqual(self.like_count(self.posts[0]), 1)
+
+    def test_flush_batches_updates(self):
+        """ Tests every post liked since the last flush is updated together """
+        for post in self.posts:
+            self.like(post)
+
+        with CaptureQueriesContext(connection) as queries:
+            flushed = like_buffer.flush()
+
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(flushed, 3)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual([self.like_count(post) for post in self.posts], [1, 1, 1])
+
+    def test_unlike_cancels_like(self):
+        """ Tests a like and unlike between flushes leave nothing to write """
+        self.like(self.posts[0])
+        self.like(self.posts[0], 'unlike')
+
+        self.assertEqual(like_buffer.flush(), 0)
+        self.assertEqual(self.like_count(self.posts[0]), 0)
+
+    def test_flushes_out_of_order(self):
+        """ Tests an unlike flushed before the like it undoes doesn't leave the count too high """
+        self.like(self.posts[0])
+        # As if another process served the like and hasn't flushed it yet
+        other_process = like_buffer.take()
+        self.like(self.posts[0], 'unlike')
+
+        like_buffer.flush()
+        like_buffer.apply_deltas(other_process)
+
+        self.assertEqual(self.like_count(self.posts[0]), 0)
+
+    def test_recount_after_crash(self):
+        """ Tests recount_likes restores totals whose deltas were never flushed """
+        self.like(self.posts[0])
+        self.like(self.posts[1])
+        like_buffer.take()
+
+        call_command('recount_likes', stdout=StringIO())
+
+        self.assertEqual([self.like_count(post) for post in self.posts], [1, 1, 0])
+
+    def test_save_keeps_counts(self):
+        """ Tests saving a post loaded before a flush doesn't overwrite its like count """
+        post = Post.objects.get(id=self.posts[0].id)
+        self.like(post)
+        like_buffer.flush()
+
+        post.title = 'New title'
+        post.save()
+
+        self.assertEqual(self.like_count(post), 1)
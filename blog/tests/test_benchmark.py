@@ -0,0 +1,155 @@
+from blog.management.commands.benchmark import percentile
+from blog.models import Post, Like, Comment, TimelineEntry
+from blog.search import search_posts
+from notification.models import Notification
+from userprofile.models import Profile, Follower
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+
+USER_MODEL = get_user_model()
+
+
+class TestGenerateSampleData(TestCase):
+    """
+    Test the generate_sample_data command.
+    Things to test:
+    - Does it create the requested number of users (with profiles) and posts?
+    - Are the denormalised counters and derived fields filled in, as the signals and Post.save would have?
+    - Are published posts searchable and fanned out to their followers' timelines?
+    - Does the same seed generate the same data?
+    """
+
+    def generate(self, **options):
+        options = dict(users=20, posts=40, follows=5, comments=2, likes=4, notifications=3, **options)
+        call_command('generate_sample_data', stdout=StringIO(), **options)
+
+    def test_creates_rows(self):
+        """ Tests users, profiles, posts and events are created """
+
+        self.generate()
+
+        self.assertEqual(USER_MODEL.objects.filter(username__startswith='sample').count(), 20)
+        self.assertEqual(Profile.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertTrue(Follower.objects.exists())
+        self.assertTrue(Like.objects.exists())
+        self.assertTrue(Comment.objects.exists())
+        self.assertTrue(Notification.objects.exists())
+        self.assertTrue(self.client.login(username='sample0@example.com', password='password123'))
+
+    def test_counters_and_derived_fields(self):
+        """ Tests the counters match the rows and posts have their body_html and summary """
+
+        self.generate()
+
+        for profile in Profile.objects.all():
+            self.assertEqual(profile.follower_count, profile.rel_to_set.count())
+            self.assertEqual(profile.following_count, profile.rel_from_set.count())
+            self.assertEqual(profile.unread_notifications, profile.notifications.filter(read_at__isnull=True).count())
+
+        for post in Post.objects.all():
+            self.assertEqual(post.like_count, post.likes.count())
+            self.assertEqual(post.comment_count, post.comments.count())
+            self.assertTrue(post.body_html)
+            self.assertTrue(post.excerpt)
+            self.assertTrue(post.slug)
+
+    def test_search_and_timelines(self):
+        """ Tests published posts are indexed for search and on their followers' timelines """
+
+        self.generate()
+
+        post = Post.objects.published().exclude(author__profile__follower_count=0).first()
+        results, _ = search_posts(post.title, page_size=50)
+
+        self.assertIn(post, results)
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(), post.author.profile.follower_count
+        )
+
+    def test_seed(self):
+        """ Tests two runs with the same seed create the same posts """
+
+        self.generate(prefix='first')
+        self.generate(prefix='second')
+
+        first = Post.objects.filter(author__username__startswith='first').order_by('pk')
+        second = Post.objects.filter(author__username__startswith='second').order_by('pk')
+        self.assertEqual([post.body for post in first], [post.body for post in second])
+
+    def test_prefix_in_use(self):
+        """ Tests running it twice with the same prefix is refused """
+
+        self.generate()
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+class TestBenchmark(TestCase):
+    """
+    Test the benchmark command.
+    Things to test:
+    - Are the results saved as JSON with percentiles and query counts for every route?
+    - Can a run be compared with an earlier one?
+    - Are percentiles worked out correctly?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_sample_data', users=10, posts=20, stdout=StringIO())
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.output = os.path.join(directory, 'results.json')
+        self.addCleanup(shutil.rmtree, directory)
+
+    def test_saves_results(self):
+        """ Tests every route is measured and saved """
+
+        call_command('benchmark', requests=3, warmup=1, output=self.output, stdout=StringIO())
+
+        with open(self.output) as f:
+            report = json.load(f)
+
+        self.assertEqual(report['requests'], 3)
+        self.assertIn('feed', report['routes'])
+        for result in report['routes'].values():
+            self.assertEqual(result['status'], [200])
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries'], 0)
+
+    def test_compare(self):
+        """ Tests one route can be run and compared against an earlier run """
+
+        earlier = self.output.replace('results', 'earlier')
+        call_command('benchmark', requests=2, warmup=0, output=earlier, routes=['index'], stdout=StringIO())
+        stdout = StringIO()
+        call_command(
+            'benchmark', requests=2, warmup=0, output=self.output, routes=['index'], compare=earlier, stdout=stdout
+        )
+
+        self.assertIn('Change since the earlier run', stdout.getvalue())
+        self.assertIn('queries +0', stdout.getvalue())
+
+    def test_unknown_route(self):
+        """ Tests asking for a route that doesn't exist is an error """
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark', routes=['nope'], output=self.output, stdout=StringIO())
+
+    def test_percentile(self):
+        """ Tests nearest-rank percentiles """
+
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([5], 95), 5)
@@ -0,0 +1,142 @@
+from blog.images import create_variants, parse_variants, variant_name, get_formats, get_variant_widths
+from blog.models import Post
+from blog.templatetags.blog_images import feature_image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from io import BytesIO, StringIO
+from PIL import Image
+import shutil
+import tempfile
+
+USER_MODEL = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(width, height):
+    output = BytesIO()
+    Image.new('RGB', (width, height), color='red').save(output, format='JPEG')
+    return output.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestFeatureImageVariants(TestCase):
+    """
+    Things to test:
+    - Are variants created at each width smaller than the original?
+    - Are images never scaled up?
+    - Does an image exactly as wide as a variant get that variant?
+    - Does uploading a feature image create its variants?
+    - Does the template tag list the variants in a srcset?
+    - Does the backfill command create variants for existing posts?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com',
+            first_name='Jane',
+            last_name='Doe',
+            username='user123',
+            password='password456'
+        )
+        cls.client = Client()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_create_variants(self):
+        """ Tests a 1000px image gets 320px, 640px and full size copies in every supported format """
+
+        name = default_storage.save('uploads/test.jpg', ContentFile(make_image(1000, 500)))
+
+        variants = parse_variants(create_variants(name))
+
+        for ext in get_formats():
+            self.assertEqual(variants[ext], [320, 640, 1000])
+
+        with default_storage.open(variant_name(name, 640, 'jpg')) as f, Image.open(f) as image:
+            self.assertEqual(image.size, (640, 320))
+
+    def test_small_images_not_scaled_up(self):
+        """ Tests an image narrower than every variant width gets no variants """
+
+        name = default_storage.save('uploads/small.jpg', ContentFile(make_image(200, 100)))
+
+        self.assertEqual(create_variants(name), '')
+
+    def test_variant_widths(self):
+        """ Tests an image as wide as a variant width gets a copy at that width, and only one """
+
+        self.assertEqual(get_variant_widths(1280), [320, 640, 1280])
+        self.assertEqual(get_variant_widths(640), [320, 640])
+        self.assertEqual(get_variant_widths(1000), [320, 640, 1000])
+        self.assertEqual(get_variant_widths(4000), [320, 640, 1280])
+
+        name = default_storage.save('uploads/exact.jpg', ContentFile(make_image(1280, 640)))
+        self.assertEqual(parse_variants(create_variants(name))['jpg'], [320, 640, 1280])
+
+    def test_missing_file(self):
+        """ Tests a missing file produces no variants rather than an error """
+
+        self.assertEqual(create_variants('uploads/does-not-exist.jpg'), '')
+
+    def test_upload_creates_variants(self):
+        """ Tests adding a post with a feature image records its variants """
+
+        self.client.force_login(self.user)
+
+        form_data = {
+            'title': 'my title',
+            'body': 'This is the post body',
+            'feature_image': SimpleUploadedFile('photo.jpg', make_image(700, 700), content_type='image/jpeg'),
+        }
+        self.client.post(reverse('add'), data=form_data)
+
+        post = Post.objects.get(title='my title')
+
+        self.assertEqual(parse_variants(post.feature_image_variants)['jpg'], [320, 640, 700])
+
+    def test_template_tag(self):
+        """ Tests the template tag offers each variant in a srcset and lazy loads the image """
+
+        name = default_storage.save('uploads/tag.jpg', ContentFile(make_image(1000, 500)))
+        post = Post(title='Tagged', author=self.user, feature_image=name, feature_image_variants=create_variants(name))
+
+        html = feature_image(post, sizes='33vw', css_class='card-img-top')
+
+        self.assertIn('tag-320w.jpg 320w', html)
+        self.assertIn('tag-640w.jpg 640w', html)
+        # The srcset has to reach the original's width, or wide screens get a blurry 640px image
+        self.assertIn('tag-1000w.jpg 1000w', html)
+        self.assertIn('sizes="33vw"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('alt="Tagged"', html)
+
+    def test_template_tag_without_variants(self):
+        """ Tests posts without variants still render their image """
+
+        post = Post(title='Plain', author=self.user, feature_image='uploads/plain.jpg')
+
+        html = feature_image(post)
+
+        self.assertNotIn('<source', html)
+        self.assertIn('src="/media/uploads/plain.jpg"', html)
+
+    def test_backfill_command(self):
+        """ Tests the command creates variants for posts that don't have them """
+
+        name = default_storage.save('uploads/backfill.jpg', ContentFile(make_image(1400, 700)))
+        post = Post.objects.create(title='Old post', author=self.user, feature_image=name)
+
+        call_command('generate_image_variants', workers=1, stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(parse_variants(post.feature_image_variants)['jpg'], [320, 640, 1280])
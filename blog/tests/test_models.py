@@ -1,5 +1,7 @@
 from blog.models import Post, Like, Comment, get_filename
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from io import StringIO
 from django.contrib.auth import get_user_model
 
 # Create your tests here.
@@ -13,6 +15,7 @@ class TestPostModel(TestCase):
     - Does the __str__ method behave as expected?
     - Is a slug automatically created?
     - Do two posts with the same title and user get different slugs?
+    - Does saving a post whose row was deleted put it back, counters and all?
     """
 
     @classmethod
@@ -58,6 +61,17 @@ class TestPostModel(TestCase):
 
         self.assertNotEqual(self.post.slug, second_title.slug)
 
+    def test_save_deleted_post(self):
+        """ Tests saving a post after its row was deleted inserts it again, as it would for any other model """
+
+        post = Post.objects.create(title='Deleted', body='body', author=self.user)
+        Post.objects.filter(pk=post.pk).delete()
+        post.like_count = 2
+
+        post.save()
+
+        self.assertEqual(Post.objects.values_list('like_count', flat=True).get(pk=post.pk), 2)
+
 
 class TestFeatureImages(TestCase):
 
@@ -91,6 +105,69 @@ class TestFeatureImages(TestCase):
         self.assertEqual(path, expected_path)
 
 
+class TestPostSummary(TestCase):
+    """
+    Things to test:
+    - Are the excerpt, word count and reading time stored when a post is saved?
+    - Is markup stripped and are entities decoded?
+    - Are long bodies truncated?
+    - Does the backfill command fill in posts saved without a summary?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com',
+            first_name='Jane',
+            last_name='Doe',
+            username='user123',
+            password='password456'
+        )
+
+    def test_summary_on_save(self):
+        """ Tests the summary is worked out from the HTML body when a post is saved """
+
+        post = Post.objects.create(
+            title='Post', author=self.user,
+            body='<p>Hello <b>world</b> &amp; friends</p><p>Second</p><script>alert("hi")</script>'
+        )
+
+        self.assertEqual(post.excerpt, 'Hello world & friends Second')
+        self.assertEqual(post.word_count, 5)
+        self.assertEqual(post.reading_time, 1)
+
+    @override_settings(POST_EXCERPT_WORDS=3, WORDS_PER_MINUTE=100)
+    def test_long_body(self):
+        """ Tests the excerpt is truncated and the reading time rounds up """
+
+        post = Post.objects.create(title='Post', author=self.user, body='<p>' + 'word ' * 250 + '</p>')
+
+        self.assertEqual(post.excerpt, 'word word word…')
+        self.assertEqual(post.word_count, 250)
+        self.assertEqual(post.reading_time, 3)
+
+    def test_edit_updates_summary(self):
+        """ Tests the summary follows changes to the body """
+
+        post = Post.objects.create(title='Post', author=self.user, body='One')
+        post.body = 'One two'
+        post.save()
+
+        post.refresh_from_db()
+        self.assertEqual(post.word_count, 2)
+
+    def test_backfill_command(self):
+        """ Tests update_post_summaries fills in posts that have no summary """
+
+        post = Post.objects.create(title='Post', author=self.user, body='<p>One two three</p>')
+        Post.objects.filter(id=post.id).update(excerpt='', word_count=0, reading_time=0)
+
+        call_command('update_post_summaries', batch_size=1, stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual((post.excerpt, post.word_count, post.reading_time), ('One two three', 3, 1))
+
+
 class TestLikeModel(TestCase):
 
     @classmethod
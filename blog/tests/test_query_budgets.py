@@ -0,0 +1,146 @@
+from blog.models import Post, Comment, Like
+from bloggingplatform.testing import QueryBudgetMixin
+from userprofile.models import Follower
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+USER_MODEL = get_user_model()
+
+
+class TestBlogQueryBudgets(QueryBudgetMixin, TestCase):
+    """
+    Query budgets for every URL in blog.urls (and the index).
+    Things to test:
+    - Does each view stay within its budget?
+    - Do the pages that list posts or comments make the same number of queries however many there are?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = USER_MODEL.objects.create_user(
+            email='author@test.com', first_name='Jane', last_name='Doe', username='author', password='password456'
+        )
+        cls.reader = USER_MODEL.objects.create_user(
+            email='reader@test.com', first_name='John', last_name='Doe', username='reader', password='password456'
+        )
+        Follower.objects.create(user_from=cls.reader.profile, user_to=cls.author.profile)
+
+        cls.posts = [cls.add_post(f'Post {i}') for i in range(3)]
+        cls.post = cls.posts[0]
+        cls.draft = Post.objects.create(title='Draft', body='<p>Draft</p>', author=cls.author)
+        cls.comment = Comment.objects.create(
+            user_from=cls.reader.profile, user_to=cls.author.profile, post=cls.post, body='Nice'
+        )
+
+    @classmethod
+    def add_post(cls, title):
+        return Post.objects.create(
+            title=title, body='<p>Post body</p>', author=cls.author, status='published', published=timezone.now()
+        )
+
+    def setUp(self):
+        caches['pages'].clear()
+
+    def add_commenters(self):
+        for i in range(Comment.objects.count(), Comment.objects.count() + 3):
+            user = USER_MODEL.objects.create_user(
+                email=f'commenter{i}@test.com', first_name='C', last_name=str(i), username=f'commenter{i}',
+                password='password456'
+            )
+            Comment.objects.create(user_from=user.profile, user_to=self.author.profile, post=self.post, body='Hi')
+            Like.objects.create(user_from=user.profile, user_to=self.author.profile, post=self.post)
+
+    def add_posts(self):
+        for i in range(3):
+            self.add_post(f'More {i}')
+
+    def test_anonymous_pages(self):
+        """ Tests pages anyone can see stay within their budgets """
+
+        post_detail = reverse('post_detail', args=['author', self.post.slug])
+
+        self.assertQueryBudget(1, reverse('index'), status_code=200)
+        self.assertQueryBudget(2, reverse('author', args=['author']), status_code=200)
+        self.assertQueryBudget(2, reverse('search'), data={'q': 'post'}, status_code=200)
+        self.assertQueryBudget(3, reverse('get_comments', args=[self.post.id]), status_code=200)
+        self.assertQueryBudget(1, post_detail, status_code=200)
+        # Served from the page cache the second time
+        self.assertQueryBudget(1, post_detail, status_code=200)
+
+    def test_logged_in_pages(self):
+        """ Tests pages for logged in users stay within their budgets """
+
+        self.client.force_login(self.reader)
+
+        self.assertQueryBudget(4, reverse('index'), status_code=200)
+        # The timeline, then the popular authors followed (plus one query for each of those)
+        self.assertQueryBudget(5, reverse('feed'), status_code=200)
+        self.assertQueryBudget(6, reverse('author', args=['author']), status_code=200)
+        self.assertQueryBudget(5, reverse('post_detail', args=['author', self.post.slug]), status_code=200)
+
+    def test_author_pages(self):
+        """ Tests the author's own pages stay within their budgets """
+
+        self.client.force_login(self.author)
+
+        self.assertQueryBudget(3, reverse('add'), status_code=200)
+        self.assertQueryBudget(4, reverse('draft', args=['author', self.draft.slug]), status_code=200)
+        self.assertQueryBudget(4, reverse('edit_post', args=['author', self.draft.slug]), status_code=200)
+        self.assertQueryBudget(4, reverse('delete_post', args=['author', self.draft.slug]), status_code=200)
+
+    def test_author_actions(self):
+        """ Tests editing, publishing and deleting a post stay within their budgets """
+
+        self.client.force_login(self.author)
+
+        self.assertQueryBudget(
+            5, reverse('edit_post', args=['author', self.draft.slug]), 'post',
+            {'title': 'Draft', 'body': '<p>New body</p>'}, status_code=302
+        )
+        self.assertQueryBudget(10, reverse('publish_post', args=['author', self.draft.slug]), status_code=302)
+        self.assertQueryBudget(9, reverse('delete_post', args=['author', self.draft.slug]), 'post', status_code=302)
+
+    def test_reader_actions(self):
+        """ Tests commenting and liking stay within their budgets """
+
+        self.client.force_login(self.reader)
+
+        self.assertQueryBudget(7, reverse('add_comment'), 'post', {'post_id': self.post.id, 'body': 'Hi'}, status_code=200)
+        self.assertQueryBudget(5, reverse('delete_comment'), 'post', {'comment_id': self.comment.id}, status_code=200)
+        self.assertQueryBudget(
+            12, reverse('toggle_post_like', args=[self.post.id]), 'post', {'action': 'like'}, status_code=200
+        )
+
+    def test_listings_do_not_grow(self):
+        """ Tests listing pages don't make a query per post or comment """
+
+        self.assertQueriesDoNotGrow(reverse('index'), self.add_posts)
+        self.assertQueriesDoNotGrow(reverse('author', args=['author']), self.add_posts)
+        self.assertQueriesDoNotGrow(reverse('search'), self.add_posts, data={'q': 'post'})
+        self.assertQueriesDoNotGrow(reverse('get_comments', args=[self.post.id]), self.add_commenters)
+
+        self.client.force_login(self.reader)
+        self.assertQueriesDoNotGrow(reverse('feed'), self.add_posts)
+        self.assertQueriesDoNotGrow(reverse('post_detail', args=['author', self.post.slug]), self.add_commenters)
+
+
+@override_settings(QUERY_INSTRUMENTATION=True, QUERY_COUNT_WARNING=0)
+class TestQueryCountMiddleware(TestCase):
+    """
+    Test the per-request query instrumentation.
+    Things to test:
+    - Is the query count sent in the Server-Timing header?
+    - Are requests over the warning threshold logged as warnings?
+    """
+
+    def test_server_timing(self):
+        """ Tests responses carry a Server-Timing header with the query count """
+
+        with self.assertLogs('bloggingplatform.middleware', 'WARNING') as logs:
+            response = self.client.get(reverse('index'))
+
+        self.assertRegex(response['Server-Timing'], r'^db;desc="1 queries";dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertIn('view=index method=GET path=/ status=200 queries=1', logs.output[0])
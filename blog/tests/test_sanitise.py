@@ -0,0 +1,160 @@
+from blog.images import variant_name
+from blog.models import Post
+from blog.sanitise import sanitise
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from io import BytesIO
+from PIL import Image
+import shutil
+import tempfile
+
+USER_MODEL = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class TestSanitise(TestCase):
+    """
+    Things to test:
+    - Is formatting from the editor kept?
+    - Are scripts, event handlers and javascript: links removed?
+    - Are unknown tags unwrapped and unclosed tags closed?
+    - Are unsafe inline styles dropped?
+    - Are images and embeds lazy loaded, and other iframes removed?
+    """
+
+    def test_keeps_formatting(self):
+        """ Tests allowed tags and attributes pass through unchanged """
+
+        body = '<p><b>Bold</b> <a href="https://example.com" title="Example">link</a></p><ul><li>One</li></ul>'
+
+        self.assertEqual(sanitise(body), body)
+
+    def test_removes_scripts(self):
+        """ Tests script tags are removed with their content """
+
+        self.assertEqual(sanitise('<p>Hi<script>alert(1)</script></p>'), '<p>Hi</p>')
+
+    def test_removes_event_handlers(self):
+        """ Tests attributes that aren't on the allow-list are removed """
+
+        self.assertEqual(sanitise('<p onclick="alert(1)">Hi</p>'), '<p>Hi</p>')
+
+    def test_removes_javascript_links(self):
+        """ Tests links with unsafe schemes lose their href, however they're disguised """
+
+        for href in ('javascript:alert(1)', 'JavaScript:alert(1)', 'java\tscript:alert(1)', '&#106;avascript:alert(1)'):
+            self.assertEqual(sanitise(f'<a href="{href}">x</a>'), '<a>x</a>')
+
+    def test_escapes_text(self):
+        """ Tests text is escaped so it can't be turned back into markup """
+
+        self.assertEqual(sanitise('<p>&lt;script&gt;</p>'), '<p>&lt;script&gt;</p>')
+
+    def test_unwraps_unknown_tags(self):
+        """ Tests unknown tags are dropped but their text is kept """
+
+        self.assertEqual(sanitise('<form><p>Text</p></form>'), '<p>Text</p>')
+
+    def test_closes_tags(self):
+        """ Tests unclosed tags are closed and stray end tags ignored so a post can't break the page """
+
+        self.assertEqual(sanitise('<div><b>Bold</div></span>'), '<div><b>Bold</b></div>')
+
+    def test_cleans_styles(self):
+        """ Tests only allowed style properties with plain values are kept """
+
+        body = '<span style="color: red; background-image: url(x); width: expression(alert(1))">Hi</span>'
+
+        self.assertEqual(sanitise(body), '<span style="color: red">Hi</span>')
+
+    def test_target_blank(self):
+        """ Tests links that open a new tab can't reach back to the page """
+
+        self.assertEqual(
+            sanitise('<a href="/x" target="_blank">x</a>'),
+            '<a href="/x" target="_blank" rel="noopener noreferrer">x</a>'
+        )
+
+    def test_lazy_images(self):
+        """ Tests images are lazy loaded """
+
+        self.assertEqual(
+            sanitise('<img src="https://example.com/a.jpg" onerror="alert(1)">'),
+            '<img src="https://example.com/a.jpg" loading="lazy">'
+        )
+
+    def test_iframes(self):
+        """ Tests video embeds are kept and lazy loaded, and other iframes are removed """
+
+        self.assertEqual(
+            sanitise('<iframe src="https://www.youtube.com/embed/abc"></iframe>'),
+            '<iframe src="https://www.youtube.com/embed/abc" loading="lazy"></iframe>'
+        )
+        self.assertEqual(sanitise('<iframe src="https://evil.com/">fallback</iframe>'), '')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestPostBodyHtml(TestCase):
+    """
+    Things to test:
+    - Is body_html stored when a post is saved, and rendered on the detail page?
+    - Are uploaded images rewritten to use their resized variants?
+    - Is a file that isn't really an image left alone instead of breaking the save?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com',
+            first_name='Jane',
+            last_name='Doe',
+            username='user123',
+            password='password456'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_body_html_on_save(self):
+        """ Tests the sanitised body is stored on save and shown instead of the raw body """
+
+        post = Post.objects.create(
+            title='Post', author=self.user, status='published', published=timezone.now(),
+            body='<p>Hello<script>alert("xss")</script></p>'
+        )
+
+        response = Client().get(reverse('post_detail', args=[self.user.username, post.slug]))
+
+        self.assertEqual(post.body_html, '<p>Hello</p>')
+        self.assertContains(response, '<p>Hello</p>')
+        self.assertNotContains(response, 'alert("xss")')
+
+    def test_uploaded_images_use_variants(self):
+        """ Tests an uploaded image in the body is offered at smaller sizes """
+
+        output = BytesIO()
+        Image.new('RGB', (1000, 500), color='red').save(output, format='JPEG')
+        name = default_storage.save('django-summernote/photo.jpg', ContentFile(output.getvalue()))
+
+        post = Post.objects.create(title='Post', author=self.user, body=f'<img src="{default_storage.url(name)}">')
+
+        self.assertTrue(default_storage.exists(variant_name(name, 640, 'jpg')))
+        self.assertIn('<picture><source type="image/jpeg"', post.body_html)
+        self.assertIn(f'{default_storage.url(variant_name(name, 320, "jpg"))} 320w', post.body_html)
+        self.assertIn('loading="lazy"></picture>', post.body_html)
+
+    def test_uploaded_file_not_an_image(self):
+        """ Tests a body image pointing at a file that isn't an image is left as a plain <img> """
+
+        name = default_storage.save('django-summernote/not-an-image.jpg', ContentFile(b'not an image'))
+
+        post = Post.objects.create(title='Post', author=self.user, body=f'<img src="{default_storage.url(name)}">')
+
+        self.assertEqual(post.body_html, f'<img src="{default_storage.url(name)}" loading="lazy">')
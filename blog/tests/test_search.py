@@ -0,0 +1,146 @@
+from blog.models import Post
+from blog.search import search_posts
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from io import StringIO
+
+USER_MODEL = get_user_model()
+
+
+class TestSearch(TestCase):
+    """
+    Things to test:
+    - Are published posts found by title, body and author?
+    - Are drafts and deleted posts left out?
+    - Do partial words match?
+    - Are title matches ranked above body matches?
+    - Are snippets highlighted and escaped?
+    - Are results paginated?
+    - Does the index follow edits, and can it be rebuilt?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com',
+            first_name='Jane',
+            last_name='Doe',
+            username='user123',
+            password='password456'
+        )
+
+        cls.title_match = cls.publish('Learning Django', 'A post about web frameworks.')
+        cls.body_match = cls.publish('Web frameworks', 'Some words about <b>Django</b> &amp; <script>x</script> more.')
+        cls.draft = Post.objects.create(title='Django draft', body='Django', author=cls.user, status='draft')
+
+    @classmethod
+    def publish(cls, title, body):
+        return Post.objects.create(
+            title=title, body=body, author=cls.user, status='published', published=timezone.now()
+        )
+
+    def titles(self, query, **kwargs):
+        results, has_next = search_posts(query, **kwargs)
+        return [post.title for post in results]
+
+    def test_ranking(self):
+        """ Tests published posts are found and title matches come first """
+
+        self.assertEqual(self.titles('django'), ['Learning Django', 'Web frameworks'])
+
+    def test_prefix_match(self):
+        """ Tests a partial word matches """
+
+        self.assertEqual(self.titles('frame'), ['Web frameworks', 'Learning Django'])
+
+    def test_all_terms_required(self):
+        """ Tests every word in the query has to match """
+
+        self.assertEqual(self.titles('django learning'), ['Learning Django'])
+
+    def test_author_match(self):
+        """ Tests posts can be found by their author's name """
+
+        self.assertEqual(len(self.titles('jane')), 2)
+
+    def test_query_syntax_ignored(self):
+        """ Tests FTS operators and quotes in the query are treated as plain words """
+
+        self.assertEqual(self.titles('"django" ( * - :'), ['Learning Django', 'Web frameworks'])
+        self.assertEqual(self.titles('!!!'), [])
+
+    def test_snippet(self):
+        """ Tests snippets highlight matches and escape the text """
+
+        results, _ = search_posts('django')
+        snippet = results[1].snippet
+
+        self.assertIn('<mark>Django</mark> &amp; more', snippet)
+        self.assertNotIn('<script>', snippet)
+
+    def test_pagination(self):
+        """ Tests results are split into pages """
+
+        first, has_next = search_posts('django', page=1, page_size=1)
+        second, has_more = search_posts('django', page=2, page_size=1)
+
+        self.assertTrue(has_next)
+        self.assertFalse(has_more)
+        self.assertEqual([first[0].title, second[0].title], ['Learning Django', 'Web frameworks'])
+
+    def test_follows_edits(self):
+        """ Tests the index is updated when a post is edited, unpublished or deleted """
+
+        self.title_match.title = 'Learning Flask'
+        self.title_match.save()
+        self.assertEqual(self.titles('flask'), ['Learning Flask'])
+
+        self.title_match.status = 'draft'
+        self.title_match.save()
+        self.assertEqual(self.titles('flask'), [])
+
+        self.body_match.delete()
+        self.assertEqual(self.titles('django'), [])
+
+    def test_rebuild(self):
+        """ Tests the rebuild command restores the index """
+
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM blog_post_search')
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.titles('django'), ['Learning Django', 'Web frameworks'])
+
+    def test_view(self):
+        """ Tests the search page lists results with highlighted snippets """
+
+        response = Client().get(reverse('search'), {'q': 'djan'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post.title for post in response.context['results']], ['Learning Django', 'Web frameworks'])
+        self.assertContains(response, '<mark>Django</mark>')
+
+    def test_view_query_count(self):
+        """ Tests a page of results costs a fixed number of queries """
+
+        for i in range(5):
+            self.publish(f'Django {i}', 'body')
+
+        with CaptureQueriesContext(connection) as queries:
+            Client().get(reverse('search'), {'q': 'django'})
+
+        self.assertLessEqual(len(queries), 3)
+
+    @override_settings(SEARCH_MAX_PAGES=2)
+    def test_view_bad_page(self):
+        """ Tests invalid and out of range pages return a 404 """
+
+        for page in ('x', '0', '3'):
+            response = Client().get(reverse('search'), {'q': 'django', 'page': page})
+            self.assertEqual(response.status_code, 404)
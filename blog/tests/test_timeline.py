@@ -0,0 +1,166 @@
+import datetime
+from blog.models import Post, TimelineEntry
+from userprofile.models import Follower, Profile
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+USER_MODEL = get_user_model()
+
+
+class TestTimeline(TestCase):
+
+    """ Things to test:
+    1. Does publishing a post add it to each follower's timeline, once?
+    2. Are posts by popular authors left out of the timeline but still shown in the feed?
+    3. Does following someone backfill their recent posts?
+    4. Does unfollowing remove their posts from the timeline?
+    5. Does the feed only show posts by followed authors, newest first?
+    6. Does paging through a feed mixing timeline and popular authors' posts show each post once?
+    7. Is the feed restricted to logged in users?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = USER_MODEL.objects.create_user(
+            email='author@test.com', first_name='Jane', last_name='Doe', username='author', password='password456'
+        )
+        cls.reader = USER_MODEL.objects.create_user(
+            email='reader@test.com', first_name='John', last_name='Doe', username='reader', password='password456'
+        )
+        cls.stranger = USER_MODEL.objects.create_user(
+            email='stranger@test.com', first_name='Sam', last_name='Doe', username='stranger', password='password456'
+        )
+
+        cls.old_post = Post.objects.create(
+            title='old', body='body', author=cls.author, status='published',
+            published=timezone.make_aware(datetime.datetime(2019, 1, 1))
+        )
+        Post.objects.create(
+            title='other', body='body', author=cls.stranger, status='published',
+            published=timezone.make_aware(datetime.datetime(2020, 1, 1))
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow(self):
+        return Follower.objects.create(user_from=self.reader.profile, user_to=self.author.profile)
+
+    def publish(self, title):
+        post = Post.objects.create(title=title, body='body', author=self.author, status='draft')
+        self.client.force_login(self.author)
+        self.client.get(reverse('publish_post', args=['author', post.slug]))
+        self.client.force_login(self.reader)
+        return post
+
+    def test_publish_fans_out(self):
+        """ Tests that a published post is added to the timeline of each follower """
+
+        self.follow()
+        post = self.publish('new')
+
+        self.assertTrue(TimelineEntry.objects.filter(profile=self.reader.profile, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(profile=self.stranger.profile, post=post).exists())
+
+    def test_publish_twice(self):
+        """ Tests that publishing a post that is already published leaves its date and timeline entries alone """
+
+        self.follow()
+        post = self.publish('new')
+        published = Post.objects.get(id=post.id).published
+
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('publish_post', args=['author', post.slug]))
+
+        self.assertRedirects(response, reverse('post_detail', args=['author', post.slug]))
+        self.assertEqual(Post.objects.get(id=post.id).published, published)
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 1)
+
+    @override_settings(FEED_FANOUT_THRESHOLD=0)
+    def test_popular_author_read_on_demand(self):
+        """ Tests that posts by authors over the fan-out threshold are merged into the feed when it is read """
+
+        self.follow()
+        post = self.publish('new')
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        titles = [p.title for p in self.client.get(reverse('feed')).context['posts']]
+        self.assertEqual(titles, ['new', 'old'])
+
+    def test_follow_backfills(self):
+        """ Tests that following an author adds their recent posts to the timeline """
+
+        self.follow()
+
+        self.assertTrue(TimelineEntry.objects.filter(profile=self.reader.profile, post=self.old_post).exists())
+
+    @override_settings(FEED_BACKFILL_SIZE=1)
+    def test_backfill_size(self):
+        """ Tests that only the most recent FEED_BACKFILL_SIZE posts are backfilled """
+
+        Post.objects.create(
+            title='newer', body='body', author=self.author, status='published',
+            published=timezone.make_aware(datetime.datetime(2020, 1, 1))
+        )
+        Post.objects.create(title='draft', body='body', author=self.author, status='draft')
+        self.follow()
+
+        titles = TimelineEntry.objects.filter(profile=self.reader.profile).values_list('post__title', flat=True)
+        self.assertEqual(list(titles), ['newer'])
+
+    def test_unfollow_removes_posts(self):
+        """ Tests that unfollowing an author takes their posts out of the timeline """
+
+        self.follow().delete()
+
+        self.assertFalse(TimelineEntry.objects.filter(profile=self.reader.profile).exists())
+
+    def test_feed(self):
+        """ Tests that the feed shows posts by followed authors only, newest first """
+
+        self.follow()
+        self.publish('new')
+
+        titles = [p.title for p in self.client.get(reverse('feed')).context['posts']]
+        self.assertEqual(titles, ['new', 'old'])
+
+    @override_settings(BLOG_POSTS_PER_PAGE=2, FEED_FANOUT_THRESHOLD=1)
+    def test_feed_pages(self):
+        """ Tests that following next_cursor through a merged feed returns every post once, newest first """
+
+        self.follow()
+        Follower.objects.create(user_from=self.reader.profile, user_to=self.stranger.profile)
+        # The author's posts come from the timeline, the stranger's are read on demand
+        Profile.objects.filter(user=self.stranger).update(follower_count=2)
+
+        for day in range(1, 4):
+            for author in (self.author, self.stranger):
+                post = Post.objects.create(
+                    title=f'{author.username} {day}', body='body', author=author, status='published',
+                    published=timezone.make_aware(datetime.datetime(2021, 1, day))
+                )
+                if author == self.author:
+                    TimelineEntry.objects.create(profile=self.reader.profile, post=post, published=post.published)
+
+        titles = []
+        url = reverse('feed')
+        while url:
+            response = self.client.get(url)
+            titles += [post.title for post in response.context['posts']]
+            cursor = response.context['next_cursor']
+            url = f"{reverse('feed')}?after={cursor}" if cursor else None
+
+        self.assertEqual(titles, [
+            'stranger 3', 'author 3', 'stranger 2', 'author 2', 'stranger 1', 'author 1', 'other', 'old'
+        ])
+
+    def test_feed_requires_login(self):
+        """ Tests that anonymous users are redirected to log in """
+
+        self.client.logout()
+        response = self.client.get(reverse('feed'))
+
+        self.assertEqual(response.status_code, 302)
@@ -1,9 +1,15 @@
 import datetime
-from blog.models import Post
-from django.test import TestCase, Client
+from blog.models import Post, PostSlugHistory
+from blog.helpers import paginate_posts
+from blog.page_cache import get_cached_page, post_cache_key
+from userprofile.models import Follower
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, IntegrityError, transaction
+from django.test.utils import CaptureQueriesContext
 
 USER_MODEL = get_user_model()
 
@@ -418,6 +424,9 @@ class TestPostDetail(TestCase):
         )
         cls.client = Client()
 
+    def setUp(self):
+        caches['pages'].clear()
+
     def test_draft_404(self):
         """ Tests users cannot view draft posts and get 404 instead """
 
@@ -602,7 +611,7 @@ class TestAuthorPage(TestCase):
         """ Tests that the posts in the context are only published posts by the author, ordered by publication date. """
 
         posts = self.response.context['posts']
-        post_authors = list(set(posts.values_list('author__username', flat=True)))
+        post_authors = list({post.author.username for post in posts})
 
         self.assertEqual(len(post_authors), 1)
         self.assertEqual(post_authors[0], 'hemingway')
@@ -611,7 +620,7 @@ class TestAuthorPage(TestCase):
         """ Tests that only published posts are shown on author page """
 
         posts = self.response.context.get('posts', {})
-        post_statuses = posts.values_list('status', flat=True)
+        post_statuses = [post.status for post in posts]
 
         self.assertNotIn('draft', post_statuses)
 
@@ -619,7 +628,7 @@ class TestAuthorPage(TestCase):
         """ Tests posts are sorted by publication date, most recent first."""
 
         posts = self.response.context.get('posts', {})
-        publication_dates = posts.values_list('published', flat=True)
+        publication_dates = [post.published for post in posts]
         publication_years = [date.year for date in publication_dates]
 
         self.assertEqual(publication_years, [2020, 2019, 2018])
@@ -631,3 +640,516 @@ class TestAuthorPage(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 404)
+
+
+@override_settings(BLOG_POSTS_PER_PAGE=2)
+class TestPostPagination(TestCase):
+    """
+    Things to test:
+    - Is the first page limited to the configured page size?
+    - Does following the 'next' cursor return the following posts, in order, without repeats?
+    - Is there no 'next' cursor on the last page?
+    - Are posts sharing a publication date split correctly across pages?
+    - Does a tampered cursor return a 404?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com',
+            first_name='Jane',
+            last_name='Doe',
+            username='user123',
+            password='password456'
+        )
+
+        same_day = timezone.make_aware(datetime.datetime(2020, 1, 1))
+        published_dates = [
+            timezone.make_aware(datetime.datetime(2021, 1, 1)),
+            same_day,
+            same_day,
+            timezone.make_aware(datetime.datetime(2019, 1, 1)),
+            timezone.make_aware(datetime.datetime(2018, 1, 1)),
+        ]
+        for i, published in enumerate(published_dates):
+            Post.objects.create(
+                title=f'title{i}',
+                body='body',
+                author=cls.user,
+                status='published',
+                published=published
+            )
+
+        cls.client = Client()
+        cls.url = reverse('index')
+
+    def get_all_pages(self, url):
+        titles = []
+        cursor = None
+
+        while True:
+            response = self.client.get(url, {'after': cursor} if cursor else {})
+            titles.append([post.title for post in response.context['posts']])
+            cursor = response.context['next_cursor']
+            if not cursor:
+                return titles
+
+    def test_first_page_size(self):
+        """ Tests the first page only contains BLOG_POSTS_PER_PAGE posts """
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(len(response.context['posts']), 2)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_pages_cover_every_post_once(self):
+        """ Tests that walking through the pages returns every published post once, most recent first """
+
+        pages = self.get_all_pages(self.url)
+        titles = [title for page in pages for title in page]
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(len(titles), 5)
+        self.assertEqual(len(set(titles)), 5)
+        self.assertEqual(titles[0], 'title0')
+        self.assertEqual(titles[-1], 'title4')
+
+    def test_author_pages(self):
+        """ Tests the author page is paginated in the same way """
+
+        pages = self.get_all_pages(reverse('author', args=[self.user.username]))
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+
+    def test_no_next_cursor_on_exact_last_page(self):
+        """ Tests a full last page doesn't link to an empty page """
+
+        with self.settings(BLOG_POSTS_PER_PAGE=5):
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.context['posts']), 5)
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_full_page_one_query(self):
+        """ Tests a page with more posts after it is fetched with a single query """
+
+        with self.assertNumQueries(1):
+            posts, next_cursor = paginate_posts(Post.objects.published_cards(), page_size=2)
+
+        self.assertEqual(len(posts), 2)
+        self.assertIsNotNone(next_cursor)
+
+    def test_invalid_cursor(self):
+        """ Tests that a cursor which can't be decoded returns a 404 """
+
+        response = self.client.get(self.url, {'after': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class TestPostListQueries(TestCase):
+    """
+    Things to test:
+    - Does the index render in the same number of queries regardless of how many posts are listed?
+    - Does the author page?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            USER_MODEL.objects.create_user(
+                email=f'author{i}@test.com',
+                first_name='Author',
+                last_name=str(i),
+                username=f'author{i}',
+                password='password456'
+            )
+            for i in range(3)
+        ]
+        cls.client = Client()
+
+    def create_posts(self, count):
+        for i in range(count):
+            Post.objects.create(
+                title=f'post {i}',
+                body='body',
+                author=self.authors[i % len(self.authors)],
+                status='published',
+                published=timezone.now()
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_index_query_count_is_constant(self):
+        """ Tests the index uses the same number of queries for one post as for a full page """
+
+        self.create_posts(1)
+        one_post = self.count_queries(reverse('index'))
+
+        self.create_posts(10)
+        many_posts = self.count_queries(reverse('index'))
+
+        self.assertEqual(one_post, many_posts)
+
+    def test_author_query_count_is_constant(self):
+        """ Tests the author page uses the same number of queries for one post as for a full page """
+
+        url = reverse('author', args=[self.authors[0].username])
+
+        self.create_posts(1)
+        one_post = self.count_queries(url)
+
+        self.create_posts(30)
+        many_posts = self.count_queries(url)
+
+        self.assertEqual(one_post, many_posts)
+
+    def test_cards_defer_body(self):
+        """ Tests the card queryset doesn't load the post body """
+
+        self.create_posts(1)
+        post = Post.objects.published_cards().first()
+
+        self.assertIn('body', post.get_deferred_fields())
+
+
+class TestAuthorFollowState(TestCase):
+    """
+    Things to test:
+    - Is is_following True for a reader who follows the author?
+    - Is it False for readers who don't, and for anonymous users?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = USER_MODEL.objects.create_user(
+            email='ernest@hemingway.com',
+            first_name='Ernest',
+            last_name='Hemingway',
+            username='hemingway',
+            password='password123'
+        )
+        cls.fan = USER_MODEL.objects.create_user(
+            email='charlotte@bronte.com',
+            first_name='Charlotte',
+            last_name='Bronte',
+            username='bronte',
+            password='pass123'
+        )
+        cls.stranger = USER_MODEL.objects.create_user(
+            email='jane@austen.com',
+            first_name='Jane',
+            last_name='Austen',
+            username='austen',
+            password='pass123'
+        )
+        Follower.objects.create(user_from=cls.fan.profile, user_to=cls.author.profile)
+
+        cls.client = Client()
+        cls.url = reverse('author', args=[cls.author.username])
+
+    def test_follower(self):
+        """ Tests a follower sees the unfollow button """
+
+        self.client.force_login(self.fan)
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.context['is_following'])
+        self.assertContains(response, 'data-action="unfollow"')
+
+    def test_non_follower(self):
+        """ Tests a reader who isn't following sees the follow button """
+
+        self.client.force_login(self.stranger)
+        response = self.client.get(self.url)
+
+        self.assertFalse(response.context['is_following'])
+        self.assertContains(response, 'data-action="follow"')
+
+    def test_anonymous(self):
+        """ Tests anonymous users are never following """
+
+        response = self.client.get(self.url)
+
+        self.assertFalse(response.context['is_following'])
+
+
+class TestPostDetailCache(TestCase):
+    """
+    Things to test:
+    - Is the page rendered once and then served from the cache for anonymous readers?
+    - Do logged-in readers always get a freshly rendered page?
+    - Does editing the post replace the cached page?
+    - Is the cached page dropped when the post is deleted?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com',
+            first_name='Jane',
+            last_name='Doe',
+            username='user123',
+            password='password456'
+        )
+        cls.reader = USER_MODEL.objects.create_user(
+            email='reader@test.com',
+            first_name='Reader',
+            last_name='McReaderson',
+            username='reader',
+            password='password456'
+        )
+        cls.post = Post.objects.create(
+            title='my title',
+            body='original body',
+            author=cls.user,
+            status='published',
+            published=timezone.now()
+        )
+        cls.client = Client()
+        cls.url = reverse('post_detail', args=[cls.user.username, cls.post.slug])
+
+    def setUp(self):
+        caches['pages'].clear()
+
+    def test_anonymous_page_is_cached(self):
+        """ Tests the second anonymous request doesn't render the template again """
+
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+
+        self.assertTemplateUsed(first, 'blog/post_detail.html')
+        self.assertIsNone(second.context)
+        self.assertEqual(first.content, second.content)
+
+    def test_logged_in_page_not_cached(self):
+        """ Tests logged-in readers always get the template rendered for them """
+
+        self.client.force_login(self.reader)
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+
+        self.assertTemplateUsed(response, 'blog/post_detail.html')
+        self.assertIsNone(get_cached_page(self.post))
+
+    def test_edit_replaces_cached_page(self):
+        """ Tests anonymous readers see an edit straight away """
+
+        self.client.get(self.url)
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('edit_post', args=[self.user.username, self.post.slug]), {
+            'title': 'my title',
+            'body': 'edited body',
+        })
+        self.client.logout()
+
+        response = self.client.get(self.url)
+
+        self.assertContains(response, 'edited body')
+
+    def test_save_invalidates_page(self):
+        """ Tests saving a post removes its cached page """
+
+        self.client.get(self.url)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIsNotNone(get_cached_page(post))
+
+        post.save()
+
+        self.assertIsNone(caches['pages'].get(post_cache_key(self.user.username, self.post.slug, self.post.updated)))
+
+    def test_delete_invalidates_page(self):
+        """ Tests deleting a post removes its cached page """
+
+        self.client.get(self.url)
+        post = Post.objects.get(pk=self.post.pk)
+
+        post.delete()
+
+        self.assertIsNone(caches['pages'].get(post_cache_key(self.user.username, self.post.slug, self.post.updated)))
+
+
+class TestPostSlugs(TestCase):
+    """
+    Things to test:
+    - Does renaming a draft give it a new slug, and redirect the old URL?
+    - Is the old URL of a renamed draft a 404 for anyone but its author?
+    - Does saving a draft loaded without its title keep its slug?
+    - Does renaming a published post keep its URL?
+    - Are slugs left alone (without uniqueness queries) when the title hasn't changed?
+    - Is (author, slug) unique in the database?
+    - Do unknown slugs still 404?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com',
+            first_name='Jane',
+            last_name='Doe',
+            username='user123',
+            password='password456'
+        )
+
+    def setUp(self):
+        caches['pages'].clear()
+
+    def test_draft_rename(self):
+        """ Tests renaming a draft changes its slug and records the old one """
+
+        post = Post.objects.create(title='First title', body='body', author=self.user)
+        post = Post.objects.get(id=post.id)
+        post.title = 'Second title'
+        post.save()
+
+        self.assertEqual(post.slug, 'second-title')
+        self.assertTrue(PostSlugHistory.objects.filter(slug='first-title', post=post).exists())
+
+    def test_old_url_redirects(self):
+        """ Tests the old URL of a renamed post permanently redirects to the new one """
+
+        post = Post.objects.create(title='First title', body='body', author=self.user)
+        post.title = 'Second title'
+        post.save()
+        post.status = 'published'
+        post.published = timezone.now()
+        post.save()
+
+        response = self.client.get(reverse('post_detail', args=['user123', 'first-title']))
+
+        self.assertRedirects(response, reverse('post_detail', args=['user123', 'second-title']), status_code=301)
+
+    def test_renamed_draft_hidden(self):
+        """ Tests the old URL of a renamed draft doesn't reveal the new title to anyone but the author """
+
+        post = Post.objects.create(title='First title', body='body', author=self.user)
+        post.title = 'Secret title'
+        post.save()
+        other = USER_MODEL.objects.create_user(
+            email='other@test.com', first_name='Sam', last_name='Doe', username='other', password='password456'
+        )
+
+        anonymous = self.client.get(reverse('post_detail', args=['user123', 'first-title']))
+        self.client.force_login(other)
+        stranger = self.client.get(reverse('post_detail', args=['user123', 'first-title']))
+        self.client.force_login(self.user)
+        author = self.client.get(reverse('post_detail', args=['user123', 'first-title']))
+
+        self.assertEqual(anonymous.status_code, 404)
+        self.assertEqual(stranger.status_code, 404)
+        self.assertEqual(author.status_code, 301)
+
+    def test_deferred_title_keeps_slug(self):
+        """ Tests saving a draft loaded without its title doesn't give it a new slug """
+
+        post = Post.objects.create(title='First title', body='body', author=self.user)
+        post = Post.objects.only('id', 'body', 'author', 'status').get(id=post.id)
+        post.body = 'new body'
+        post.save()
+
+        post.refresh_from_db()
+        self.assertEqual(post.slug, 'first-title')
+        self.assertFalse(PostSlugHistory.objects.exists())
+
+    def test_published_rename_keeps_slug(self):
+        """ Tests renaming a published post doesn't change its URL """
+
+        post = Post.objects.create(
+            title='First title', body='body', author=self.user, status='published', published=timezone.now()
+        )
+        post.title = 'Second title'
+        post.save()
+
+        post.refresh_from_db()
+        self.assertEqual(post.slug, 'first-title')
+        self.assertFalse(PostSlugHistory.objects.exists())
+
+    def test_save_skips_slug_queries(self):
+        """ Tests saving a post without changing its title doesn't probe for a unique slug """
+
+        post = Post.objects.create(title='Title', body='body', author=self.user)
+        post.body = 'new body'
+
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+
+        post_selects = [q for q in queries.captured_queries if q['sql'].startswith('SELECT') and 'FROM "blog_post"' in q['sql']]
+        self.assertEqual(post_selects, [])
+
+    def test_unique_slug(self):
+        """ Tests the database refuses two posts by one author with the same slug """
+
+        Post.objects.create(title='Title', body='body', author=self.user)
+        other = Post.objects.create(title='Other', body='body', author=self.user)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Post.objects.filter(id=other.id).update(slug='title')
+
+    def test_unknown_slug(self):
+        """ Tests a slug no post has ever had is a 404 """
+
+        response = self.client.get(reverse('post_detail', args=['user123', 'nothing-here']))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class TestPostRouteQueries(TestCase):
+    """
+    Things to test:
+    - Is the post (with its author) fetched in a single query on each post-scoped route?
+    - Do the author-only views still 404 for everyone else?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com',
+            first_name='Jane',
+            last_name='Doe',
+            username='user123',
+            password='password456'
+        )
+        cls.hacker = USER_MODEL.objects.create_user(
+            email='hacker@test.com',
+            first_name='Hacker',
+            last_name='McHackerson',
+            username='hacker',
+            password='password456'
+        )
+        cls.post = Post.objects.create(title='my title', body='post body', author=cls.user)
+
+    def post_queries(self, url):
+        """ The queries made against blog_post while getting a URL """
+
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        return [q for q in queries.captured_queries if 'FROM "blog_post"' in q['sql']]
+
+    def test_one_query(self):
+        """ Tests the draft, edit and delete pages each load the post once, joined to its author """
+
+        for name in ('draft', 'edit_post', 'delete_post'):
+            queries = self.post_queries(reverse(name, args=['user123', 'my-title']))
+
+            self.assertEqual(len(queries), 1, name)
+            self.assertIn('INNER JOIN "user_user"', queries[0]['sql'], name)
+
+    def test_non_authors_get_404(self):
+        """ Tests only the author can edit or delete a post """
+
+        self.client.force_login(self.hacker)
+
+        for name in ('edit_post', 'delete_post'):
+            response = self.client.post(reverse(name, args=['user123', 'my-title']))
+            self.assertEqual(response.status_code, 404, name)
+
+        self.assertTrue(Post.objects.filter(id=self.post.id).exists())
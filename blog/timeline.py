@@ -0,0 +1,107 @@
+from django.conf import settings
+
+from userprofile.models import Follower
+from .helpers import after_cursor, split_page
+from .models import Post, PostQuerySet, TimelineEntry
+
+
+def uses_fan_out_on_read(profile):
+    """ Writing an entry for every follower of a very popular author is too expensive, so their posts are merged in when the feed is read """
+
+    return profile.follower_count > settings.FEED_FANOUT_THRESHOLD
+
+
+def add_to_timelines(post, follower_ids):
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(profile_id=follower_id, post=post, published=post.published) for follower_id in follower_ids],
+        ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """
+    Adds a newly published post to the timeline of each of its author's followers, in batches of
+    FEED_FANOUT_BATCH_SIZE. Returns the number of timelines written to.
+    """
+
+    author_profile = post.author.profile
+
+    if uses_fan_out_on_read(author_profile):
+        return 0
+
+    followers = Follower.objects.filter(user_to=author_profile).order_by('id')
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    last_id = 0
+    total = 0
+
+    while True:
+        batch = list(followers.filter(id__gt=last_id).values_list('id', 'user_from_id')[:batch_size])
+        if not batch:
+            return total
+
+        add_to_timelines(post, [follower_id for _, follower_id in batch])
+        last_id = batch[-1][0]
+        total += len(batch)
+
+
+def backfill(follower):
+    """ Gives a new follower the author's most recent posts so their feed isn't empty until the next one """
+
+    if uses_fan_out_on_read(follower.user_to):
+        return
+
+    recent_posts = (
+        Post.objects.published().filter(author__profile=follower.user_to_id, published__isnull=False)
+        .order_by('-published')[:settings.FEED_BACKFILL_SIZE]
+    )
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(profile_id=follower.user_from_id, post=post, published=post.published) for post in recent_posts],
+        ignore_conflicts=True
+    )
+
+
+def remove_author(follower):
+    """ Takes an author's posts out of the timeline of someone who has unfollowed them """
+
+    TimelineEntry.objects.filter(profile=follower.user_from_id, post__author__profile=follower.user_to_id).delete()
+
+
+def get_feed(profile, cursor=None, page_size=None):
+    """
+    A page of a reader's home feed: their timeline, read newest first along timeline_profile_published_idx,
+    merged with the latest posts of each popular author they follow (whose posts aren't fanned out), each read
+    along post_author_published_idx. Paginated like blog.helpers.paginate_posts.
+
+    An author who drops back under FEED_FANOUT_THRESHOLD is fanned out again from their next post, but the posts
+    they published while over it were never copied to their followers' timelines, so those drop out of the feed.
+
+    Returns a tuple of (posts, next_cursor).
+    """
+
+    if page_size is None:
+        page_size = settings.BLOG_POSTS_PER_PAGE
+
+    entries = (
+        TimelineEntry.objects.filter(profile=profile, post__status='published')
+        .select_related('post__author')
+        .only('published', 'post', *(f'post__{field}' for field in PostQuerySet.CARD_FIELDS))
+        .order_by('-published', '-post_id')
+    )
+    posts = [entry.post for entry in after_cursor(entries, cursor, id_field='post_id')[:page_size + 1]]
+
+    popular_authors = Follower.objects.filter(
+        user_from=profile, user_to__follower_count__gt=settings.FEED_FANOUT_THRESHOLD
+    ).order_by().values_list('user_to__user', flat=True)
+
+    for author_id in popular_authors:
+        author_posts = (
+            Post.objects.published_cards().filter(author=author_id, published__isnull=False)
+            .order_by('-published', '-id')
+        )
+        posts.extend(after_cursor(author_posts, cursor)[:page_size + 1])
+
+    # A post can be in both if its author went over the threshold after it was fanned out
+    posts = list({post.id: post for post in posts}.values())
+    posts.sort(key=lambda post: (post.published, post.id), reverse=True)
+
+    return split_page(posts[:page_size + 1], page_size)
@@ -4,9 +4,12 @@ from . import views_ajax
 
 urlpatterns = [
     path('add', views.AddPost.as_view(), name='add'),
+    path('feed', views.feed, name='feed'),
+    path('search', views.search, name='search'),
     path('comment', views_ajax.add_comment, name='add_comment'),
     path('comment/delete', views_ajax.delete_comment, name='delete_comment'),
     path('post/<int:pk>/comments', views_ajax.get_comments, name='get_comments'),
+    path('post/<int:pk>/like', views_ajax.toggle_post_like, name='toggle_post_like'),
     path('<str:username>', views.author, name='author'),
     path('<str:username>/<slug:slug>', views.post_detail, name='post_detail'),
     path('<str:username>/<slug:slug>/draft', views.draft, name='draft'),
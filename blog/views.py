@@ -1,12 +1,18 @@
-from django.shortcuts import render, get_object_or_404
+from django.conf import settings
+from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseRedirect, Http404
+from django.http import HttpResponse, HttpResponseRedirect, Http404
 from django.views.generic import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from .forms import PostForm, CommentForm
 from .models import Post
+from .helpers import paginate_posts, redirect_renamed_post, get_author_post, AuthorPostMixin
+from .images import update_feature_image_variants
+from .page_cache import get_cached_page, set_cached_page
+from .timeline import fan_out, get_feed
+from .search import search_posts
 import datetime
 
 USER_MODEL = get_user_model()
@@ -15,20 +21,66 @@ USER_MODEL = get_user_model()
 def index(request):
     """ Displays a list of posts """
 
-    posts = Post.objects.filter(status='published').order_by('-published')
+    posts, next_cursor = paginate_posts(
+        Post.objects.published_cards(),
+        cursor=request.GET.get('after')
+    )
 
     context = {
         'page_title': 'The POST',
-        'posts': posts
+        'posts': posts,
+        'next_cursor': next_cursor,
     }
     return render(request, 'blog/index.html', context)
 
 
+def search(request):
+    """ Searches published posts. Takes ?q= and an optional ?page= """
+
+    query = request.GET.get('q', '').strip()
+
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        raise Http404('Invalid page')
+
+    if not 1 <= page <= settings.SEARCH_MAX_PAGES:
+        raise Http404('Invalid page')
+
+    results, has_next = search_posts(query, page)
+
+    context = {
+        'page_title': f'Search: {query}' if query else 'Search',
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_next': has_next and page < settings.SEARCH_MAX_PAGES,
+    }
+
+    return render(request, 'blog/search.html', context)
+
+
+@login_required
+def feed(request):
+    """ Returns published posts by the authors the user follows, newest first """
+
+    posts, next_cursor = get_feed(request.user.profile, cursor=request.GET.get('after'))
+
+    context = {
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+
+    return render(request, 'blog/feed.html', context)
+
+
 @login_required
 def draft(request, username, slug):
     """ Provides author with a preview of post in its draft state """
 
-    post = get_object_or_404(Post, author__username=username, slug=slug)
+    post = get_author_post(username, slug)
+    if post is None:
+        return redirect_renamed_post('draft', username, slug, request.user)
 
     if request.user != post.author:
         raise Http404("Oops! We couldn't find that page")
@@ -44,19 +96,24 @@ def draft(request, username, slug):
 def publish_post(request, username, slug):
     """ Changes the status to published and assigns a published date """
 
-    post = get_object_or_404(Post, author__username=username, slug=slug)
+    post = get_author_post(username, slug)
 
-    if request.user != post.author:
+    if post is None or request.user != post.author:
         raise Http404("Oops! We couldn't find the page you were looking for.")
-    else:
-        post.status = 'published'
-        post.published = datetime.datetime.now()
-        post.save()
 
-        redirect_url = reverse('post_detail', args=[username, slug])
+    redirect_url = reverse('post_detail', args=[username, slug])
 
+    # Publishing again would move its date, which the timeline entries and feed cursors are built from
+    if post.status == 'published':
         return HttpResponseRedirect(redirect_url)
 
+    post.status = 'published'
+    post.published = datetime.datetime.now()
+    post.save()
+    fan_out(post)
+
+    return HttpResponseRedirect(redirect_url)
+
 
 def post_detail(request, username, slug):
     """
@@ -65,7 +122,9 @@ def post_detail(request, username, slug):
     If draft and user is author, then they are redirected to their draft.
     """
 
-    post = get_object_or_404(Post, author__username=username, slug=slug)
+    post = get_author_post(username, slug)
+    if post is None:
+        return redirect_renamed_post('post_detail', username, slug, request.user)
 
     if post.status != 'published':
         if request.user == post.author:
@@ -74,31 +133,46 @@ def post_detail(request, username, slug):
         else:
             raise Http404("Oops! We couldn't find that post")
 
-    else:
-        context = {
-            'page_title': post.title,
-            'post': post,
-            'comments': post.comments.all(),
-            'comment_form': CommentForm()
-        }
+    # Anonymous readers all see the same page, so it's rendered once and served from the page cache
+    if not request.user.is_authenticated:
+        content = get_cached_page(post)
+        if content is not None:
+            return HttpResponse(content)
+
+    context = {
+        'page_title': post.title,
+        'post': post,
+        'comment_form': CommentForm(),
+        'is_liked': request.user.is_authenticated and post.likes.filter(user_from__user=request.user).exists(),
+    }
 
-        return render(request, 'blog/post_detail.html', context)
+    response = render(request, 'blog/post_detail.html', context)
+
+    if not request.user.is_authenticated:
+        set_cached_page(post, response.content)
+
+    return response
 
 
 def author(request, username):
     """ Returns published posts by a given author and render's author's public page """
 
     try:
-        author = get_user_model().objects.get(username=username)
+        author = get_user_model().objects.select_related('profile').get(username=username)
     except Exception:
         raise Http404('This page does not exist')
 
-    posts = Post.objects.filter(author=author, status='published').order_by('-published')
+    posts, next_cursor = paginate_posts(
+        Post.objects.published_cards().filter(author=author),
+        cursor=request.GET.get('after')
+    )
 
     context = {
         'page-title': username,
         'posts': posts,
+        'next_cursor': next_cursor,
         'author': author,
+        'is_following': author.profile.is_followed_by(request.user),
     }
 
     return render(request, 'blog/author.html', context)
@@ -114,7 +188,10 @@ class AddPost(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        if 'feature_image' in form.changed_data:
+            update_feature_image_variants(self.object)
+        return response
 
     def get_success_url(self):
         author = self.object.author
@@ -122,19 +199,19 @@ class AddPost(LoginRequiredMixin, CreateView):
         return reverse('draft', args=[author.username, slug])
 
 
-class EditPost(LoginRequiredMixin, UpdateView):
+# AuthorPostMixin makes sure posts can only be edited by the author!
+class EditPost(AuthorPostMixin, LoginRequiredMixin, UpdateView):
     """ Allows users to edit posts with UI """
 
     model = Post
     template_name = 'blog/edit.html'
     fields = ['title', 'feature_image', 'body']
 
-    # Make sure posts can only be edited by the author!
-    def dispatch(self, request, *args, **kwargs):
-        post = self.get_object()
-        if post.author != self.request.user:
-            raise Http404("Oops! We couldn't find that page.")
-        return super(EditPost, self).dispatch(request, *args, **kwargs)
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if 'feature_image' in form.changed_data:
+            update_feature_image_variants(self.object)
+        return response
 
     def get_success_url(self):
         author = self.object.author
@@ -142,15 +219,9 @@ class EditPost(LoginRequiredMixin, UpdateView):
         return reverse('draft', args=[author.username, slug])
 
 
-class DeletePost(LoginRequiredMixin, DeleteView):
+# AuthorPostMixin makes sure posts can only be deleted by the author!
+class DeletePost(AuthorPostMixin, LoginRequiredMixin, DeleteView):
     """ Allows authors to delete their posts """
     model = Post
     template_name = 'blog/delete.html'
     success_url = reverse_lazy('index')
-
-    # Make sure posts can only be deleted by the author!
-    def dispatch(self, request, *args, **kwargs):
-        post = self.get_object()
-        if post.author != self.request.user:
-            raise Http404
-        return super(DeletePost, self).dispatch(request, *args, **kwargs)
@@ -1,20 +1,75 @@
-from .models import Post, Comment
+from .models import Post, Comment, Like
 from .forms import CommentForm
-from django.views.decorators.http import require_POST
+from .like_buffer import pending
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_POST, condition
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseBadRequest
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.shortcuts import get_object_or_404
+import hashlib
 
 USER_MODEL = get_user_model()
 
+MAX_COMMENTS_PER_PAGE = 100
 
+
+def get_comment_stats(request, pk):
+    """
+    The number of comments on a post and when the latest one was written, fetched in one query and
+    remembered for the rest of the request so the ETag, Last-Modified and response can share it.
+    """
+
+    if not hasattr(request, '_comment_stats'):
+        request._comment_stats = Comment.objects.filter(post_id=pk).aggregate(
+            count=Count('id'), last_id=Max('id'), latest=Max('timestamp')
+        )
+    return request._comment_stats
+
+
+def comments_etag(request, pk):
+    # The count is included so deleting an older comment still changes the ETag
+    stats = get_comment_stats(request, pk)
+    raw = f"{pk}|{stats['count']}|{stats['last_id']}|{request.GET.urlencode()}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def comments_last_modified(request, pk):
+    return get_comment_stats(request, pk)['latest']
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=comments_etag, last_modified_func=comments_last_modified)
 def get_comments(request, pk):
+    """
+    Returns a page of comments on a post, oldest first.
+    Pass ?after=<comment id> to get the next page and ?limit= to change the page size.
+    Clients can revalidate with If-None-Match/If-Modified-Since and get a 304 if nothing has changed.
+    """
+
+    post = get_object_or_404(Post.objects.only('id'), id=pk)
+
+    try:
+        limit = min(int(request.GET.get('limit', settings.COMMENTS_PER_PAGE)), MAX_COMMENTS_PER_PAGE)
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return JsonResponse({'status': 'error'}, status=400)
+
+    if limit < 1:
+        return JsonResponse({'status': 'error'}, status=400)
 
-    post = get_object_or_404(Post, id=pk)
+    comments = list(
+        post.comments.filter(id__gt=after).select_related('user_from__user').order_by('id')[:limit + 1]
+    )
+    has_next = len(comments) > limit
+    comments = comments[:limit]
 
-    comments = post.comments.all()
     comment_list = []
 
     for comment in comments:
@@ -32,9 +87,15 @@ def get_comments(request, pk):
             'body': comment.body,
         })
 
+    next_url = None
+    if has_next:
+        next_url = f"{reverse('get_comments', args=[pk])}?{urlencode({'after': comments[-1].id, 'limit': limit})}"
+
     response = {
         'status': 'success',
-        'comments': comment_list
+        'comments': comment_list,
+        'count': get_comment_stats(request, pk)['count'],
+        'next': next_url,
     }
 
     return JsonResponse(response)
@@ -47,7 +108,7 @@ def add_comment(request):
     post_id = request.POST.get('post_id')
 
     try:
-        post = Post.objects.get(id=post_id)
+        post = Post.objects.select_related('author__profile').get(id=post_id)
     except Post.DoesNotExist:
         raise ValueError('No post found')
 
@@ -91,13 +152,52 @@ def delete_comment(request):
     comment_id = request.POST.get('comment_id')
 
     try:
-        comment = Comment.objects.get(id=comment_id)
+        comment = Comment.objects.select_related('user_from').get(id=comment_id)
     except Comment.DoesNotExist:
         raise ValueError('This comment does not exist')
 
-    if comment.user_from.user != request.user:
+    if comment.user_from.user_id != request.user.id:
         raise PermissionDenied('Permission Denied')
 
     comment.delete()
 
-    return JsonResponse({'status': 'success'})
\ No newline at end of file
+    return JsonResponse({'status': 'success'})
+
+
+@require_POST
+@login_required
+def toggle_post_like(request, pk):
+    """
+    Likes or unlikes a post depending on POST action=like|unlike. Repeating an action is harmless: liking a post twice
+    leaves one like, and unliking a post that isn't liked does nothing. Returns the post's new like count.
+    """
+
+    post = get_object_or_404(Post.objects.published().select_related('author__profile'), id=pk)
+    action = request.POST.get('action')
+
+    if action not in ('like', 'unlike'):
+        return HttpResponseBadRequest()
+
+    if request.user.id == post.author_id:
+        raise PermissionDenied('You cannot like your own post')
+
+    with transaction.atomic():
+        if action == 'like':
+            Like.objects.get_or_create(
+                user_from=request.user.profile,
+                post=post,
+                defaults={'user_to': post.author.profile}
+            )
+        else:
+            Like.objects.filter(user_from=request.user.profile, post=post).delete()
+
+    # The stored total can be a few seconds behind (see blog.like_buffer), so add what hasn't been flushed yet
+    like_count = Post.objects.values_list('like_count', flat=True).get(id=pk) + pending(pk)
+
+    response = {
+        'status': 'success',
+        'liked': action == 'like',
+        'like_count': max(like_count, 0),
+    }
+
+    return JsonResponse(response)
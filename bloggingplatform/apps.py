@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class BloggingPlatformConfig(AppConfig):
+    name = 'bloggingplatform'
+    verbose_name = 'Blogging platform'
+
+    def ready(self):
+        import bloggingplatform.database  # noqa
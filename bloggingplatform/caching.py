@@ -0,0 +1,108 @@
+"""
+Versioned cache keys, so cached data can be thrown away by bumping a version rather than finding every key.
+
+Anything cached with these helpers names the namespaces it was built from, and its key includes
+their current versions:
+
+    posts = caching.get_or_set('author_posts', [caching.author(user.pk)], load_posts, user.pk)
+
+invalidate(caching.author(user.pk)) then moves that namespace to a new version, so every key built
+from it stops matching and the old entries simply expire. Signals in blog.signals and
+userprofile.signals invalidate these namespaces when the models they cover change:
+
+    post:<post id>        a post and its comments and likes (Post, Comment, Like)
+    author:<user id>      an author's posts (Post)
+    profile:<profile id>  a profile and its follower counts (Profile, Follower)
+    feed:<profile id>     a reader's home feed (Follower)
+    posts                 anything listing posts from more than one author (Post, Profile)
+
+An author's page would depend on both author:<user id> and profile:<profile id>.
+
+Comments and likes only invalidate their post, so the counts on cached listings can be out of date
+until the listing expires. Invalidation waits for the transaction to commit, otherwise a request
+could cache the old data again before the change is visible.
+"""
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+import hashlib
+import time
+
+LISTINGS = 'posts'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def author(user_id):
+    return f'author:{user_id}'
+
+
+def profile(profile_id):
+    return f'profile:{profile_id}'
+
+
+def feed(profile_id):
+    return f'feed:{profile_id}'
+
+
+def version_key(namespace):
+    return f'version:{namespace}'
+
+
+def new_version():
+    # Versions start from the clock rather than 1, so a namespace whose version was evicted from the
+    # cache can't start again at a version that old entries were stored under
+    return int(time.time() * 1000000)
+
+
+def get_versions(namespaces):
+    keys = [version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            # add() rather than set(), in case another process has just created it
+            cache.add(key, new_version(), None)
+            versions[key] = cache.get(key, new_version())
+
+    return [versions[key] for key in keys]
+
+
+def make_key(name, namespaces, *parts):
+    """ A cache key for `name` and `parts` that changes whenever one of the namespaces is invalidated """
+
+    versions = '.'.join(str(version) for version in get_versions(namespaces))
+    raw = ':'.join(str(part) for part in (name, *parts, versions))
+    # Hashed to stay within memcached's key length and character limits
+    return f'{name}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def get_or_set(name, namespaces, load, *parts, timeout=DEFAULT_TIMEOUT):
+    """ Returns the cached value for a key, calling load(*parts) to fill the cache when it isn't there """
+
+    key = make_key(name, namespaces, *parts)
+    value = cache.get(key)
+
+    if value is None:
+        value = load(*parts)
+        cache.set(key, value, timeout)
+
+    return value
+
+
+def bump(namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(version_key(namespace))
+        except ValueError:
+            # Never used, or evicted: nothing can be cached under its old version
+            cache.add(version_key(namespace), new_version(), None)
+
+
+def invalidate(*namespaces):
+    """ Makes everything cached under these namespaces stale, once the current transaction commits """
+
+    transaction.on_commit(lambda: bump(namespaces))
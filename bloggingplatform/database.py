@@ -0,0 +1,41 @@
+"""
+Database connection tuning, set up from settings.py.
+
+New SQLite connections get the pragmas in SQLITE_PRAGMAS. Connections kept open between requests
+(CONN_MAX_AGE) are checked at the start of each request when DATABASE_HEALTH_CHECKS is on, so a
+connection the server has dropped (a restart, an idle timeout) is replaced instead of failing the request.
+"""
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            # An in-memory database (e.g. the test database) can't use WAL
+            if name == 'journal_mode' and connection.is_in_memory_db():
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def check_connection(connection):
+    """ Closes a kept connection that no longer works, so the next query opens a new one """
+
+    if connection.connection is not None and not connection.in_atomic_block and not connection.is_usable():
+        connection.close()
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    # Runs after django.db.close_old_connections, which has already closed anything past its CONN_MAX_AGE
+    if settings.DATABASE_HEALTH_CHECKS:
+        for connection in connections.all():
+            check_connection(connection)
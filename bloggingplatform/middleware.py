@@ -0,0 +1,109 @@
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from . import routers
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """ A database execute wrapper that counts the queries run through it and how long they took """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryCountMiddleware:
+    """
+    Records how many queries each request makes and how long they take, on every database connection.
+    The numbers are sent back in a Server-Timing header (shown in the browser's network tab) and logged
+    with the view name. Requests over QUERY_COUNT_WARNING queries are logged as warnings.
+    Turned on with QUERY_INSTRUMENTATION. This should be the first middleware so the session and
+    user lookups are counted too.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = stats.duration * 1000
+
+        response['Server-Timing'] = f'db;desc="{stats.count} queries";dur={db_ms:.1f}, total;dur={total_ms:.1f}'
+
+        match = request.resolver_match
+        details = {
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(db_ms, 1),
+            'total_ms': round(total_ms, 1),
+        }
+        message = ' '.join(f'{key}={value}' for key, value in details.items())
+
+        if stats.count > settings.QUERY_COUNT_WARNING:
+            logger.warning(f'Too many queries: {message}', extra=details)
+        else:
+            logger.info(message, extra=details)
+
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keeps a browser's reads on the primary database for REPLICA_PIN_SECONDS after a request of theirs
+    wrote to it, so they see their own changes before the replicas catch up (see bloggingplatform.routers).
+    This is remembered in a signed cookie rather than the session, as the session may be on a replica.
+    Only used when there are DATABASE_REPLICAS.
+    """
+
+    cookie_name = 'use_primary'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+
+        if request.get_signed_cookie(self.cookie_name, default=None, max_age=settings.REPLICA_PIN_SECONDS):
+            routers.pin_to_primary()
+
+        try:
+            response = self.get_response(request)
+
+            if routers.has_written():
+                response.set_signed_cookie(
+                    self.cookie_name, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+                )
+        finally:
+            routers.reset()
+
+        return response
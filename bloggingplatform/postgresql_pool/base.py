@@ -0,0 +1,81 @@
+"""
+The PostgreSQL backend with connections taken from a pool shared by every thread in the process.
+
+Django opens a connection for each thread and closes it at the end of the request (or after
+CONN_MAX_AGE). With this backend, opening takes an idle connection from the pool and closing hands
+it back, so requests don't pay for a new connection and a process never holds more than POOL_SIZE.
+When they're all in use, a thread waits up to POOL_TIMEOUT seconds for one to be handed back.
+Turned on by setting DATABASE_POOL_SIZE.
+"""
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+import threading
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    """ A ThreadedConnectionPool that waits for a free connection instead of raising PoolError straight away """
+
+    def __init__(self, minconn, maxconn, *args, timeout=None, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.timeout = timeout
+        self._available = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None):
+        if not self._available.acquire(timeout=self.timeout):
+            raise pool.PoolError(f'No database connection was handed back to the pool within {self.timeout} seconds')
+
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._available.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        self._available.release()
+
+
+def get_pool(alias, settings_dict, conn_params):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = BlockingConnectionPool(
+                settings_dict.get('POOL_MIN_SIZE', 1), settings_dict['POOL_SIZE'],
+                timeout=settings_dict.get('POOL_TIMEOUT'), **conn_params
+            )
+        return _pools[alias]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict, self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.getconn()
+        if connection.closed:
+            # The server dropped it while it sat in the pool
+            self.pool.putconn(connection, close=True)
+            connection = self.pool.getconn()
+
+        # As in base.DatabaseWrapper.get_new_connection
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # Any open transaction is rolled back by the pool
+                self.pool.putconn(self.connection, close=bool(self.connection.closed))
@@ -0,0 +1,59 @@
+"""
+Read replica routing.
+
+Reads go to a randomly chosen database in DATABASE_REPLICAS and writes to the primary ("default").
+Replicas lag behind the primary, so once a thread has written anything its reads go to the primary
+too, for the rest of the request. ReplicaPinningMiddleware carries this over to the same browser's
+next requests for REPLICA_PIN_SECONDS, so an author sees their edit as soon as the page reloads.
+Reads inside a transaction on the primary also stay on the primary.
+"""
+
+from django.conf import settings
+from django.db import connections
+import random
+import threading
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def has_written():
+    return getattr(_state, 'written', False)
+
+
+def reset():
+    """ Forgets about earlier writes. Called at the start and end of each request. """
+    _state.pinned = False
+    _state.written = False
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or is_pinned() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _state.pinned = True
+        _state.written = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their tables from the primary
+        return db not in settings.DATABASE_REPLICAS
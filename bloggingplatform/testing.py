@@ -0,0 +1,94 @@
+from contextlib import ExitStack
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+import os
+import shutil
+import tempfile
+
+
+class QueryBudgetMixin:
+    """
+    Test case helpers for keeping views within a query budget. Mix into a TestCase.
+
+    Budgets count every query made while handling the request, including those made by middleware
+    (sessions, the logged in user). When a budget is exceeded the failure lists the queries.
+    """
+
+    def request_with_queries(self, url, method='get', data=None, **extra):
+        """ Makes a request with self.client and returns (response, captured queries) """
+
+        with ExitStack() as stack:
+            contexts = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+            response = getattr(self.client, method)(url, data or {}, **extra)
+
+        queries = [query['sql'] for context in contexts for query in context.captured_queries]
+        return response, queries
+
+    def assertQueryBudget(self, budget, url, method='get', data=None, status_code=None, **extra):
+        """ Fails if the request makes more than `budget` queries, or returns an unexpected status code """
+
+        response, queries = self.request_with_queries(url, method, data, **extra)
+
+        if status_code is not None:
+            self.assertEqual(response.status_code, status_code, f'{method.upper()} {url}')
+
+        if len(queries) > budget:
+            listing = '\n'.join(f'{number}. {sql}' for number, sql in enumerate(queries, start=1))
+            self.fail(f'{method.upper()} {url} made {len(queries)} queries, over its budget of {budget}:\n{listing}')
+
+        return response
+
+    def assertQueriesDoNotGrow(self, url, add_rows, method='get', data=None, **extra):
+        """
+        Catches N+1 queries: makes the request, calls add_rows() to add more of whatever the page lists,
+        and fails if the same request then makes more queries.
+        """
+
+        _, before = self.request_with_queries(url, method, data, **extra)
+        add_rows()
+        _, after = self.request_with_queries(url, method, data, **extra)
+
+        if len(after) > len(before):
+            listing = '\n'.join(after)
+            self.fail(f'{method.upper()} {url} went from {len(before)} to {len(after)} queries:\n{listing}')
+
+
+class ReplicaTestMixin:
+    """
+    Emulates a read replica with a second SQLite database file, listed in DATABASE_REPLICAS.
+    Nothing reaches it until replicate() copies the primary over, so tests can see what readers get while
+    the replica is behind. Mix into a TransactionTestCase, as only committed rows are copied.
+    """
+
+    replica = 'replica'
+
+    def setUp(self):
+        super().setUp()
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        connections.databases[self.replica] = dict(
+            connections['default'].settings_dict, NAME=os.path.join(directory, 'replica.sqlite3'), TEST={}
+        )
+        self.addCleanup(self.remove_replica)
+
+        replicas = override_settings(DATABASE_REPLICAS=[self.replica])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+
+        self.replicate()
+
+    def remove_replica(self):
+        connections[self.replica].close()
+        del connections.databases[self.replica]
+        delattr(connections._connections, self.replica)
+
+    def replicate(self):
+        """ Brings the replica up to date with everything committed on the primary """
+
+        primary, replica = connections['default'], connections[self.replica]
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
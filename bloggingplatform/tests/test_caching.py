@@ -0,0 +1,130 @@
+from blog import like_buffer
+from blog.models import Post, Comment, Like
+from bloggingplatform import caching
+from userprofile.models import Follower
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+USER_MODEL = get_user_model()
+
+
+@override_settings(NOTIFICATION_OUTBOX_WORKER=False, LIKE_FLUSH_INTERVAL=0)
+class TestVersionedCache(TransactionTestCase):
+    """
+    Test the versioned cache keys in bloggingplatform.caching.
+    Things to test:
+    - Are values cached until one of their namespaces is invalidated?
+    - Does invalidation wait for the transaction to commit?
+    - Does a namespace whose version was evicted not bring back old entries?
+    - Do changes to posts, comments, likes, follows and profiles invalidate the right namespaces?
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.author = USER_MODEL.objects.create_user(
+            email='author@test.com', first_name='Jane', last_name='Doe', username='author', password='password456'
+        )
+        self.reader = USER_MODEL.objects.create_user(
+            email='reader@test.com', first_name='John', last_name='Doe', username='reader', password='password456'
+        )
+        self.post = Post.objects.create(
+            title='Post', body='<p>Body</p>', author=self.author, status='published', published=timezone.now()
+        )
+
+    def versions(self, *namespaces):
+        return caching.get_versions(namespaces)
+
+    def assertInvalidates(self, namespaces, change):
+        before = self.versions(*namespaces)
+        change()
+        after = self.versions(*namespaces)
+
+        for namespace, old, new in zip(namespaces, before, after):
+            self.assertNotEqual(old, new, f'{namespace} was not invalidated')
+
+    def test_get_or_set(self):
+        """ Tests a value is loaded once and again after its namespace is invalidated """
+
+        calls = []
+
+        def load(post_id):
+            calls.append(post_id)
+            return len(calls)
+
+        namespaces = [caching.post(1), caching.LISTINGS]
+
+        self.assertEqual(caching.get_or_set('test', namespaces, load, 1), 1)
+        self.assertEqual(caching.get_or_set('test', namespaces, load, 1), 1)
+        self.assertEqual(caching.get_or_set('test', namespaces, load, 2), 2)
+
+        caching.invalidate(caching.LISTINGS)
+        self.assertEqual(caching.get_or_set('test', namespaces, load, 1), 3)
+        self.assertEqual(calls, [1, 2, 1])
+
+    def test_invalidate_on_commit(self):
+        """ Tests nothing is invalidated until the transaction commits """
+
+        key = caching.make_key('test', [caching.LISTINGS])
+
+        with transaction.atomic():
+            caching.invalidate(caching.LISTINGS)
+            self.assertEqual(caching.make_key('test', [caching.LISTINGS]), key)
+
+        self.assertNotEqual(caching.make_key('test', [caching.LISTINGS]), key)
+
+    def test_evicted_version(self):
+        """ Tests a namespace whose version is lost from the cache doesn't reuse an old version """
+
+        old_key = caching.make_key('test', [caching.LISTINGS])
+        cache.delete(caching.version_key(caching.LISTINGS))
+
+        self.assertNotEqual(caching.make_key('test', [caching.LISTINGS]), old_key)
+
+    def test_post_changes(self):
+        """ Tests saving and deleting a post invalidates the post, its author and listings """
+
+        namespaces = [caching.post(self.post.pk), caching.author(self.author.pk), caching.LISTINGS]
+
+        def edit():
+            self.post.title = 'Edited'
+            self.post.save()
+
+        self.assertInvalidates(namespaces, edit)
+        self.assertInvalidates(namespaces, self.post.delete)
+
+    def test_comment_and_like_changes(self):
+        """ Tests comments, likes and flushed like counts invalidate their post """
+
+        namespaces = [caching.post(self.post.pk)]
+        reader, author = self.reader.profile, self.author.profile
+
+        self.assertInvalidates(namespaces, lambda: Comment.objects.create(
+            user_from=reader, user_to=author, post=self.post, body='Nice'
+        ))
+        self.assertInvalidates(namespaces, lambda: Like.objects.create(user_from=reader, user_to=author, post=self.post))
+        self.assertInvalidates(namespaces, lambda: like_buffer.apply_deltas({self.post.pk: 1}))
+
+    def test_follow_changes(self):
+        """ Tests following invalidates the follower's feed and both profiles """
+
+        reader, author = self.reader.profile, self.author.profile
+        namespaces = [caching.feed(reader.pk), caching.profile(reader.pk), caching.profile(author.pk)]
+
+        self.assertInvalidates(namespaces, lambda: Follower.objects.create(user_from=reader, user_to=author))
+        self.assertInvalidates(namespaces, lambda: Follower.objects.filter(user_from=reader).delete())
+
+    def test_profile_changes(self):
+        """ Tests editing a profile invalidates it and listings """
+
+        profile = self.author.profile
+
+        def edit():
+            profile.bio = 'Hello'
+            profile.save()
+
+        self.assertInvalidates([caching.profile(profile.pk), caching.LISTINGS], edit)
@@ -0,0 +1,57 @@
+from bloggingplatform.database import check_connection
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+from unittest import mock
+import os
+import shutil
+import tempfile
+
+
+class TestDatabaseConnections(SimpleTestCase):
+    """
+    Test the database connection tuning in bloggingplatform.database.
+    Things to test:
+    - Do new SQLite connections get the SQLITE_PRAGMAS?
+    - Are kept connections that stop working closed, and working ones left open?
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        settings_dict = dict(connections['default'].settings_dict, NAME=os.path.join(directory, 'test.sqlite3'))
+        self.connection = DatabaseWrapper(settings_dict, alias='tuning')
+        self.addCleanup(self.connection.close)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_pragmas(self):
+        """ Tests WAL, synchronous=normal, the busy timeout and mmap are set on new connections """
+
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('mmap_size'), 256 * 1024 * 1024)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 100})
+    def test_sqlite_pragmas_setting(self):
+        """ Tests the pragmas come from the SQLITE_PRAGMAS setting """
+
+        self.assertEqual(self.pragma('busy_timeout'), 100)
+        self.assertEqual(self.pragma('journal_mode'), 'delete')
+
+    def test_health_check(self):
+        """ Tests a broken connection is closed and a working one is kept """
+
+        self.connection.ensure_connection()
+
+        check_connection(self.connection)
+        self.assertIsNotNone(self.connection.connection)
+
+        with mock.patch.object(self.connection, 'is_usable', return_value=False):
+            check_connection(self.connection)
+        self.assertIsNone(self.connection.connection)
@@ -0,0 +1,49 @@
+from django.test import SimpleTestCase
+from unittest import mock, skipUnless
+import threading
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+
+@skipUnless(psycopg2, 'psycopg2 is not installed')
+class TestBlockingConnectionPool(SimpleTestCase):
+    """
+    Test the connection pool behind bloggingplatform.postgresql_pool. psycopg2.connect is replaced so no server is needed.
+    Things to test:
+    - Does a thread wait for a connection to be handed back when they're all in use?
+    - Does it give up with a PoolError after the timeout?
+    """
+
+    def setUp(self):
+        from bloggingplatform.postgresql_pool.base import BlockingConnectionPool
+
+        patcher = mock.patch('psycopg2.connect', side_effect=lambda *args, **kwargs: mock.MagicMock(closed=False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.pool = BlockingConnectionPool(1, 1, timeout=5)
+
+    def test_waits_for_connection(self):
+        """ Tests a thread asking for a connection while the only one is in use gets it once it's handed back """
+
+        connection = self.pool.getconn()
+        received = []
+        waiting = threading.Thread(target=lambda: received.append(self.pool.getconn()))
+        waiting.start()
+
+        self.pool.putconn(connection)
+        waiting.join(5)
+
+        self.assertEqual(received, [connection])
+
+    def test_timeout(self):
+        """ Tests asking for a connection fails once the timeout has passed with none handed back """
+
+        self.pool.timeout = 0.1
+        self.pool.getconn()
+
+        with self.assertRaises(psycopg2.pool.PoolError):
+            self.pool.getconn()
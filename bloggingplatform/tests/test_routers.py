@@ -0,0 +1,97 @@
+from blog.models import Post
+from bloggingplatform import routers
+from bloggingplatform.testing import ReplicaTestMixin
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+USER_MODEL = get_user_model()
+
+
+@override_settings(NOTIFICATION_OUTBOX_WORKER=False, LIKE_FLUSH_INTERVAL=0)
+class TestReplicaRouter(ReplicaTestMixin, TransactionTestCase):
+    """
+    Test reads go to the replica and writes to the primary, using a second SQLite file as the replica.
+    Things to test:
+    - Are reads served by the replica, and so stale until it catches up?
+    - Do writes go to the primary, and do later reads in the same request follow them there?
+    - Are reads inside a transaction made on the primary?
+    - Does an author see their own edit on the next request while other readers still get the replica?
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.author = USER_MODEL.objects.create_user(
+            email='author@test.com', first_name='Jane', last_name='Doe', username='author', password='password456'
+        )
+        self.reader = USER_MODEL.objects.create_user(
+            email='reader@test.com', first_name='John', last_name='Doe', username='reader', password='password456'
+        )
+        self.post = Post.objects.create(
+            title='Original', body='<p>Body</p>', author=self.author, status='published', published=timezone.now()
+        )
+
+        self.author_client = self.client_class()
+        self.author_client.force_login(self.author)
+        self.client.force_login(self.reader)
+
+        self.replicate()
+        routers.reset()
+        self.addCleanup(routers.reset)
+
+    def test_reads_use_replica(self):
+        """ Tests reads come from the replica until it is brought up to date """
+
+        Post.objects.filter(pk=self.post.pk).update(title='Changed')
+        routers.reset()
+
+        self.assertEqual(Post.objects.get(pk=self.post.pk).title, 'Original')
+        self.assertEqual(Post.objects.get(pk=self.post.pk)._state.db, 'replica')
+
+        self.replicate()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).title, 'Changed')
+
+    def test_reads_after_write_use_primary(self):
+        """ Tests writes go to the primary and the reads after them follow """
+
+        Post.objects.filter(pk=self.post.pk).update(title='Changed')
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.title, 'Changed')
+        self.assertEqual(post._state.db, 'default')
+
+    def test_reads_in_transaction_use_primary(self):
+        """ Tests reads inside a transaction on the primary are made there """
+
+        with transaction.atomic():
+            self.assertEqual(Post.objects.get(pk=self.post.pk)._state.db, 'default')
+
+    def test_author_sees_own_edit(self):
+        """ Tests the author is pinned to the primary after editing, while other readers get the replica """
+
+        response = self.author_client.post(
+            reverse('edit_post', args=['author', self.post.slug]), {'title': 'Edited', 'body': '<p>Body</p>'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('use_primary', response.cookies)
+
+        post_detail = reverse('post_detail', args=['author', self.post.slug])
+        self.assertContains(self.author_client.get(post_detail), 'Edited')
+        self.assertContains(self.client.get(post_detail), 'Original')
+
+        self.replicate()
+        self.assertContains(self.client.get(post_detail), 'Edited')
+
+    @override_settings(REPLICA_PIN_SECONDS=-1)
+    def test_pin_expires(self):
+        """ Tests the author goes back to the replica once the pin has expired """
+
+        self.author_client.post(
+            reverse('edit_post', args=['author', self.post.slug]), {'title': 'Edited', 'body': '<p>Body</p>'}
+        )
+
+        response = self.author_client.get(reverse('post_detail', args=['author', self.post.slug]))
+        self.assertContains(response, 'Original')
@@ -24,6 +24,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('user.urls')),
     path('profile/', include('userprofile.urls')),
+    path('notifications/', include('notification.urls')),
     path('summernote/', include('django_summernote.urls')),
     # blog urls must go last!
     path('', include('blog.urls')),
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Follow, Notification
+from .models import Follow, Notification, NotificationOutbox
 # Register your models here.
 
 admin.site.register(Follow)
 admin.site.register(Notification)
+admin.site.register(NotificationOutbox)
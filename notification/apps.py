@@ -5,4 +5,5 @@ class NotificationConfig(AppConfig):
     name = 'notification'
 
     def ready(self):
-        import notification.signals  # noqas
\ No newline at end of file
+        from notification.signals import connect_event_receivers
+        connect_event_receivers()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from notification.outbox import deliver
+import time
+
+
+class Command(BaseCommand):
+    help = 'Turns queued events into notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Number of events to deliver per transaction')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the outbox and exit instead of polling')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait between polls when the outbox is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            delivered = deliver(options['batch_size'])
+
+            if delivered:
+                self.stdout.write(f'Delivered {delivered} notifications.')
+
+            if options['once']:
+                return
+
+            if not delivered:
+                time.sleep(options['interval'])
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notification.retention import prune_expired, prune_over_cap
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deletes old notifications and trims each inbox to a maximum size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help='Delete notifications older than this many days')
+        parser.add_argument('--max-per-profile', type=int, default=settings.NOTIFICATION_MAX_PER_PROFILE,
+                            help='Keep at most this many notifications per profile')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows to delete per transaction, to keep locks short')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report how many notifications would be deleted without deleting them')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        start = time.monotonic()
+
+        expired = prune_expired(options['days'], batch_size, dry_run)
+        over_cap = prune_over_cap(options['max_per_profile'], batch_size, dry_run, options['days'])
+
+        elapsed = time.monotonic() - start
+        verb = 'Would delete' if dry_run else 'Deleted'
+
+        self.stdout.write(
+            f'{verb} {expired} notifications older than {options["days"]} days and '
+            f'{over_cap} over the limit of {options["max_per_profile"]} per profile in {elapsed:.2f}s.'
+        )
+        logger.info('prune_notifications', extra={
+            'dry_run': dry_run,
+            'expired': expired,
+            'over_cap': over_cap,
+            'seconds': round(elapsed, 3),
+        })
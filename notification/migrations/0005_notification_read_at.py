@@ -0,0 +1,37 @@
+# Generated by Django 2.2.17 on 2026-10-18 16:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_notifications(apps, schema_editor):
+    """ Every existing notification starts off unread """
+    Profile = apps.get_model('userprofile', 'Profile')
+    Notification = apps.get_model('notification', 'Notification')
+
+    notifications = Notification.objects.filter(profile=OuterRef('pk')).order_by().values('profile')
+    Profile.objects.update(
+        unread_notifications=Coalesce(Subquery(notifications.annotate(total=Count('pk')).values('total')), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0004_notification_rollup'),
+        ('userprofile', '0005_profile_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['profile', '-timestamp', '-id'], name='notification_inbox_idx'),
+        ),
+        migrations.RunPython(populate_unread_notifications, migrations.RunPython.noop),
+    ]
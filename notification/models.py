@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.contenttypes.models import ContentType
 from userprofile.models import Profile
 from abc import abstractmethod
 
@@ -8,10 +9,45 @@ class Notification(models.Model):
     message = models.CharField(max_length=255)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    # Bursts of the same kind of event on the same target are rolled up into one notification
+    # ("alice and 57 others liked ...") per time window. See notification.outbox.
+    verb = models.CharField(max_length=20, blank=True)
+    target_id = models.PositiveIntegerField(blank=True, null=True)
+    window_start = models.DateTimeField(blank=True, null=True)
+    actor_count = models.PositiveIntegerField(default=1)
+
+    read_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['profile', 'verb', 'target_id', 'window_start'], name='notification_rollup_idx'),
+            models.Index(fields=['profile', '-timestamp', '-id'], name='notification_inbox_idx'),
+            # Used by notification.retention to find expired rows
+            models.Index(fields=['timestamp'], name='notification_timestamp_idx'),
+        ]
+
     def __str__(self):
         return f'{self.profile.user.username} | {self.message}'
 
 
+class NotificationActor(models.Model):
+    """
+    Who is already counted in a rolled up notification, so the same person liking, unliking and liking
+    again (or commenting three times) is only counted once in Notification.actor_count.
+    """
+
+    notification = models.ForeignKey(Notification, related_name='actors', on_delete=models.CASCADE)
+    profile = models.ForeignKey(Profile, related_name='+', on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'profile'], name='unique_notification_actor'),
+        ]
+
+    def __str__(self):
+        return f'{self.profile_id} | {self.notification_id}'
+
+
 class Event(models.Model):
     user_from = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="%(class)s_activities")
     user_to = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="%(class)s_notifications")
@@ -22,14 +58,45 @@ class Event(models.Model):
         abstract = True
 
     @abstractmethod
-    def get_notification_str(self):
+    def get_notification_str(self, others=0):
         pass
 
+    def get_notification_target(self):
+        """ The id of the object the event is about, used to roll up notifications. None means the recipient themself. """
+        return None
+
+    def get_actor_str(self, others=0):
+        """ e.g. 'alice', or 'alice and 57 others' for a rolled up notification """
+        username = self.user_from.user.username
+
+        if others == 1:
+            return f"{username} and 1 other"
+        elif others:
+            return f"{username} and {others} others"
+        return username
+
 
 class Follow(Event):
 
     def __str__(self):
         return f"{self.user_from.user.username} followed {self.user_to.user.username}"
 
-    def get_notification_str(self):
-        return f"{self.user_from.user.username} followed you."
+    def get_notification_str(self, others=0):
+        return f"{self.get_actor_str(others)} followed you."
+
+
+class NotificationOutbox(models.Model):
+    """
+    Events waiting to be turned into notifications. Saving an event only costs one small insert here;
+    the messages are built and the Notification rows written in batches by notification.outbox.
+    """
+
+    event_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    event_id = models.PositiveIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.event_type.model} {self.event_id}'
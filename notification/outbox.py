@@ -0,0 +1,242 @@
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from userprofile.models import Profile
+from .models import Notification, NotificationActor, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class OutboxConflict(Exception):
+    """ Raised when another worker delivered part of a batch first """
+
+
+def get_executor():
+    """ A single background thread is enough to keep up with the outbox and means batches never overlap """
+
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notifications')
+    return _executor
+
+
+def enqueue(event):
+    """ Records that an event needs a notification. Delivery happens after the current transaction commits. """
+
+    NotificationOutbox.objects.create(
+        event_type=ContentType.objects.get_for_model(event),
+        event_id=event.pk,
+    )
+
+    if settings.NOTIFICATION_OUTBOX_WORKER:
+        transaction.on_commit(lambda: get_executor().submit(deliver_in_thread))
+
+
+def load_events(entries):
+    """ Fetches the events behind a batch of outbox entries with one query per event type """
+
+    ids_by_type = {}
+    for entry in entries:
+        ids_by_type.setdefault(entry.event_type_id, []).append(entry.event_id)
+
+    events = {}
+    for type_id, ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(type_id).model_class()
+        related = [field.name for field in model._meta.fields if field.many_to_one and field.name != 'user_from']
+
+        for event in model.objects.filter(pk__in=ids).select_related('user_from__user', *related):
+            events[(type_id, event.pk)] = event
+
+    return events
+
+
+def get_window_start(timestamp, window):
+    """ The start of the coalescing window a timestamp falls into """
+
+    seconds = int(timestamp.timestamp())
+    return datetime.fromtimestamp(seconds - seconds % window, tz=timezone.utc)
+
+
+def group_events(entries, events, window):
+    """
+    Groups a batch of events by (recipient, verb, target, window). With coalescing turned off
+    (window of 0) every event gets a group of its own.
+    Events deleted before delivery (e.g. a removed comment) don't get a notification.
+    """
+
+    groups = OrderedDict()
+    for entry in entries:
+        event = events.get((entry.event_type_id, entry.event_id))
+        if event is None:
+            continue
+
+        if window:
+            key = (event.user_to_id, event._meta.model_name, event.get_notification_target(),
+                   get_window_start(event.timestamp, window))
+        else:
+            key = entry.pk
+
+        groups.setdefault(key, []).append(event)
+
+    return groups
+
+
+def get_rollups(groups):
+    """ Fetches the notifications already written for this batch's windows, keyed the same way as the groups """
+
+    keys = [key for key in groups if isinstance(key, tuple)]
+    if not keys:
+        return {}
+
+    rollups = Notification.objects.filter(
+        profile_id__in={key[0] for key in keys},
+        verb__in={key[1] for key in keys},
+        window_start__in={key[3] for key in keys},
+    )
+    return {(n.profile_id, n.verb, n.target_id, n.window_start): n for n in rollups}
+
+
+def get_counted_actors(rollups, groups):
+    """ Returns {notification id: profile ids already counted} for the actors in this batch's existing rollups """
+
+    notification_ids = [rollups[key].pk for key in groups if key in rollups]
+    if not notification_ids:
+        return {}
+
+    actor_ids = {event.user_from_id for group in groups.values() for event in group}
+    counted = NotificationActor.objects.filter(notification_id__in=notification_ids, profile_id__in=actor_ids)
+
+    actors = {}
+    for notification_id, profile_id in counted.values_list('notification_id', 'profile_id'):
+        actors.setdefault(notification_id, set()).add(profile_id)
+    return actors
+
+
+def write_notifications(entries, events):
+    """
+    Adds each group of events to its existing rollup, or starts a new one.
+    actor_count counts people rather than events: someone already in a rollup isn't counted again.
+    """
+
+    groups = group_events(entries, events, settings.NOTIFICATION_COALESCE_WINDOW)
+    rollups = get_rollups(groups)
+    counted = get_counted_actors(rollups, groups)
+
+    new_notifications = []
+    updated_notifications = []
+    new_actors = {}
+    unread = Counter()
+
+    for key, group in groups.items():
+        latest = group[-1]
+        notification = rollups.get(key)
+        actors = {event.user_from_id for event in group}
+
+        if notification is None:
+            notification = Notification(
+                profile_id=latest.user_to_id,
+                verb=latest._meta.model_name,
+                target_id=latest.get_notification_target(),
+                window_start=key[3] if isinstance(key, tuple) else None,
+                actor_count=0,
+            )
+            new_notifications.append(notification)
+            unread[notification.profile_id] += 1
+        else:
+            actors -= counted.get(notification.pk, set())
+            # Nobody new, e.g. someone unliking and liking again
+            if not actors:
+                continue
+
+            # A rollup that was already read becomes unread again
+            if notification.read_at is not None:
+                notification.read_at = None
+                unread[notification.profile_id] += 1
+            notification.timestamp = timezone.now()
+            updated_notifications.append(notification)
+
+        notification.actor_count += len(actors)
+        notification.message = latest.get_notification_str(others=notification.actor_count - 1)
+        if isinstance(key, tuple):
+            new_actors[key] = actors
+
+    Notification.objects.bulk_create(new_notifications)
+    Notification.objects.bulk_update(updated_notifications, ['message', 'actor_count', 'timestamp', 'read_at'])
+    update_unread_counts(unread)
+
+    if new_actors:
+        # bulk_create only sets primary keys on some databases, so look the new rollups up again
+        if any(notification.pk is None for notification in new_notifications):
+            rollups = get_rollups(new_actors)
+
+        NotificationActor.objects.bulk_create([
+            NotificationActor(notification_id=rollups[key].pk, profile_id=profile_id)
+            for key, actors in new_actors.items() for profile_id in actors
+        ], ignore_conflicts=True)
+
+
+def update_unread_counts(changes):
+    """
+    Applies {profile id: change} to Profile.unread_notifications, with one UPDATE per distinct change
+    rather than one per profile.
+    """
+
+    profiles_by_change = {}
+    for profile_id, change in changes.items():
+        profiles_by_change.setdefault(change, []).append(profile_id)
+
+    for change, profile_ids in profiles_by_change.items():
+        Profile.objects.filter(pk__in=profile_ids).update(unread_notifications=F('unread_notifications') + change)
+
+
+def deliver_batch(batch_size):
+    """ Turns up to batch_size outbox entries into notifications. Returns the number of entries processed. """
+
+    with transaction.atomic():
+        entries = list(NotificationOutbox.objects.select_for_update(skip_locked=True)[:batch_size])
+        if not entries:
+            return 0
+
+        deleted, _ = NotificationOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+        if deleted != len(entries):
+            raise OutboxConflict()
+
+        write_notifications(entries, load_events(entries))
+
+    return len(entries)
+
+
+def deliver(batch_size=None):
+    """ Drains the outbox. Returns the number of entries processed. """
+
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    total = 0
+
+    while True:
+        try:
+            delivered = deliver_batch(batch_size)
+        except OutboxConflict:
+            continue
+
+        if not delivered:
+            return total
+        total += delivered
+
+
+def deliver_in_thread():
+    try:
+        deliver()
+    except Exception:
+        logger.exception('Failed to deliver notifications')
+    finally:
+        close_old_connections()
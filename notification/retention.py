@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Notification
+from .outbox import update_unread_counts
+
+
+def delete_batch(ids):
+    """ Deletes the given notifications, taking any unread ones off their profile's unread count """
+
+    with transaction.atomic():
+        unread = (
+            Notification.objects.filter(id__in=ids, read_at__isnull=True)
+            .order_by().values('profile').annotate(total=Count('id'))
+        )
+        update_unread_counts({row['profile']: -row['total'] for row in unread})
+
+        deleted, _ = Notification.objects.filter(id__in=ids).delete()
+
+    return deleted
+
+
+def delete_in_batches(get_ids, batch_size):
+    """ Calls get_ids(batch_size) and deletes what it returns until nothing is left. Each batch is its own short transaction. """
+
+    total = 0
+    while True:
+        ids = get_ids(batch_size)
+        if not ids:
+            return total
+        total += delete_batch(ids)
+
+
+def expired(days):
+    return Notification.objects.filter(timestamp__lt=timezone.now() - timedelta(days=days))
+
+
+def profiles_over_cap(cap, notifications=None):
+    """ Returns {profile id: number of notifications over the cap} """
+
+    if notifications is None:
+        notifications = Notification.objects.all()
+
+    totals = notifications.order_by().values('profile').annotate(total=Count('id')).filter(total__gt=cap)
+    return {row['profile']: row['total'] - cap for row in totals}
+
+
+def prune_expired(days, batch_size, dry_run=False):
+    """ Removes notifications older than `days`. Returns the number removed (or that would be). """
+
+    if dry_run:
+        return expired(days).count()
+
+    return delete_in_batches(
+        lambda size: list(expired(days).values_list('id', flat=True)[:size]),
+        batch_size
+    )
+
+
+def prune_over_cap(cap, batch_size, dry_run=False, days=None):
+    """
+    Keeps only the `cap` newest notifications for each profile. Returns the number removed (or that would be).
+    For a dry run, pass the retention period in `days` so notifications that would already have expired aren't counted twice.
+    """
+
+    if dry_run:
+        remaining = Notification.objects.exclude(pk__in=expired(days)) if days is not None else None
+        return sum(profiles_over_cap(cap, remaining).values())
+
+    over_cap = profiles_over_cap(cap)
+
+    total = 0
+    for profile_id in over_cap:
+        oldest = Notification.objects.filter(profile_id=profile_id).order_by('-timestamp', '-id')
+        total += delete_in_batches(
+            lambda size: list(oldest.values_list('id', flat=True)[cap:cap + size]),
+            batch_size
+        )
+
+    return total
@@ -1,15 +1,20 @@
+from django.apps import apps
 from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Event, Notification
+from .models import Event
+from .outbox import enqueue
 
 
-@receiver(post_save)
-def my_handler(sender, instance, created, **kwargs):
-    # Returns false if 'sender' is NOT a subclass of AbstractModel
-    if not issubclass(sender, Event):
-        return
+def queue_notification(sender, instance, created, **kwargs):
+    if created:
+        enqueue(instance)
 
-    Notification.objects.create(
-        profile=instance.user_to,
-        message=instance.get_notification_str()
-    )
+
+def connect_event_receivers():
+    """
+    Connects queue_notification to each concrete Event model (Comment, Like, Follow, ...)
+    so saves of every other model in the project don't go through it.
+    """
+
+    for model in apps.get_models():
+        if issubclass(model, Event):
+            post_save.connect(queue_notification, sender=model, dispatch_uid=f'queue_notification_{model._meta.label}')
@@ -1,7 +1,15 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from notification.models import Follow
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from notification.models import Follow, Notification, NotificationOutbox
 from blog.models import Post, Like, Comment
+from notification.outbox import deliver
+from io import StringIO
+import datetime
 
 USER_MODEL = get_user_model()
 
@@ -57,7 +65,7 @@ class TestNotifications(TestCase):
     """
     Things to test:
     - Can we access notifications from the user's profile?
-    - Do Like, Follow and Comment events create Notification instances?
+    - Do Like, Follow and Comment events create Notification instances once the outbox is delivered?
     - Do the notifications belong to the correct user?
     - Do the notifications have a timestamp?
     """
@@ -103,6 +111,7 @@ class TestNotifications(TestCase):
             user_to=self.u2.profile,
             post=self.post
         )
+        deliver()
 
         notification = self.u2.profile.notifications.first()
 
@@ -119,6 +128,7 @@ class TestNotifications(TestCase):
             user_from=self.u1.profile,
             user_to=self.u2.profile
         )
+        deliver()
 
         notification = self.u2.profile.notifications.first()
 
@@ -137,6 +147,7 @@ class TestNotifications(TestCase):
             post=self.post,
             body='I like this post'
         )
+        deliver()
 
         notification = self.u2.profile.notifications.first()
 
@@ -146,3 +157,235 @@ class TestNotifications(TestCase):
         self.assertTrue(hasattr(notification, 'timestamp'))
 
         notification.delete()
+
+
+class TestNotificationOutbox(TestCase):
+    """
+    Things to test:
+    - Does saving an event queue it instead of writing a notification straight away?
+    - Does delivering the outbox write every notification and empty the outbox?
+    - Are events deleted before delivery skipped?
+    - Do saves of other models stay out of the outbox?
+    - Does adding a comment leave notification generation to the worker?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+
+        cls.u1 = USER_MODEL.objects.create_user(
+            first_name='Michael',
+            last_name='R',
+            username='michaelr',
+            email='michael@test.com',
+            password='password123'
+        )
+
+        cls.u2 = USER_MODEL.objects.create_user(
+            first_name='Kate',
+            last_name='S',
+            username='katewrites',
+            email='kate@test.com',
+            password='password123'
+        )
+
+        cls.post = Post.objects.create(
+            title='Test Title',
+            body='test body',
+            author=cls.u2
+        )
+
+    def like(self):
+        return Like.objects.create(user_from=self.u1.profile, user_to=self.u2.profile, post=self.post)
+
+    def comment(self):
+        # A user can only like a post once, so comments are used where the same event is needed repeatedly
+        return Comment.objects.create(user_from=self.u1.profile, user_to=self.u2.profile, post=self.post, body='Nice')
+
+    def test_event_is_queued(self):
+        """ Tests an event adds an entry to the outbox and no notification yet """
+
+        self.like()
+
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+        self.assertEqual(Notification.objects.count(), 0)
+
+    def test_deliver(self):
+        """ Tests delivery writes the notifications in batches and empties the outbox """
+
+        for i in range(5):
+            self.comment()
+        Follow.objects.create(user_from=self.u1.profile, user_to=self.u2.profile)
+
+        delivered = deliver(batch_size=2)
+
+        self.assertEqual(delivered, 6)
+        self.assertEqual(self.u2.profile.notifications.count(), 2)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    @override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+    def test_deliver_query_count(self):
+        """ Tests a batch costs the same number of queries however many events are in it """
+
+        self.comment()
+        with CaptureQueriesContext(connection) as one_event:
+            deliver()
+
+        for i in range(20):
+            self.comment()
+        with CaptureQueriesContext(connection) as many_events:
+            deliver()
+
+        self.assertEqual(len(one_event), len(many_events))
+
+    def test_deleted_event_skipped(self):
+        """ Tests no notification is written for an event removed before delivery """
+
+        self.like().delete()
+
+        deliver()
+
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_other_models_ignored(self):
+        """ Tests saving a model that isn't an event doesn't touch the outbox """
+
+        Post.objects.create(title='Another', body='body', author=self.u1)
+
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_add_comment_queues_notification(self):
+        """ Tests the add_comment view queues the notification rather than writing it """
+
+        self.client.force_login(self.u1)
+        self.client.post(reverse('add_comment'), {'body': 'Nice post', 'post_id': self.post.id})
+
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_deliver_notifications_command(self):
+        """ Tests the management command drains the outbox """
+
+        self.like()
+        out = StringIO()
+
+        call_command('deliver_notifications', once=True, stdout=out)
+
+        self.assertIn('Delivered 1 notifications', out.getvalue())
+        self.assertEqual(self.u2.profile.notifications.first().message, 'michaelr liked Test Title.')
+
+
+class TestNotificationCoalescing(TestCase):
+    """
+    Things to test:
+    - Are likes on the same post within a window rolled up into one notification?
+    - Does a later batch add to the existing rollup?
+    - Do different posts, event types and windows get their own notifications?
+    - Are the Like rows themselves all kept?
+    - Is someone acting more than once in a window only counted once?
+    - Can coalescing be turned off?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = USER_MODEL.objects.create_user(
+            first_name='Kate',
+            last_name='S',
+            username='katewrites',
+            email='kate@test.com',
+            password='password123'
+        )
+        cls.fans = [
+            USER_MODEL.objects.create_user(
+                first_name='Fan',
+                last_name=str(i),
+                username=f'fan{i}',
+                email=f'fan{i}@test.com',
+                password='password123'
+            )
+            for i in range(4)
+        ]
+        cls.post = Post.objects.create(title='Test Title', body='test body', author=cls.author)
+        cls.other_post = Post.objects.create(title='Other Title', body='test body', author=cls.author)
+
+    def like(self, fan, post=None):
+        return Like.objects.create(user_from=fan.profile, user_to=self.author.profile, post=post or self.post)
+
+    def test_likes_rolled_up(self):
+        """ Tests three likes on a post become one notification naming the latest fan """
+
+        for fan in self.fans[:3]:
+            self.like(fan)
+
+        deliver()
+
+        notification = self.author.profile.notifications.get()
+        self.assertEqual(notification.message, 'fan2 and 2 others liked Test Title.')
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(Like.objects.count(), 3)
+
+    def test_rollup_across_batches(self):
+        """ Tests likes delivered later in the same window update the existing notification """
+
+        self.like(self.fans[0])
+        deliver()
+        self.like(self.fans[1])
+        deliver()
+
+        notification = self.author.profile.notifications.get()
+        self.assertEqual(notification.message, 'fan1 and 1 other liked Test Title.')
+
+    def test_repeat_actor_counted_once(self):
+        """ Tests repeated comments and a like, unlike and like again by the same fan count them once """
+
+        for i in range(3):
+            Comment.objects.create(user_from=self.fans[0].profile, user_to=self.author.profile, post=self.post, body='hi')
+        self.like(self.fans[0])
+        deliver()
+        self.like(self.fans[1])
+        deliver()
+        Like.objects.filter(user_from=self.fans[0].profile).delete()
+        self.like(self.fans[0])
+        deliver()
+
+        comments = self.author.profile.notifications.get(verb='comment')
+        likes = self.author.profile.notifications.get(verb='like')
+        self.assertEqual(comments.actor_count, 1)
+        self.assertEqual(comments.message, 'fan0 commented on Test Title.')
+        self.assertEqual(likes.actor_count, 2)
+        self.assertEqual(likes.message, 'fan1 and 1 other liked Test Title.')
+
+    def test_separate_targets_and_verbs(self):
+        """ Tests likes on another post, comments and follows get their own notifications """
+
+        self.like(self.fans[0])
+        self.like(self.fans[1], post=self.other_post)
+        Comment.objects.create(user_from=self.fans[2].profile, user_to=self.author.profile, post=self.post, body='hi')
+        Follow.objects.create(user_from=self.fans[3].profile, user_to=self.author.profile)
+
+        deliver()
+
+        self.assertEqual(self.author.profile.notifications.count(), 4)
+
+    def test_separate_windows(self):
+        """ Tests a like outside the window starts a new notification """
+
+        self.like(self.fans[0])
+        deliver()
+        Notification.objects.update(window_start=timezone.now() - datetime.timedelta(days=1))
+
+        self.like(self.fans[1])
+        deliver()
+
+        self.assertEqual(self.author.profile.notifications.count(), 2)
+
+    @override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+    def test_coalescing_disabled(self):
+        """ Tests every event gets its own notification when the window is 0 """
+
+        for fan in self.fans:
+            self.like(fan)
+
+        deliver()
+
+        self.assertEqual(self.author.profile.notifications.count(), 4)
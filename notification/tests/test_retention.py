@@ -0,0 +1,91 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from notification.models import Notification
+from userprofile.models import Profile
+from io import StringIO
+import datetime
+
+USER_MODEL = get_user_model()
+
+
+class TestPruneNotifications(TestCase):
+    """
+    Things to test:
+    - Are notifications older than the retention period deleted?
+    - Are inboxes trimmed to the newest notifications over the cap?
+    - Are unread counts reduced for deleted unread notifications?
+    - Does a dry run leave everything in place?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            first_name='Kate',
+            last_name='S',
+            username='katewrites',
+            email='kate@test.com',
+            password='password123'
+        )
+        cls.other_user = USER_MODEL.objects.create_user(
+            first_name='Michael',
+            last_name='R',
+            username='michaelr',
+            email='michael@test.com',
+            password='password123'
+        )
+
+        old = timezone.now() - datetime.timedelta(days=100)
+        for i in range(3):
+            notification = Notification.objects.create(profile=cls.user.profile, message=f'old {i}')
+            Notification.objects.filter(pk=notification.pk).update(timestamp=old)
+        for i in range(6):
+            Notification.objects.create(profile=cls.user.profile, message=f'new {i}')
+        for i in range(2):
+            Notification.objects.create(profile=cls.other_user.profile, message=f'other {i}')
+
+        Profile.objects.filter(user=cls.user).update(unread_notifications=9)
+        Profile.objects.filter(user=cls.other_user).update(unread_notifications=2)
+
+    def prune(self, **options):
+        out = StringIO()
+        call_command('prune_notifications', stdout=out, batch_size=2, **options)
+        return out.getvalue()
+
+    def test_prune_expired(self):
+        """ Tests notifications older than the retention period are removed """
+
+        output = self.prune(days=90, max_per_profile=100)
+
+        self.assertFalse(Notification.objects.filter(message__startswith='old').exists())
+        self.assertEqual(Notification.objects.count(), 8)
+        self.assertIn('Deleted 3 notifications older than 90 days', output)
+
+    def test_prune_over_cap(self):
+        """ Tests only the newest notifications are kept for a profile over the cap """
+
+        self.prune(days=365, max_per_profile=4)
+
+        messages = list(Notification.objects.filter(profile__user=self.user).values_list('message', flat=True))
+
+        self.assertEqual(sorted(messages), ['new 2', 'new 3', 'new 4', 'new 5'])
+        self.assertEqual(Notification.objects.filter(profile__user=self.other_user).count(), 2)
+
+    def test_unread_counts_updated(self):
+        """ Tests deleting unread notifications takes them off the unread count """
+
+        Notification.objects.filter(message='old 0').update(read_at=timezone.now())
+
+        self.prune(days=90, max_per_profile=100)
+
+        self.assertEqual(Profile.objects.get(user=self.user).unread_notifications, 7)
+        self.assertEqual(Profile.objects.get(user=self.other_user).unread_notifications, 2)
+
+    def test_dry_run(self):
+        """ Tests a dry run reports what would be deleted without deleting it """
+
+        output = self.prune(days=90, max_per_profile=4, dry_run=True)
+
+        self.assertEqual(Notification.objects.count(), 11)
+        self.assertIn('Would delete 3 notifications older than 90 days and 2 over the limit', output)
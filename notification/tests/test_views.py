@@ -0,0 +1,188 @@
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from blog.models import Post, Like, Comment
+from notification.models import Follow, Notification
+from notification.outbox import deliver
+from userprofile.models import Profile
+import json
+
+USER_MODEL = get_user_model()
+
+
+class TestUnreadCount(TestCase):
+    """
+    Things to test:
+    - Does delivering notifications increase the recipient's unread count?
+    - Does a rolled up notification that was already read become unread again?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.u1 = USER_MODEL.objects.create_user(
+            first_name='Michael',
+            last_name='R',
+            username='michaelr',
+            email='michael@test.com',
+            password='password123'
+        )
+        cls.u2 = USER_MODEL.objects.create_user(
+            first_name='Kate',
+            last_name='S',
+            username='katewrites',
+            email='kate@test.com',
+            password='password123'
+        )
+        cls.u3 = USER_MODEL.objects.create_user(
+            first_name='Sam',
+            last_name='T',
+            username='samt',
+            email='sam@test.com',
+            password='password123'
+        )
+        cls.post = Post.objects.create(title='Test Title', body='test body', author=cls.u2)
+
+    def unread_count(self):
+        return Profile.objects.get(user=self.u2).unread_notifications
+
+    def test_delivery_increments_unread(self):
+        """ Tests each new notification adds one to the unread count """
+
+        Like.objects.create(user_from=self.u1.profile, user_to=self.u2.profile, post=self.post)
+        Follow.objects.create(user_from=self.u1.profile, user_to=self.u2.profile)
+        deliver()
+
+        self.assertEqual(self.unread_count(), 2)
+
+    def test_rollup_counts_once(self):
+        """ Tests a rolled up notification only counts once while it's unread """
+
+        Comment.objects.create(user_from=self.u1.profile, user_to=self.u2.profile, post=self.post, body='Nice')
+        deliver()
+        Comment.objects.create(user_from=self.u1.profile, user_to=self.u2.profile, post=self.post, body='Nice')
+        deliver()
+
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_read_rollup_becomes_unread(self):
+        """ Tests new activity on a read notification makes it unread again """
+
+        Comment.objects.create(user_from=self.u1.profile, user_to=self.u2.profile, post=self.post, body='Nice')
+        deliver()
+        self.client.force_login(self.u2)
+        self.client.post(reverse('mark_notifications_read'))
+
+        Comment.objects.create(user_from=self.u3.profile, user_to=self.u2.profile, post=self.post, body='Nice')
+        deliver()
+
+        self.assertEqual(self.unread_count(), 1)
+        self.assertIsNone(Notification.objects.get().read_at)
+
+
+class TestInbox(TestCase):
+    """
+    Things to test:
+    - Are non-logged-in users redirected?
+    - Are notifications returned newest first, a page at a time?
+    - Does following 'next' return every notification once?
+    - Does marking notifications read update the unread count?
+    - Can users only mark their own notifications read?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            first_name='Kate',
+            last_name='S',
+            username='katewrites',
+            email='kate@test.com',
+            password='password123'
+        )
+        cls.other_user = USER_MODEL.objects.create_user(
+            first_name='Michael',
+            last_name='R',
+            username='michaelr',
+            email='michael@test.com',
+            password='password123'
+        )
+        for i in range(5):
+            Notification.objects.create(profile=cls.user.profile, message=f'notification {i}')
+        Profile.objects.filter(user=cls.user).update(unread_notifications=5)
+
+        cls.client = Client()
+        cls.url = reverse('inbox')
+
+    def get(self, url, **params):
+        return json.loads(self.client.get(url, params).content)
+
+    def test_login_requirement(self):
+        """ Tests non-logged-in users are redirected """
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_inbox(self):
+        """ Tests the first page is newest first and includes the unread count """
+
+        self.client.force_login(self.user)
+        response = self.get(self.url, limit=2)
+
+        self.assertEqual([n['message'] for n in response['notifications']], ['notification 4', 'notification 3'])
+        self.assertEqual(response['unread_count'], 5)
+        self.assertFalse(response['notifications'][0]['read'])
+        self.assertIsNotNone(response['next'])
+
+    def test_follow_next(self):
+        """ Tests following 'next' returns every notification once """
+
+        self.client.force_login(self.user)
+        messages = []
+        url = f'{self.url}?limit=2'
+
+        while url:
+            response = self.get(url)
+            messages += [n['message'] for n in response['notifications']]
+            url = response['next']
+
+        self.assertEqual(messages, [f'notification {i}' for i in reversed(range(5))])
+
+    def test_invalid_cursor(self):
+        """ Tests a cursor that can't be read is rejected """
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {'after': 'nonsense'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_mark_some_read(self):
+        """ Tests marking two notifications read takes two off the unread count """
+
+        self.client.force_login(self.user)
+        ids = list(Notification.objects.values_list('id', flat=True)[:2])
+
+        response = json.loads(self.client.post(reverse('mark_notifications_read'), {'id': ids}).content)
+
+        self.assertEqual(response['marked'], 2)
+        self.assertEqual(response['unread_count'], 3)
+
+    def test_mark_all_read(self):
+        """ Tests marking everything read twice only counts each notification once """
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('mark_notifications_read'))
+        response = json.loads(self.client.post(reverse('mark_notifications_read')).content)
+
+        self.assertEqual(response['marked'], 0)
+        self.assertEqual(response['unread_count'], 0)
+
+    def test_mark_other_users_notifications(self):
+        """ Tests users can't mark someone else's notifications read """
+
+        self.client.force_login(self.other_user)
+        ids = list(Notification.objects.values_list('id', flat=True))
+
+        response = json.loads(self.client.post(reverse('mark_notifications_read'), {'id': ids}).content)
+
+        self.assertEqual(response['marked'], 0)
+        self.assertEqual(Profile.objects.get(user=self.user).unread_notifications, 5)
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.inbox, name='inbox'),
+    path('read', views.mark_read, name='mark_notifications_read'),
+]
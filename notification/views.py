@@ -1,3 +1,109 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode, urlsafe_base64_encode, urlsafe_base64_decode
+from django.views.decorators.http import require_POST
+from userprofile.models import Profile
+from .models import Notification
+from .outbox import update_unread_counts
 
-# Create your views here.
+MAX_NOTIFICATIONS_PER_PAGE = 100
+
+
+def encode_cursor(notification):
+    raw = f"{notification.timestamp.isoformat()}|{notification.id}"
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(token):
+    """ Returns the (timestamp, id) stored in a cursor, or None if it can't be read """
+
+    try:
+        timestamp, notification_id = urlsafe_base64_decode(token).decode().split('|')
+        return parse_datetime(timestamp), int(notification_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+@login_required
+def inbox(request):
+    """
+    Returns the user's notifications, newest first, a page at a time.
+    Pass the 'next' url from the response to get the following page.
+    """
+
+    profile = Profile.objects.only('id', 'unread_notifications').get(user=request.user)
+
+    try:
+        limit = min(int(request.GET.get('limit', settings.NOTIFICATIONS_PER_PAGE)), MAX_NOTIFICATIONS_PER_PAGE)
+    except ValueError:
+        return JsonResponse({'status': 'error'}, status=400)
+
+    if limit < 1:
+        return JsonResponse({'status': 'error'}, status=400)
+
+    notifications = Notification.objects.filter(profile=profile).order_by('-timestamp', '-id')
+
+    cursor = request.GET.get('after')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None or position[0] is None:
+            return JsonResponse({'status': 'error'}, status=400)
+
+        timestamp, notification_id = position
+        notifications = notifications.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=notification_id))
+
+    page = list(notifications[:limit + 1])
+    has_next = len(page) > limit
+    page = page[:limit]
+
+    next_url = None
+    if has_next:
+        next_url = f"{reverse('inbox')}?{urlencode({'after': encode_cursor(page[-1]), 'limit': limit})}"
+
+    response = {
+        'status': 'success',
+        'unread_count': profile.unread_notifications,
+        'notifications': [
+            {
+                'id': notification.id,
+                'message': notification.message,
+                'timestamp': notification.timestamp.isoformat(),
+                'read': notification.read_at is not None,
+            }
+            for notification in page
+        ],
+        'next': next_url,
+    }
+
+    return JsonResponse(response)
+
+
+@require_POST
+@login_required
+def mark_read(request):
+    """ Marks the notifications with the posted ids as read, or all of them if no ids are given """
+
+    profile_id = Profile.objects.values_list('id', flat=True).get(user=request.user)
+
+    notifications = Notification.objects.filter(profile_id=profile_id, read_at__isnull=True)
+
+    ids = request.POST.getlist('id')
+    if ids:
+        try:
+            notifications = notifications.filter(id__in=[int(i) for i in ids])
+        except ValueError:
+            return JsonResponse({'status': 'error'}, status=400)
+
+    with transaction.atomic():
+        marked = notifications.update(read_at=timezone.now())
+        update_unread_counts({profile_id: -marked} if marked else {})
+
+    unread_count = Profile.objects.values_list('unread_notifications', flat=True).get(pk=profile_id)
+
+    return JsonResponse({'status': 'success', 'marked': marked, 'unread_count': unread_count})
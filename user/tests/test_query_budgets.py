@@ -0,0 +1,73 @@
+from bloggingplatform.testing import QueryBudgetMixin
+from django.contrib.auth.tokens import default_token_generator
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.contrib.auth import get_user_model
+
+USER_MODEL = get_user_model()
+
+
+class TestUserQueryBudgets(QueryBudgetMixin, TestCase):
+    """
+    Query budgets for every URL in user.urls.
+    Things to test:
+    - Does each view stay within its budget?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com', first_name='Jane', last_name='Doe', username='janedoe', password='password123'
+        )
+
+    def test_anonymous_pages(self):
+        """ Tests the registration, log in and password reset pages stay within their budgets """
+
+        self.assertQueryBudget(0, reverse('register'), status_code=200)
+        self.assertQueryBudget(0, reverse('login'), status_code=200)
+        self.assertQueryBudget(0, reverse('password_reset'), status_code=200)
+        self.assertQueryBudget(0, reverse('password_reset_done'), status_code=200)
+        self.assertQueryBudget(0, reverse('password_reset_complete'), status_code=200)
+
+    def test_register(self):
+        """ Tests registering stays within its budget """
+
+        data = {
+            'email': 'tom@test.com',
+            'first_name': 'Tom',
+            'last_name': 'Thomas',
+            'username': 'tomthomas',
+            'password1': 'a-long-password-123',
+            'password2': 'a-long-password-123',
+        }
+
+        self.assertQueryBudget(4, reverse('register'), 'post', data, status_code=302)
+
+    def test_log_in_and_out(self):
+        """ Tests logging in and out stay within their budgets """
+
+        data = {'username': 'janedoe@test.com', 'password': 'password123'}
+
+        self.assertQueryBudget(9, reverse('login'), 'post', data, status_code=302)
+        self.assertQueryBudget(4, reverse('logout'), status_code=302)
+
+    def test_password_change(self):
+        """ Tests the password change pages stay within their budgets """
+
+        self.client.force_login(self.user)
+
+        self.assertQueryBudget(3, reverse('password_change'), status_code=200)
+        self.assertQueryBudget(3, reverse('password_change_done'), status_code=200)
+
+    def test_password_reset(self):
+        """ Tests requesting and following a password reset link stay within their budgets """
+
+        # Other tests log in as self.user, which changes its last_login and so its tokens
+        user = USER_MODEL.objects.get(pk=self.user.pk)
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = default_token_generator.make_token(user)
+
+        self.assertQueryBudget(1, reverse('password_reset'), 'post', {'email': 'janedoe@test.com'}, status_code=302)
+        self.assertQueryBudget(5, reverse('password_reset_confirm', args=[uid, token]), status_code=302)
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Profile, Follower
+from .models import Profile, Follower, PhotoJob
 
 # Register your models here.
 admin.site.register(Profile)
 admin.site.register(Follower)
+admin.site.register(PhotoJob)
@@ -1,17 +1,17 @@
 from django import forms
-from .models import Profile
-from PIL import Image
+from .models import Profile, PhotoJob
+from .jobs import enqueue
 from crispy_forms.bootstrap import PrependedText, FormActions
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit
 from crispy_forms.layout import Field
 
 
-class PhotoForm(forms.ModelForm):
+class CroppedPhotoForm(forms.ModelForm):
     """
-    A form for uploading profile pictures. This is used with Cropper.js on the front-end.
-    x, y, width & height are supplied by Cropper.js and are used here to crop the photo
-    using Pillow.
+    Base form for photos uploaded with Cropper.js on the front-end.
+    x, y, width & height are supplied by Cropper.js. Rather than cropping the photo here,
+    save() queues a PhotoJob so the crop and resize happen outside the request.
     """
 
     x = forms.FloatField(widget=forms.HiddenInput())
@@ -19,30 +19,40 @@ class PhotoForm(forms.ModelForm):
     width = forms.FloatField(widget=forms.HiddenInput())
     height = forms.FloatField(widget=forms.HiddenInput())
 
-    class Meta:
-        model = Profile
-        fields = ('profile_picture', 'x', 'y', 'width',
-                  'height')
+    photo_field = None
 
-    def save(self, user, commit=True):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields[self.photo_field].required = True
+
+    def save(self, commit=True):
+
+        job = PhotoJob(
+            profile=self.instance,
+            field=self.photo_field,
+            source=self.cleaned_data.get(self.photo_field),
+            x=self.cleaned_data.get('x'),
+            y=self.cleaned_data.get('y'),
+            width=self.cleaned_data.get('width'),
+            height=self.cleaned_data.get('height'),
+        )
 
-        profile = super().save()
+        if commit:
+            job.save()
+            enqueue(job)
 
-        profile.user = user
+        return job
 
-        x = self.cleaned_data.get('x')
-        y = self.cleaned_data.get('y')
-        w = self.cleaned_data.get('width')
-        h = self.cleaned_data.get('height')
 
-        image = Image.open(profile.profile_picture)
-        cropped_image = image.crop((x, y, w + x, h + y))
-        resized_image = cropped_image.resize((200, 200), Image.ANTIALIAS)
-        resized_image.save(profile.profile_picture.path)
+class PhotoForm(CroppedPhotoForm):
+    """ A form for uploading profile pictures. """
 
-        profile.save()
+    photo_field = 'profile_picture'
 
-        return profile
+    class Meta:
+        model = Profile
+        fields = ('profile_picture', 'x', 'y', 'width',
+                  'height')
 
 
 class ProfileForm(forms.ModelForm):
@@ -73,39 +83,12 @@ class ProfileForm(forms.ModelForm):
                   'github')
 
 
-class CoverPhotoForm(forms.ModelForm):
-    """
-    A form for uploading cover photos. This is used with Cropper.js on the front-end.
-    x, y, width & height are supplied by Cropper.js and are used here to crop the photo
-    using Pillow.
-    """
+class CoverPhotoForm(CroppedPhotoForm):
+    """ A form for uploading cover photos. """
 
-    x = forms.FloatField(widget=forms.HiddenInput())
-    y = forms.FloatField(widget=forms.HiddenInput())
-    width = forms.FloatField(widget=forms.HiddenInput())
-    height = forms.FloatField(widget=forms.HiddenInput())
+    photo_field = 'cover_photo'
 
     class Meta:
         model = Profile
         fields = ('cover_photo', 'x', 'y', 'width',
                   'height')
-
-    def save(self, user, commit=True):
-
-        profile = super().save()
-
-        profile.user = user
-
-        x = self.cleaned_data.get('x')
-        y = self.cleaned_data.get('y')
-        w = self.cleaned_data.get('width')
-        h = self.cleaned_data.get('height')
-
-        image = Image.open(profile.cover_photo)
-        cropped_image = image.crop((x, y, w + x, h + y))
-        resized_image = cropped_image.resize((1920, 300), Image.ANTIALIAS)
-        resized_image.save(profile.cover_photo.path)
-
-        profile.save()
-
-        return profile
@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+
+from .models import Profile, PhotoJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """ A process-wide pool used to start jobs as soon as they are queued """
+
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.PHOTO_JOB_WORKERS, thread_name_prefix='photo-job')
+    return _executor
+
+
+def enqueue(job):
+    """
+    Hands a saved job to the in-process worker pool once the surrounding transaction commits.
+    If PHOTO_JOB_WORKERS is 0, jobs are left for `python manage.py process_photo_jobs`.
+    """
+
+    if settings.PHOTO_JOB_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(run_job_in_thread, job.pk))
+
+
+def claim(job_id):
+    """ Marks a pending job as processing. Returns False if another worker got there first. """
+
+    claimed = PhotoJob.objects.filter(pk=job_id, status=PhotoJob.PENDING).update(
+        status=PhotoJob.PROCESSING, started=timezone.now()
+    )
+    return claimed == 1
+
+
+def requeue_stale(timeout):
+    """
+    Puts jobs that have been processing for longer than `timeout` seconds back in the queue. Their worker
+    most likely died (the process was killed or restarted) before it could mark them done or failed.
+    Returns the number of jobs re-queued.
+    """
+
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = PhotoJob.objects.filter(status=PhotoJob.PROCESSING).filter(Q(started__lt=cutoff) | Q(started__isnull=True))
+
+    return stale.update(status=PhotoJob.PENDING, started=None)
+
+
+def crop_and_resize(job):
+    """ Crops the uploaded image to the box chosen with Cropper.js and resizes it for display """
+
+    with Image.open(job.source) as image:
+        image_format = image.format
+        box = (job.x, job.y, job.x + job.width, job.y + job.height)
+        resized_image = image.crop(box).resize(PhotoJob.SIZES[job.field], Image.ANTIALIAS)
+
+    output = BytesIO()
+    resized_image.save(output, format=image_format)
+    return ContentFile(output.getvalue())
+
+
+def process(job):
+    """ Writes the finished image and swaps it onto the profile """
+
+    profile = job.profile
+    photo = getattr(profile, job.field)
+    photo.save(os.path.basename(job.source.name), crop_and_resize(job), save=False)
+
+    # Only touch the one column so we don't overwrite edits made to the profile while the job was queued
+    Profile.objects.filter(pk=profile.pk).update(**{job.field: photo.name})
+
+    job.source.delete(save=False)
+    job.status = PhotoJob.DONE
+    job.finished = timezone.now()
+    job.save(update_fields=['source', 'status', 'finished'])
+
+
+def run_job(job_id):
+    """ Claims and processes a single job. Failures are recorded on the job rather than raised. """
+
+    if not claim(job_id):
+        return
+
+    job = PhotoJob.objects.select_related('profile__user').get(pk=job_id)
+
+    try:
+        process(job)
+    except Exception as e:
+        logger.exception('Photo job %s failed', job_id)
+        job.status = PhotoJob.FAILED
+        job.error = str(e)[:255]
+        job.finished = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished'])
+
+
+def run_job_in_thread(job_id):
+    """ Worker threads keep their own database connection, so tidy it up after each job """
+
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_pending(workers, limit=None):
+    """ Processes pending jobs, oldest first, across a pool of worker threads. Returns the number of jobs attempted. """
+
+    job_ids = PhotoJob.objects.filter(status=PhotoJob.PENDING).order_by('created').values_list('pk', flat=True)
+    job_ids = list(job_ids[:limit] if limit else job_ids)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='photo-job') as executor:
+        list(executor.map(run_job_in_thread, job_ids))
+
+    return len(job_ids)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from userprofile.jobs import requeue_stale, run_pending
+import time
+
+
+class Command(BaseCommand):
+    help = 'Crops and resizes queued profile pictures and cover photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of jobs to process in parallel')
+        parser.add_argument('--once', action='store_true',
+                            help='Process the jobs currently queued and exit instead of polling')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--timeout', type=int, default=settings.PHOTO_JOB_TIMEOUT,
+                            help='Seconds after which a job still processing is assumed abandoned and re-queued')
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = requeue_stale(options['timeout'])
+            if requeued:
+                self.stdout.write(f'Re-queued {requeued} abandoned photo jobs.')
+
+            processed = run_pending(options['workers'])
+
+            if processed:
+                self.stdout.write(f'Processed {processed} photo jobs.')
+
+            if options['once']:
+                return
+
+            if not processed:
+                time.sleep(options['interval'])
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from userprofile.models import Profile, Follower
+
+
+def count_follows(field):
+    """ A subquery counting the Follower rows pointing at a profile through `field` """
+
+    follows = Follower.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(Subquery(follows.annotate(total=Count('pk')).values('total')), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalised follower_count and following_count on every Profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of profiles to repair per UPDATE')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report how many profiles are out of date without changing them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        drifted = Profile.objects.annotate(
+            actual_followers=count_follows('user_to'),
+            actual_following=count_follows('user_from'),
+        ).exclude(
+            follower_count=F('actual_followers'),
+            following_count=F('actual_following'),
+        )
+        profile_ids = list(drifted.values_list('pk', flat=True))
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(profile_ids)} profiles have incorrect follow counts.')
+            return
+
+        for start in range(0, len(profile_ids), batch_size):
+            with transaction.atomic():
+                Profile.objects.filter(pk__in=profile_ids[start:start + batch_size]).update(
+                    follower_count=count_follows('user_to'),
+                    following_count=count_follows('user_from'),
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Repaired follow counts for {len(profile_ids)} profiles.'))
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.17 on 2026-10-18 16:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_follow_counts(apps, schema_editor):
+    Profile = apps.get_model('userprofile', 'Profile')
+    Follower = apps.get_model('userprofile', 'Follower')
+
+    def count_of(field):
+        follows = Follower.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+        return Coalesce(Subquery(follows.annotate(total=Count('pk')).values('total')), 0)
+
+    Profile.objects.update(
+        follower_count=count_of('user_to'),
+        following_count=count_of('user_from'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_follow_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.17 on 2026-10-18 16:48
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """ Keeps the oldest row for each (user_from, user_to) pair so the unique constraint can be added """
+    Profile = apps.get_model('userprofile', 'Profile')
+    Follower = apps.get_model('userprofile', 'Follower')
+
+    duplicates = (
+        Follower.objects.order_by().values('user_from', 'user_to')
+        .annotate(first_id=Min('id'), total=Count('id')).filter(total__gt=1)
+    )
+
+    for pair in duplicates:
+        Follower.objects.filter(
+            user_from=pair['user_from'], user_to=pair['user_to']
+        ).exclude(id=pair['first_id']).delete()
+
+        extra = pair['total'] - 1
+        Profile.objects.filter(pk=pair['user_to']).update(follower_count=F('follower_count') - extra)
+        Profile.objects.filter(pk=pair['user_from']).update(following_count=F('following_count') - extra)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0002_profile_follow_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follower',
+            constraint=models.UniqueConstraint(fields=('user_from', 'user_to'), name='unique_follower'),
+        ),
+    ]
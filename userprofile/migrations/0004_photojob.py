@@ -0,0 +1,36 @@
+# Generated by Django 2.2.17 on 2026-10-18 16:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import userprofile.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0003_unique_follower'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('profile_picture', 'Profile picture'), ('cover_photo', 'Cover photo')], max_length=20)),
+                ('source', models.ImageField(upload_to=userprofile.models.get_job_filename)),
+                ('x', models.FloatField()),
+                ('y', models.FloatField()),
+                ('width', models.FloatField()),
+                ('height', models.FloatField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photo_jobs', to='userprofile.Profile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='photojob',
+            index=models.Index(fields=['status', 'created'], name='photojob_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0005_profile_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photojob',
+            name='started',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
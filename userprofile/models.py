@@ -17,6 +17,16 @@ def get_filename(self, filename):
     return f"uploads/profiles/{self.user.username}_{datetime_str}.{extension}"
 
 
+def get_job_filename(self, filename):
+    """ Uploads waiting to be cropped are kept apart from the finished images """
+
+    extension = filename.split('.')[-1]
+    t = datetime.now()
+    datetime_str = f"{t.year}-{t.month}-{t.day}-{t.hour}{t.minute}{t.second}"
+
+    return f"uploads/pending/{self.profile.user.username}_{self.field}_{datetime_str}.{extension}"
+
+
 class Follower(models.Model):
     """
     This is an intermediary model for handling the relationship between users and followers. It allows us to store
@@ -32,6 +42,10 @@ class Follower(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        constraints = [
+            # Also serves as the index for "is this user following that one?" lookups
+            models.UniqueConstraint(fields=['user_from', 'user_to'], name='unique_follower'),
+        ]
 
     def __str__(self):
         return f"{self.user_from.user.username} follows {self.user_to.user.username}"
@@ -67,9 +81,34 @@ class Profile(models.Model):
     following = models.ManyToManyField(
         'self', through=Follower, related_name='followers', symmetrical=False)
 
+    # Denormalised counts of Follower rows, kept up to date by signals.update_follow_counts.
+    # They can be rebuilt with `python manage.py recount_follows`.
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    # Denormalised count of notifications without a read_at, maintained by notification.outbox and notification.views
+    unread_notifications = models.PositiveIntegerField(default=0)
+
+    # Never written back by save(), see _do_update
+    COUNTER_FIELDS = ('follower_count', 'following_count', 'unread_notifications')
+
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} ({self.user.username}) | {self.user.email}"
 
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # The counters are only changed with F() UPDATEs, so saving a profile (e.g. in edit_profile) mustn't
+        # write back the copy loaded at the start of the request over increments made since
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.COUNTER_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+    def is_followed_by(self, user):
+        """ Returns True if the given user follows this profile, using a single EXISTS query """
+        if not user.is_authenticated:
+            return False
+
+        return Follower.objects.filter(user_from__user=user, user_to=self).exists()
+
     def get_location(self):
         """ Returns a string with the user's location based on their chosen city/country. """
         if not self.city and not self.country:
@@ -83,3 +122,58 @@ class Profile(models.Model):
                 return f"{country}"
         else:
             return f"{self.city}"
+
+
+class PhotoJob(models.Model):
+    """
+    A queued crop and resize of an uploaded profile picture or cover photo.
+    Uploads are stored as they arrive and processed by a pool of workers (see userprofile.jobs),
+    so the request that uploaded them doesn't have to wait for Pillow.
+    """
+
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    FIELD_CHOICES = (
+        ('profile_picture', 'Profile picture'),
+        ('cover_photo', 'Cover photo'),
+    )
+
+    # The size each kind of photo is resized to once cropped
+    SIZES = {
+        'profile_picture': (200, 200),
+        'cover_photo': (1920, 300),
+    }
+
+    profile = models.ForeignKey(Profile, related_name='photo_jobs', on_delete=models.CASCADE)
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    source = models.ImageField(upload_to=get_job_filename)
+
+    x = models.FloatField()
+    y = models.FloatField()
+    width = models.FloatField()
+    height = models.FloatField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    # When a worker claimed the job, so jobs left processing by a worker that died can be found
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created'], name='photojob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_field_display()} for {self.profile.user.username} | {self.status}"
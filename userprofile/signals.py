@@ -1,6 +1,8 @@
-from .models import Profile
+from .models import Profile, Follower
+from bloggingplatform import caching
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 USER_MODEL = get_user_model()
@@ -10,3 +12,39 @@ USER_MODEL = get_user_model()
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+def update_follow_counts(follower, delta):
+    """ Adjusts the denormalised follower/following counts in the database rather than in Python, so concurrent follows can't lose updates """
+
+    Profile.objects.filter(pk=follower.user_to_id).update(follower_count=F('follower_count') + delta)
+    Profile.objects.filter(pk=follower.user_from_id).update(following_count=F('following_count') + delta)
+
+
+@receiver(post_save, sender=Follower)
+def increment_follow_counts(sender, instance, created, **kwargs):
+    if created:
+        update_follow_counts(instance, 1)
+
+
+@receiver(post_delete, sender=Follower)
+def decrement_follow_counts(sender, instance, **kwargs):
+    update_follow_counts(instance, -1)
+
+
+@receiver(post_save, sender=Follower)
+@receiver(post_delete, sender=Follower)
+def invalidate_follow_caches(sender, instance, **kwargs):
+    # The follower's feed changes, and so do the counts on both profiles
+    caching.invalidate(
+        caching.feed(instance.user_from_id),
+        caching.profile(instance.user_from_id),
+        caching.profile(instance.user_to_id),
+    )
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_caches(sender, instance, **kwargs):
+    # Names and pictures are shown alongside posts everywhere
+    caching.invalidate(caching.profile(instance.pk), caching.LISTINGS)
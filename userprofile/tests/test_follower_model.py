@@ -1,5 +1,7 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError
 from userprofile.models import Follower
 
 USER_MODEL = get_user_model()
@@ -95,3 +97,49 @@ class TestProfileFollowing(TestCase):
 
         self.assertEqual(fan_followers.count(), 0)
         self.assertEqual(famous_writer_following.count(), 0)
+
+
+class TestFollowerConstraints(TestCase):
+    """
+    Things to test:
+    - Can a user follow the same person twice?
+    - Does is_followed_by report the relationship correctly?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+
+        cls.famous_writer = USER_MODEL.objects.create(
+            first_name='Famous',
+            last_name='Writer',
+            username='famouswriter',
+            email='famouswriter@test.com',
+            password='iamabigshot'
+        )
+
+        cls.fan = USER_MODEL.objects.create(
+            first_name='Jane',
+            last_name='Doe',
+            username='janecodes',
+            email='janedoe@test.com',
+            password='password123'
+        )
+
+        Follower.objects.create(user_from=cls.fan.profile, user_to=cls.famous_writer.profile)
+
+    def test_duplicate_follow_rejected(self):
+        """ Tests the database rejects a second identical follow """
+
+        with self.assertRaises(IntegrityError):
+            Follower.objects.create(user_from=self.fan.profile, user_to=self.famous_writer.profile)
+
+    def test_is_followed_by(self):
+        """ Tests is_followed_by only returns True in the direction of the follow """
+
+        self.assertTrue(self.famous_writer.profile.is_followed_by(self.fan))
+        self.assertFalse(self.fan.profile.is_followed_by(self.famous_writer))
+
+    def test_is_followed_by_anonymous(self):
+        """ Tests anonymous users never follow anyone """
+
+        self.assertFalse(self.famous_writer.profile.is_followed_by(AnonymousUser()))
@@ -1,6 +1,9 @@
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.core.management import call_command
+from userprofile.models import Profile
+from io import StringIO
 
 USER_MODEL = get_user_model()
 
@@ -64,3 +67,87 @@ class TestFollowViews(TestCase):
 
         self.assertGreaterEqual(response.status_code, 400)
         self.assertLessEqual(response.status_code, 500)
+
+
+class TestFollowCounts(TestCase):
+    """
+    Things to test:
+    - Does following increment the writer's follower_count and the fan's following_count?
+    - Does following twice only count once?
+    - Does unfollowing decrement both counts?
+    - Does recount_follows repair counts that have drifted?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.famous_writer = USER_MODEL.objects.create(
+            first_name='Famous',
+            last_name='Writer',
+            username='famouswriter',
+            email='famouswriter@test.com',
+            password='iamabigshot'
+        )
+
+        cls.fan = USER_MODEL.objects.create(
+            first_name='Jane',
+            last_name='Doe',
+            username='janecodes',
+            email='janedoe@test.com',
+            password='password123'
+        )
+
+        cls.client = Client()
+        cls.follow_url = reverse('follow')
+
+    def toggle_follow(self, action):
+        self.client.force_login(self.fan)
+        self.client.post(self.follow_url, {'action': action, 'id': self.famous_writer.id})
+
+    def assertCounts(self, writer_followers, fan_following):
+        self.assertEqual(Profile.objects.get(user=self.famous_writer).follower_count, writer_followers)
+        self.assertEqual(Profile.objects.get(user=self.fan).following_count, fan_following)
+
+    def test_follow_increments_counts(self):
+        """ Tests following updates the counts on both profiles """
+
+        self.toggle_follow('follow')
+
+        self.assertCounts(1, 1)
+
+    def test_follow_is_idempotent(self):
+        """ Tests following the same writer twice only counts once """
+
+        self.toggle_follow('follow')
+        self.toggle_follow('follow')
+
+        self.assertCounts(1, 1)
+
+    def test_unfollow_decrements_counts(self):
+        """ Tests unfollowing updates the counts on both profiles """
+
+        self.toggle_follow('follow')
+        self.toggle_follow('unfollow')
+
+        self.assertCounts(0, 0)
+
+    def test_recount_follows(self):
+        """ Tests the management command repairs counts which have drifted """
+
+        self.toggle_follow('follow')
+        Profile.objects.update(follower_count=42, following_count=0)
+
+        call_command('recount_follows', stdout=StringIO())
+
+        self.assertCounts(1, 1)
+        self.assertEqual(Profile.objects.get(user=self.fan).follower_count, 0)
+
+    def test_recount_follows_dry_run(self):
+        """ Tests a dry run reports drifted profiles without changing them """
+
+        Profile.objects.filter(user=self.famous_writer).update(follower_count=42)
+        out = StringIO()
+
+        call_command('recount_follows', dry_run=True, stdout=out)
+
+        self.assertIn('1 profiles', out.getvalue())
+        self.assertCounts(42, 0)
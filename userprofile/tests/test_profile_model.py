@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.db import models
+from django.db.models import F
 from django.contrib.auth import get_user_model
 from userprofile.models import Profile, get_filename
 from datetime import datetime
@@ -15,6 +16,7 @@ class TestProfileModel(TestCase):
     - Does it include a bio?
     - Is the profile linked to the correct user?
     - Does the __str__ give the expected result?
+    - Does saving a profile leave the follow and unread notification counters alone?
     """
 
     @classmethod
@@ -39,6 +41,22 @@ class TestProfileModel(TestCase):
 
         self.assertEqual(str(self.user.profile), expected_str)
 
+    def test_save_keeps_counters(self):
+        """ Tests saving a profile loaded before someone followed it doesn't undo the follow or unread counts """
+
+        profile = Profile.objects.get(user=self.user)
+        Profile.objects.filter(pk=profile.pk).update(
+            follower_count=F('follower_count') + 1, following_count=F('following_count') + 1,
+            unread_notifications=F('unread_notifications') + 1
+        )
+
+        profile.bio = 'New bio'
+        profile.save()
+
+        profile.refresh_from_db()
+        self.assertEqual((profile.follower_count, profile.following_count, profile.unread_notifications), (1, 1, 1))
+        self.assertEqual(profile.bio, 'New bio')
+
     def test_profile_picture_placeholder(self):
         """ Tests that a profile picture property exists. """
 
@@ -1,11 +1,28 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from userprofile.models import Profile
+from userprofile.models import Profile, PhotoJob
+from userprofile.jobs import run_job, requeue_stale
+from PIL import Image
+from datetime import timedelta
+from django.utils import timezone
+import json
+from io import StringIO
+import shutil
+import tempfile
 
 USER_MODEL = get_user_model()
 
+# Uploads made by these tests go here rather than into the real media folder
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
 
 class TestProfileView(TestCase):
     """
@@ -110,6 +127,7 @@ class TestProfileView(TestCase):
             profile.bio, "Hi, I'm Charlotte. I like books and code.")
 
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class TestProfilePhotoView(TestCase):
     """
     Things to test:
@@ -182,6 +200,7 @@ class TestProfilePhotoView(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class TestCoverPhotoView(TestCase):
     """
     Things to test:
@@ -252,3 +271,170 @@ class TestCoverPhotoView(TestCase):
         response = self.client.post(self.url, form_data)
 
         self.assertEqual(response.status_code, 200)
+
+
+@override_settings(PHOTO_JOB_WORKERS=0, MEDIA_ROOT=MEDIA_ROOT)
+class TestPhotoJobs(TestCase):
+    """
+    Things to test:
+    - Does uploading a photo queue a job instead of changing the profile straight away?
+    - Does processing a job crop & resize the photo and swap it onto the profile?
+    - Can the uploader poll the job's status?
+    - Are other users blocked from seeing the job?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            first_name='Jane',
+            last_name='Doe',
+            email='janedoe@test.com',
+            username='janedoe',
+            password='password123'
+        )
+        cls.other_user = USER_MODEL.objects.create_user(
+            first_name='Tom',
+            last_name='Thomas',
+            email='tomthomas@test.com',
+            username='tomthomas',
+            password='password123'
+        )
+        cls.client = Client()
+
+    def upload(self, url_name, field, width, height):
+        self.client.force_login(self.user)
+
+        with open('userprofile/tests/thePOST-default.jpg', 'rb') as photo:
+            form_data = {
+                field: photo,
+                'x': 0.0,
+                'y': 0.0,
+                'width': width,
+                'height': height,
+            }
+            response = self.client.post(reverse(url_name), form_data)
+
+        return json.loads(response.content)
+
+    def test_upload_queues_job(self):
+        """ Tests the upload returns straight away with a pending job """
+
+        result = self.upload('change_profile_picture', 'profile_picture', 20.0, 20.0)
+        profile = Profile.objects.get(user=self.user)
+        job = PhotoJob.objects.get()
+
+        self.assertEqual(result['status'], 'PENDING')
+        self.assertEqual(result['job_url'], reverse('photo_job_status', args=[job.pk]))
+        self.assertEqual(job.status, PhotoJob.PENDING)
+        self.assertFalse(profile.profile_picture)
+
+    def test_process_profile_picture(self):
+        """ Tests a processed job leaves a 200x200 profile picture on the profile """
+
+        self.upload('change_profile_picture', 'profile_picture', 20.0, 20.0)
+        job = PhotoJob.objects.get()
+
+        run_job(job.pk)
+
+        job.refresh_from_db()
+        profile = Profile.objects.get(user=self.user)
+
+        self.assertEqual(job.status, PhotoJob.DONE)
+        self.assertFalse(job.source)
+        with Image.open(profile.profile_picture) as image:
+            self.assertEqual(image.size, (200, 200))
+
+    def test_process_cover_photo(self):
+        """ Tests a processed job leaves a 1920x300 cover photo on the profile """
+
+        self.upload('change_cover_photo', 'cover_photo', 192.0, 30.0)
+        run_job(PhotoJob.objects.get().pk)
+
+        profile = Profile.objects.get(user=self.user)
+
+        with Image.open(profile.cover_photo) as image:
+            self.assertEqual(image.size, (1920, 300))
+
+    def test_job_status(self):
+        """ Tests polling a finished job returns the new photo's url """
+
+        result = self.upload('change_profile_picture', 'profile_picture', 20.0, 20.0)
+        run_job(PhotoJob.objects.get().pk)
+
+        response = self.client.get(result['job_url'])
+        result = json.loads(response.content)
+        profile = Profile.objects.get(user=self.user)
+
+        self.assertEqual(result['status'], 'DONE')
+        self.assertEqual(result['photo_url'], profile.profile_picture.url)
+
+    def test_job_status_other_user(self):
+        """ Tests users can't see each other's jobs """
+
+        result = self.upload('change_profile_picture', 'profile_picture', 20.0, 20.0)
+
+        self.client.force_login(self.other_user)
+        response = self.client.get(result['job_url'])
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_job_only_runs_once(self):
+        """ Tests a job that has already been claimed isn't processed again """
+
+        self.upload('change_profile_picture', 'profile_picture', 20.0, 20.0)
+        job = PhotoJob.objects.get()
+        PhotoJob.objects.filter(pk=job.pk).update(status=PhotoJob.PROCESSING)
+
+        run_job(job.pk)
+
+        self.assertFalse(Profile.objects.get(user=self.user).profile_picture)
+
+    def test_requeue_stale_jobs(self):
+        """ Tests jobs left processing past the timeout go back in the queue and recent ones are left alone """
+
+        self.upload('change_profile_picture', 'profile_picture', 20.0, 20.0)
+        self.upload('change_cover_photo', 'cover_photo', 192.0, 30.0)
+        stale, recent = PhotoJob.objects.order_by('pk')
+        PhotoJob.objects.filter(pk=stale.pk).update(
+            status=PhotoJob.PROCESSING, started=timezone.now() - timedelta(minutes=30)
+        )
+        PhotoJob.objects.filter(pk=recent.pk).update(status=PhotoJob.PROCESSING, started=timezone.now())
+
+        self.assertEqual(requeue_stale(60), 1)
+
+        stale.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(stale.status, PhotoJob.PENDING)
+        self.assertEqual(recent.status, PhotoJob.PROCESSING)
+
+        run_job(stale.pk)
+        self.assertTrue(Profile.objects.get(user=self.user).profile_picture)
+
+
+@override_settings(PHOTO_JOB_WORKERS=0, MEDIA_ROOT=MEDIA_ROOT)
+class TestProcessPhotoJobsCommand(TransactionTestCase):
+    """ Tests the management command drains the queue using its worker pool """
+
+    def test_process_photo_jobs(self):
+        user = USER_MODEL.objects.create_user(
+            first_name='Jane',
+            last_name='Doe',
+            email='janedoe@test.com',
+            username='janedoe',
+            password='password123'
+        )
+        with open('userprofile/tests/thePOST-default.jpg', 'rb') as photo:
+            job = PhotoJob.objects.create(
+                profile=user.profile,
+                field='profile_picture',
+                source=SimpleUploadedFile('photo.jpg', photo.read()),
+                x=0, y=0, width=20, height=20
+            )
+        out = StringIO()
+
+        call_command('process_photo_jobs', once=True, workers=2, stdout=out)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PhotoJob.DONE)
+        self.assertIn('Processed 1 photo jobs', out.getvalue())
+        self.assertTrue(Profile.objects.get(user=user).profile_picture)
@@ -0,0 +1,63 @@
+from bloggingplatform.testing import QueryBudgetMixin
+from userprofile.models import PhotoJob
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+import shutil
+import tempfile
+
+USER_MODEL = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PHOTO_JOB_WORKERS=0)
+class TestProfileQueryBudgets(QueryBudgetMixin, TestCase):
+    """
+    Query budgets for every URL in userprofile.urls.
+    Things to test:
+    - Does each view stay within its budget?
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = USER_MODEL.objects.create_user(
+            email='janedoe@test.com', first_name='Jane', last_name='Doe', username='janedoe', password='password123'
+        )
+        cls.other = USER_MODEL.objects.create_user(
+            email='tom@test.com', first_name='Tom', last_name='Thomas', username='tomthomas', password='password123'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, budget, url_name, field):
+        with open('userprofile/tests/thePOST-default.jpg', 'rb') as photo:
+            data = {field: photo, 'x': 0.0, 'y': 0.0, 'width': 20.0, 'height': 20.0}
+            self.assertQueryBudget(budget, reverse(url_name), 'post', data, status_code=200)
+
+    def test_edit_profile(self):
+        """ Tests viewing and saving the profile form stay within their budgets """
+
+        self.assertQueryBudget(4, reverse('edit_profile'), status_code=200)
+        self.assertQueryBudget(4, reverse('edit_profile'), 'post', {'blog_title': 'My blog', 'bio': 'Hi'}, status_code=302)
+
+    def test_photo_uploads(self):
+        """ Tests uploading photos and checking on their jobs stay within their budgets """
+
+        self.upload(5, 'change_profile_picture', 'profile_picture')
+        self.upload(5, 'change_cover_photo', 'cover_photo')
+
+        job = PhotoJob.objects.first()
+        self.assertQueryBudget(3, reverse('photo_job_status', args=[job.pk]), status_code=200)
+
+    def test_follow(self):
+        """ Tests following and unfollowing stay within their budgets """
+
+        self.assertQueryBudget(13, reverse('follow'), 'post', {'id': self.other.id, 'action': 'follow'}, status_code=200)
+        self.assertQueryBudget(11, reverse('follow'), 'post', {'id': self.other.id, 'action': 'unfollow'}, status_code=200)
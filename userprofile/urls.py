@@ -6,5 +6,6 @@ urlpatterns = [
     path('edit', views.edit_profile, name='edit_profile'),
     path('edit/profilephoto', ajax_views.change_profile_picture, name='change_profile_picture'),
     path('edit/coverphoto', ajax_views.change_cover_photo, name='change_cover_photo'),
+    path('edit/photo/<int:pk>', ajax_views.photo_job_status, name='photo_job_status'),
     path('follow', ajax_views.toggle_user_follow, name='follow'),
 ]
@@ -4,13 +4,31 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.http import HttpResponse, JsonResponse
-from .models import Profile, Follower
+from django.db import transaction
+from django.urls import reverse
+from .models import Profile, Follower, PhotoJob
 from .forms import PhotoForm, CoverPhotoForm
 import json
 
 USER_MODEL = get_user_model()
 
 
+def photo_job_response(job):
+    """ Describes the state of a photo job. The front-end polls job_url until the status is DONE. """
+
+    response = {
+        'status': job.status.upper(),
+        'job_url': reverse('photo_job_status', args=[job.pk]),
+    }
+
+    if job.status == PhotoJob.DONE:
+        response['photo_url'] = getattr(job.profile, job.field).url
+    elif job.status == PhotoJob.FAILED:
+        response['error'] = job.error
+
+    return HttpResponse(json.dumps(response), content_type='application/json')
+
+
 @require_POST
 @login_required
 def change_profile_picture(request):
@@ -22,12 +40,8 @@ def change_profile_picture(request):
 
     if form.is_valid():
 
-        profile = form.save(user, commit=False)
-        response = {
-            'status': 'SUCCESS',
-            'photo_url': profile.profile_picture.url
-        }
-        return HttpResponse(json.dumps(response), content_type='application/json')
+        job = form.save()
+        return photo_job_response(job)
 
     else:
         raise ValidationError('Form Invalid')
@@ -41,16 +55,20 @@ def change_cover_photo(request):
     form = CoverPhotoForm(request.POST, request.FILES, instance=profile)
 
     if form.is_valid():
-        profile = form.save(request.user, commit=False)
-        response = {
-            'status': 'SUCCESS',
-            'photo_url': profile.cover_photo.url
-        }
-        return HttpResponse(json.dumps(response), content_type='application/json')
+        job = form.save()
+        return photo_job_response(job)
     else:
         raise ValidationError('Form Invalid')
 
 
+@login_required
+def photo_job_status(request, pk):
+
+    job = get_object_or_404(PhotoJob.objects.select_related('profile'), pk=pk, profile__user=request.user)
+
+    return photo_job_response(job)
+
+
 @require_POST
 @login_required
 def toggle_user_follow(request):
@@ -60,7 +78,12 @@ def toggle_user_follow(request):
 
     if user_id and action:
         try:
-            user = USER_MODEL.objects.get(id=user_id)
+            user = USER_MODEL.objects.select_related('profile').get(id=user_id)
+        except USER_MODEL.DoesNotExist:
+            return JsonResponse({'status': 'error'})
+
+        # The follow counts on both profiles are updated by signals in the same transaction
+        with transaction.atomic():
             if action == 'follow':
                 Follower.objects.get_or_create(
                     user_from=request.user.profile,
@@ -68,7 +91,5 @@ def toggle_user_follow(request):
                 )
             else:
                 Follower.objects.filter(user_from=request.user.profile, user_to=user.profile).delete()
-        except USER_MODEL.DoesNotExist:
-            return JsonResponse({'status': 'error'})
 
     return JsonResponse({'status': 'error'})